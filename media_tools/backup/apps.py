@@ -0,0 +1,73 @@
+from pathlib import Path
+
+from media_tools.core import action, App, logs
+from media_tools.core.progress import format_bytes
+from media_tools.core.writer import AtomicWriter
+from .backup import Backup
+from .repository import Repository
+
+
+__all__ = ("apps", "BackupApp")
+
+
+class BackupApp(App):
+    name = "backup"
+    label = "Backup"
+    groups = ("files",)
+    description = (
+        "Deduplicated backups into a local repository: files are split into content-defined chunks, "
+        "only new chunks being compressed and stored."
+    )
+
+    def init_parser(self, parser):
+        parser.add_argument("repository", type=Path, metavar="REPOSITORY", help="Backup repository directory.")
+        super().init_parser(parser)
+        parser.add_argument("-j", "--jobs", type=int, help="Number of worker processes (default: CPU count).")
+        parser.add_argument("-t", "--target", type=Path, help="Restore target directory.")
+        parser.add_argument("-i", "--include", action="append", help="Only restore files under this path.")
+
+    def get_repository(self, path, create=False):
+        repository = Repository(path)
+        if create:
+            return repository.init()
+        if not repository.exists():
+            self.parser.error(f"No backup repository at {path}.")
+        return repository.load()
+
+    @action("create", "-c", nargs="+", type=Path, metavar="SOURCE", help="Create a snapshot of these directories.")
+    def create(self, repository, create, jobs=None, **kwargs):
+        if missing := [str(path) for path in create if not path.is_dir()]:
+            self.parser.error(f"Missing source directories: {', '.join(missing)}")
+        repository = self.get_repository(repository, create=True)
+        with AtomicWriter() as writer:
+            name, stats = Backup(repository, jobs).create(create, writer)
+        repository.close()
+        logs.info(
+            f"Snapshot {name}: {stats['files']} files ({stats['changed']} changed), "
+            f"{format_bytes(stats['read'])} read, {stats['chunks']} new chunks, "
+            f"{format_bytes(stats['stored'])} stored.",
+            format=False,
+        )
+
+    @action("list", "-l", action="store_true", help="List snapshots.")
+    def list(self, repository, **kwargs):
+        repository = self.get_repository(repository)
+        for name in repository.get_snapshots():
+            header = repository.read_snapshot_header(name)
+            logs.out(f"{name}  {header['time']}  {' '.join(header['sources'])}", format=False)
+
+    @action("restore", "-r", metavar="SNAPSHOT", help="Restore snapshot (or 'latest') into --target directory.")
+    def restore(self, repository, restore, target=None, include=None, jobs=None, **kwargs):
+        if target is None:
+            self.parser.error("--restore requires a --target directory.")
+        repository = self.get_repository(repository)
+        try:
+            name = repository.get_snapshot_name(restore)
+        except KeyError as err:
+            self.parser.error(err.args[0])
+        count = Backup(repository, jobs).restore(name, target, include)
+        repository.close()
+        logs.info(f"Snapshot {name}: {count} files restored into {target}.", format=False)
+
+
+apps = BackupApp()
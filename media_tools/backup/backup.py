@@ -0,0 +1,252 @@
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
+from pathlib import Path
+import sqlite3
+
+from media_tools.core.files import map_ordered, walk_files
+from media_tools.core.hashing import HashCache
+from media_tools.core.logs import logs
+from media_tools.core.progress import Progress
+from .chunker import chunk_stream
+from .repository import PackWriter, read_chunk, Repository
+
+
+__all__ = ("Backup", "store_files", "restore_file")
+
+
+def chunk_id(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def store_files(path, files, params):
+    """Chunk files and store new chunks into packs (run in worker
+    processes). Return ``(chunks, entries, read, stored)``: ``(chunks ids,
+    content digest)`` of each file (None if it could not be read), new
+    chunks index entries, read and stored bytes.
+
+    :param Path path: repository path.
+    :param [str] files: files paths.
+    :param dict params: chunker parameters.
+    """
+    repository = Repository(path)
+    db = sqlite3.connect(f"file:{repository.index_path}?mode=ro", uri=True, timeout=60)
+    select = "SELECT 1 FROM chunks WHERE id = ?"
+    writer, written = PackWriter(repository), set()
+    results, read, stored = [], 0, 0
+    try:
+        for file in files:
+            ids, digest = [], hashlib.blake2b()
+            try:
+                with open(file, "rb") as stream:
+                    for data in chunk_stream(stream, **params):
+                        digest.update(data)
+                        id = chunk_id(data)
+                        ids.append(id.hex())
+                        read += len(data)
+                        if id not in written and not db.execute(select, (id,)).fetchone():
+                            written.add(id)
+                            stored += writer.write(id, data)
+            except OSError as err:
+                logs.warn(f"Can't read {file}: {err}")
+                results.append(None)
+                continue
+            results.append((ids, digest.hexdigest()))
+        return results, writer.close(), read, stored
+    finally:
+        db.close()
+
+
+def restore_file(path, file, locations, repository):
+    """Rebuild a file from its chunks, read one at a time from packs (run
+    in worker threads). Return its size.
+
+    :param Path path: restored file path.
+    :param dict file: snapshot's file entry.
+    :param list locations: chunks locations (see ``Repository.get_chunks``).
+    :param Repository repository: repository.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.part")
+    fds = {}
+    try:
+        with open(tmp, "wb") as stream:
+            for id, location in zip(file["chunks"], locations):
+                if (fd := fds.get(location[0])) is None:
+                    fd = fds[location[0]] = os.open(repository.get_pack_path(location[0]), os.O_RDONLY)
+                data = read_chunk(fd, location)
+                if chunk_id(data).hex() != id:
+                    raise ValueError(f"{file['path']}: chunk {id} is corrupted")
+                stream.write(data)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        for fd in fds.values():
+            os.close(fd)
+    os.chmod(tmp, file["mode"] & 0o7777)
+    os.utime(tmp, ns=(file["mtime_ns"], file["mtime_ns"]))
+    os.replace(tmp, path)
+    return file["size"]
+
+
+class Backup:
+    """Create and restore deduplicated snapshots of directories.
+
+    Files unchanged since the previous snapshot (same size, modification
+    time and inode) reuse its chunks without being read, as well as files
+    with the same content digest (taken from ``HashCache``). Others are
+    chunked and their new chunks compressed and stored by a process pool,
+    in batches of about ``batch_size`` bytes. Restore reads chunks straight
+    from packs, files being restored concurrently.
+    """
+
+    jobs = os.cpu_count() or 1
+    """Number of worker processes (or threads when restoring)."""
+    batch_size = 1 << 26
+    """Files are sent to workers by batches of about this size."""
+
+    def __init__(self, repository, jobs=None, hashes=None):
+        """
+        :param Repository repository: backup repository.
+        :param int jobs: number of workers.
+        :param HashCache hashes: digests cache (default: user's one).
+        """
+        self.repository = repository
+        if jobs:
+            self.jobs = jobs
+        self.hashes = hashes
+
+    def get_parent(self):
+        """Return last snapshot's files by path."""
+        if not (snapshots := self.repository.get_snapshots()):
+            return {}
+        _, files = self.repository.read_snapshot(snapshots[-1])
+        return {file["path"]: file for file in files}
+
+    def scan(self, sources, parent):
+        """Return ``(files, changed)``: snapshot's files entries, and those
+        to be read (whose ``chunks`` are None)."""
+        files, changed = [], []
+        for source in sources:
+            source = os.path.abspath(source)
+            for path, name, stat in walk_files((source,)):
+                path = os.path.join(path, name)
+                file = {
+                    "path": path.lstrip(os.sep),
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "mode": stat.st_mode,
+                    "ino": stat.st_ino,
+                    "digest": None,
+                    "chunks": None,
+                }
+                prev = parent.get(file["path"])
+                if prev and all(prev[key] == file[key] for key in ("size", "mtime_ns", "ino")):
+                    file["chunks"], file["digest"] = prev["chunks"], prev.get("digest")
+                else:
+                    changed.append(file)
+                files.append(file)
+        return files, changed
+
+    def match_content(self, changed, parent):
+        """Reuse previous snapshot's chunks of changed files whose content
+        is the same (modification time or inode changed only). Return files
+        still to be read."""
+        candidates = [
+            file
+            for file in changed
+            if (prev := parent.get(file["path"])) and prev.get("digest") and prev["size"] == file["size"]
+        ]
+        if not candidates:
+            return changed
+        hashes = self.hashes or HashCache()
+        try:
+            digests = hashes.get_many(os.sep + file["path"] for file in candidates)
+        finally:
+            if hashes is not self.hashes:
+                hashes.close()
+        for file in candidates:
+            prev = parent[file["path"]]
+            if digests[os.sep + file["path"]] == prev["digest"]:
+                file["chunks"], file["digest"] = prev["chunks"], prev["digest"]
+        return [file for file in changed if file["chunks"] is None]
+
+    def get_batches(self, files):
+        """Yield batches of files, of about ``batch_size`` bytes."""
+        batch, size = [], 0
+        for file in files:
+            batch.append(file)
+            size += file["size"]
+            if size >= self.batch_size:
+                yield batch
+                batch, size = [], 0
+        if batch:
+            yield batch
+
+    def create(self, sources, writer):
+        """Create a new snapshot of provided directories. Return ``(name,
+        stats)``.
+
+        :param [Path] sources: directories to back up.
+        :param AtomicWriter writer: used to save snapshot.
+        """
+        repository = self.repository
+        repository.db  # create index before workers read it
+        parent = self.get_parent()
+        with logs.span("backup.scan"):
+            files, changed = self.scan(sources, parent)
+        with logs.span("backup.hash"):
+            changed = self.match_content(changed, parent)
+        stats = {"files": len(files), "changed": len(changed), "read": 0, "stored": 0, "chunks": 0}
+
+        params = repository.config["chunker"]
+        batches = list(self.get_batches(changed))
+        total_bytes = sum(file["size"] for file in changed)
+        with Progress("backup", total=len(changed), total_bytes=total_bytes) as progress:
+            items = ((repository.path, [os.sep + file["path"] for file in batch], params) for batch in batches)
+            results = map_ordered(store_files, items, self.jobs, ProcessPoolExecutor)
+            for batch, (chunks, entries, read, stored) in zip(batches, results):
+                # recorded as soon as possible, so that workers skip those chunks
+                stats["chunks"] += repository.add_chunks(entries)
+                stats["read"] += read
+                stats["stored"] += stored
+                for file, result in zip(batch, chunks):
+                    if result is not None:
+                        file["chunks"], file["digest"] = result
+                progress.update(len(batch), sum(file["size"] for file in batch))
+
+        files = [file for file in files if file["chunks"] is not None]
+        sources = [os.path.abspath(source) for source in sources]
+        name = repository.write_snapshot(writer, sources, sorted(files, key=lambda file: file["path"]))
+        for key, value in stats.items():
+            logs.count(f"backup.{key}", value)
+        return name, stats
+
+    def restore(self, name, target, include=None):
+        """Restore snapshot's files into target directory. Return number of
+        restored files.
+
+        :param str name: snapshot name.
+        :param Path target: target directory.
+        :param [str] include: only restore files under those paths.
+        """
+        repository = self.repository
+        _, files = repository.read_snapshot(name)
+        if include:
+            include = tuple(os.path.abspath(path).lstrip(os.sep) for path in include)
+            files = (
+                file
+                for file in files
+                if file["path"] in include or file["path"].startswith(tuple(p + os.sep for p in include))
+            )
+        target = Path(target)
+        # index is only used from calling thread
+        items = ((target / file["path"], file, repository.get_chunks(file["chunks"]), repository) for file in files)
+        count = 0
+        with Progress("restore") as progress:
+            for size in map_ordered(restore_file, items, self.jobs):
+                count += 1
+                progress.update(bytes=size)
+        logs.count("backup.restored", count)
+        return count
@@ -0,0 +1,50 @@
+"""Content-defined chunking.
+
+Chunk boundaries only depend on the few bytes preceding them, so that an
+insertion or deletion in a file only changes chunks around it: others are
+found again, shifted, and deduplicated.
+
+Each byte is mapped to a bit by a fixed pseudo-random table (using
+``bytes.translate``), and a boundary is placed after a run of ``bits``
+ones, which happens about every ``2 ** (bits + 1)`` bytes of random-like
+data. Both mapping and search run at C speed, unlike a per-byte rolling
+hash loop in Python. Chunks sizes are bounded by ``min_size`` and
+``max_size``.
+"""
+import hashlib
+
+
+__all__ = ("MIN_SIZE", "MAX_SIZE", "BITS", "chunk_stream")
+
+
+MIN_SIZE = 1 << 19
+"""Minimum chunk size."""
+MAX_SIZE = 1 << 23
+"""Maximum chunk size."""
+BITS = 19
+"""Boundary pattern length: average chunk size is about ``MIN_SIZE + 2 **
+(BITS + 1)`` bytes."""
+READ_SIZE = 1 << 24
+"""Stream read size."""
+
+TABLE = bytes(hashlib.blake2b(bytes((value,)), digest_size=1).digest()[0] & 1 for value in range(256))
+"""Bytes to bits mapping."""
+
+
+def chunk_stream(stream, min_size=MIN_SIZE, max_size=MAX_SIZE, bits=BITS):
+    """Yield content-defined chunks (as bytes) of a binary stream."""
+    pattern = b"\x01" * bits
+    buffer = b""
+    eof = False
+    while not eof:
+        data = stream.read(READ_SIZE)
+        eof = not data
+        buffer = buffer + data if buffer else data
+        mask = buffer.translate(TABLE)
+        pos, size = 0, len(buffer)
+        while pos < size and (eof or size - pos >= max_size):
+            index = mask.find(pattern, pos + min_size - bits, pos + max_size)
+            end = index + bits if index >= 0 else min(pos + max_size, size)
+            yield buffer[pos:end]
+            pos = end
+        buffer = buffer[pos:]
@@ -0,0 +1,237 @@
+from datetime import datetime
+import gzip
+import json
+import os
+from pathlib import Path
+import secrets
+import sqlite3
+import zlib
+
+from media_tools.core.logs import logs
+from . import chunker
+
+
+__all__ = ("Repository", "PackWriter", "read_chunk")
+
+
+class Repository:
+    """Backup repository, as a local directory:
+
+    - ``config.json``: repository version and chunking parameters;
+    - ``packs/XX/ID.pack``: unique chunks, concatenated, compressed when
+      it is worth it;
+    - ``index.sqlite3``: chunks locations in packs;
+    - ``snapshots/NAME.jsonl.gz``: snapshots manifests, as JSON lines: a
+      header, then one line per file with its chunks ids.
+
+    Packs are written before the index entries pointing to them, and
+    snapshots last: an interrupted backup leaves at worst unreferenced
+    packs.
+    """
+
+    version = 1
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.config = None
+        self._db = None
+
+    @property
+    def index_path(self):
+        return self.path / "index.sqlite3"
+
+    @property
+    def snapshots_dir(self):
+        return self.path / "snapshots"
+
+    def exists(self):
+        return (self.path / "config.json").exists()
+
+    def init(self):
+        """Create repository if it does not exist, then load it."""
+        if not self.exists():
+            (self.path / "packs").mkdir(parents=True, exist_ok=True)
+            self.snapshots_dir.mkdir(exist_ok=True)
+            config = {
+                "version": self.version,
+                "chunker": {"min_size": chunker.MIN_SIZE, "max_size": chunker.MAX_SIZE, "bits": chunker.BITS},
+            }
+            with open(self.path / "config.json", "w") as stream:
+                json.dump(config, stream, indent=2)
+            logs.info(f"Repository initialized at {self.path}.")
+        return self.load()
+
+    def load(self):
+        with open(self.path / "config.json") as stream:
+            self.config = json.load(stream)
+        if self.config.get("version") != self.version:
+            raise RuntimeError(f"Unsupported backup repository version: {self.config.get('version')}")
+        return self
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.index_path, timeout=60)
+            # workers check chunks existence while the index is written
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                " id BLOB PRIMARY KEY, pack TEXT, offset INTEGER, length INTEGER, size INTEGER, compressed INTEGER"
+                ") WITHOUT ROWID"
+            )
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ---- chunks
+    def add_chunks(self, entries):
+        """Record ``(id, pack, offset, length, size, compressed)`` chunks
+        locations (already known chunks are kept as is). Return number of
+        new chunks."""
+        with self.db:
+            before = self.db.total_changes
+            self.db.executemany("INSERT OR IGNORE INTO chunks VALUES (?, ?, ?, ?, ?, ?)", entries)
+            return self.db.total_changes - before
+
+    def get_chunks(self, ids):
+        """Return chunks locations ``(pack, offset, length, size,
+        compressed)`` for provided hex ids. Raise KeyError for unknown
+        ones."""
+        select = "SELECT pack, offset, length, size, compressed FROM chunks WHERE id = ?"
+        locations = []
+        for id in ids:
+            if (row := self.db.execute(select, (bytes.fromhex(id),)).fetchone()) is None:
+                raise KeyError(f"Chunk {id} is missing from repository index")
+            locations.append(row)
+        return locations
+
+    def get_pack_path(self, name):
+        return self.path / "packs" / name[:2] / f"{name}.pack"
+
+    # ---- snapshots
+    def get_snapshots(self):
+        """Return snapshots names, from oldest to newest."""
+        return sorted(path.name.removesuffix(".jsonl.gz") for path in self.snapshots_dir.glob("*.jsonl.gz"))
+
+    def get_snapshot_name(self, name):
+        """Return snapshot name, resolving ``latest`` alias. Raise
+        ``KeyError`` if it does not exist."""
+        snapshots = self.get_snapshots()
+        if name == "latest" and snapshots:
+            return snapshots[-1]
+        if name not in snapshots:
+            raise KeyError(f"Snapshot {name} does not exist")
+        return name
+
+    def read_snapshot_header(self, name):
+        """Return header of a snapshot, without reading its files."""
+        with gzip.open(self.snapshots_dir / f"{name}.jsonl.gz", "rt", encoding="utf-8") as stream:
+            return json.loads(stream.readline())
+
+    def read_snapshot(self, name):
+        """Return ``(header, files)`` of a snapshot, files being an iterator
+        over files' dicts."""
+        stream = gzip.open(self.snapshots_dir / f"{name}.jsonl.gz", "rt", encoding="utf-8")
+        header = json.loads(stream.readline())
+
+        def files():
+            with stream:
+                for line in stream:
+                    yield json.loads(line)
+
+        return header, files()
+
+    def write_snapshot(self, writer, sources, files):
+        """Save a new snapshot using provided ``AtomicWriter``. Return its
+        name.
+
+        :param [str] sources: backed up directories.
+        :param Iterable[dict] files: files' entries.
+        """
+        now = datetime.now()
+        name = f"{now:%Y%m%d-%H%M%S}-{secrets.token_hex(2)}"
+        header = {"version": self.version, "time": now.isoformat(timespec="seconds"), "sources": sources}
+
+        def write(stream):
+            with gzip.open(stream, "wt", encoding="utf-8") as gz:
+                gz.write(json.dumps(header) + "\n")
+                for file in files:
+                    gz.write(json.dumps(file, separators=(",", ":")) + "\n")
+
+        writer.write(self.snapshots_dir / f"{name}.jsonl.gz", write, mode="wb")
+        return name
+
+
+class PackWriter:
+    """Write chunks into pack files of about ``pack_size`` bytes (used in
+    worker processes).
+
+    Data is compressed with zlib, unless a sample of it doesn't compress
+    (already compressed media files).
+    """
+
+    pack_size = 1 << 26
+    """Pack size after which a new pack is started."""
+    level = 6
+    """Zlib compression level."""
+    sample_size = 1 << 16
+    """Size of the sample tested for compressibility."""
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.entries = []
+        self.name = self.stream = self.tmp = None
+        self.offset = 0
+
+    def write(self, id, data):
+        """Append a chunk. Return stored size."""
+        size, sample = len(data), data[: self.sample_size]
+        compressed = len(zlib.compress(sample, 1)) < len(sample) * 0.9
+        if compressed:
+            data = zlib.compress(data, self.level)
+        if self.stream is None:
+            self.open()
+        self.stream.write(data)
+        self.entries.append((id, self.name, self.offset, len(data), size, compressed))
+        self.offset += len(data)
+        if self.offset >= self.pack_size:
+            self.flush()
+        return len(data)
+
+    def open(self):
+        self.name = secrets.token_hex(16)
+        path = self.repository.get_pack_path(self.name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp = path.with_name(f".{path.name}.part")
+        self.stream = open(self.tmp, "wb")
+        self.offset = 0
+
+    def flush(self):
+        """Finish current pack."""
+        if self.stream is not None:
+            self.stream.flush()
+            os.fsync(self.stream.fileno())
+            self.stream.close()
+            os.replace(self.tmp, self.repository.get_pack_path(self.name))
+            self.stream = None
+
+    def close(self):
+        """Finish current pack and return chunks entries written since last
+        call."""
+        self.flush()
+        entries, self.entries = self.entries, []
+        return entries
+
+
+def read_chunk(fd, location):
+    """Read and return chunk data from an open pack file descriptor.
+
+    :param int fd: pack file descriptor.
+    :param tuple location: chunk location, as returned by ``Repository.get_chunks``.
+    """
+    _, offset, length, _, compressed = location
+    data = os.pread(fd, length, offset)
+    return zlib.decompress(data) if compressed else data
@@ -0,0 +1,110 @@
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from media_tools.backup.backup import Backup
+from media_tools.backup.chunker import chunk_stream
+from media_tools.backup.repository import Repository
+from media_tools.core.hashing import HashCache
+from media_tools.core.writer import AtomicWriter
+
+
+PARAMS = {"min_size": 1 << 10, "max_size": 1 << 13, "bits": 8}
+
+
+def chunks(data):
+    return list(chunk_stream(io.BytesIO(data), **PARAMS))
+
+
+def test_chunk_stream_bounds():
+    data = os.urandom(1 << 18)
+    result = chunks(data)
+    assert b"".join(result) == data
+    assert all(PARAMS["min_size"] <= len(chunk) <= PARAMS["max_size"] for chunk in result[:-1])
+    assert 0 < len(result[-1]) <= PARAMS["max_size"]
+    assert chunks(b"") == []
+
+
+def test_chunk_stream_is_content_defined():
+    data = os.urandom(1 << 18)
+    before = chunks(data)
+    assert chunks(data) == before
+    # an insertion only changes chunks around it
+    after = chunks(data[:1000] + b"inserted" + data[1000:])
+    assert len(set(before) & set(after)) >= len(before) - 2
+
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / "src"
+    (root / "album").mkdir(parents=True)
+    (root / "album" / "track.flac").write_bytes(os.urandom(100_000))
+    (root / "notes.txt").write_text("notes")
+    (root / "empty").write_bytes(b"")
+    return root
+
+
+@pytest.fixture
+def backup(tmp_path):
+    repository = Repository(tmp_path / "repo").init()
+    with HashCache(tmp_path / "hashes.sqlite3") as hashes:
+        yield Backup(repository, jobs=1, hashes=hashes)
+    repository.close()
+
+
+def create(backup, source):
+    with AtomicWriter() as writer:
+        return backup.create([source], writer)
+
+
+def read_tree(root):
+    return {
+        os.path.relpath(os.path.join(path, name), root): Path(path, name).read_bytes()
+        for path, _, names in os.walk(root)
+        for name in names
+    }
+
+
+def test_create_restore_round_trip(backup, source, tmp_path):
+    name, stats = create(backup, source)
+    assert backup.repository.get_snapshots() == [name]
+    assert (stats["files"], stats["changed"], stats["read"]) == (3, 3, 100_005)
+    assert stats["chunks"] == 2
+
+    target = tmp_path / "restored"
+    assert backup.restore(name, target) == 3
+    assert read_tree(target / str(source).lstrip(os.sep)) == read_tree(source)
+
+    target = tmp_path / "partial"
+    assert backup.restore(name, target, include=[source / "album"]) == 1
+    assert list(read_tree(target)) == [os.path.join(str(source).lstrip(os.sep), "album", "track.flac")]
+
+
+def test_unchanged_files_are_reused(backup, source, tmp_path):
+    create(backup, source)
+    track = source / "album" / "track.flac"
+    # same content, new modification time: reused from its digest
+    os.utime(track, ns=(0, 1_000_000_000))
+    (source / "notes.txt").write_text("edited")
+    name, stats = create(backup, source)
+    assert (stats["files"], stats["changed"], stats["read"]) == (3, 1, 6)
+    assert stats["chunks"] == 1
+
+    target = tmp_path / "restored"
+    backup.restore(name, target)
+    assert read_tree(target / str(source).lstrip(os.sep)) == read_tree(source)
+
+
+def test_list_snapshots(backup, source, capsys):
+    from media_tools.backup.apps import BackupApp
+
+    name, _ = create(backup, source)
+    header = backup.repository.read_snapshot_header(name)
+    assert header["sources"] == [str(source)]
+
+    app = BackupApp()
+    app.load()
+    app.dispatch(argv=[str(backup.repository.path), "--list"])
+    assert capsys.readouterr().out == f"{name}  {header['time']}  {source}\n"
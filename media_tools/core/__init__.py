@@ -2,5 +2,7 @@ from .app import action, App, FilesApp
 from .apps import Apps, apps
 from .loader import Loader
 from .logs import logs
+from .progress import Progress
+from .resources import Resources
 
-__all__ = ("action", "App", "FilesApp", "Apps", "apps", "Loader", "logs")
+__all__ = ("action", "App", "FilesApp", "Apps", "apps", "Loader", "logs", "Progress", "Resources")
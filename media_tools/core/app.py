@@ -1,7 +1,13 @@
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import inspect
 from pathlib import Path
 
+from .build import BuildCache
+from .files import InputFile, map_ordered
 from .logs import logs
+from .writer import AtomicWriter
 
 
 __all__ = ("action", "AppMeta", "App", "FilesApp")
@@ -68,7 +74,8 @@ class App(metaclass=AppMeta):
     """ConfigFile instance.
 
     If provided, add ``--config`` argument and load config as
-    ``context['conf']`` into application's context.
+    ``context['conf']`` into application's context. Configuration can be
+    validated by providing a pydantic model to the ConfigFile.
     """
 
     def load(self, subparsers=None):
@@ -102,6 +109,14 @@ class App(metaclass=AppMeta):
         context = self.get_context(argv=argv, **kwargs)
         return self.run(**context)
 
+    async def adispatch(self, argv=None, **kwargs):
+        """Dispatch application from inside a running event loop, awaiting
+        ``run()`` result when it is a coroutine."""
+        result = self.dispatch(argv=argv, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
     def get_context(self, argv=None, **kwargs):
         """From provided command line argument, return a dictionnary used as
         context passed down to ``run``.
@@ -125,19 +140,31 @@ class App(metaclass=AppMeta):
         if not conf and not no_exc:
             lookups = lookups or self.config_file.lookups
             raise RuntimeError(
-                f"Configuration file not found. Looking up for **{'**, **'.join(lookups)}**; in "
-                f"**{'**, **'.join(self.config_file.get_paths())}"
+                f"Configuration file not found. Looking up for **{'**, **'.join(str(p) for p in lookups)}**; in "
+                f"**{'**, **'.join(str(p) for p in self.config_file.get_paths())}**"
             )
         return conf
 
     def run(self, **context):
         """By default, lookup for actions, and run them all by order of
-        declaration."""
+        declaration.
+
+        Actions can be coroutine functions: in such case, return a
+        coroutine running remaining actions in order.
+        """
         context.setdefault("_context", {})
-        for action in self.actions.values():
-            value = context.get(action["name"], None)
-            if value is not None:
-                action["func"](self, **context)
+        actions = [action for action in self.actions.values() if context.get(action["name"], None) not in (None, False)]
+        for index, action in enumerate(actions):
+            result = action["func"](self, **context)
+            if inspect.isawaitable(result):
+                return self._arun_actions(result, actions[index + 1 :], context)
+
+    async def _arun_actions(self, awaitable, actions, context):
+        await awaitable
+        for action in actions:
+            result = action["func"](self, **context)
+            if inspect.isawaitable(result):
+                await result
 
 
 class FilesApp(App):
@@ -145,7 +172,9 @@ class FilesApp(App):
     to work with it:
 
     - command line argument `sources`;
-    - context `files`: files read from sources
+    - command line argument `--jobs`: number of files processed concurrently;
+    - context `files`: files read from sources (or lazy handles);
+    - `map` method to process files concurrently;
     - save method.
     """
 
@@ -159,31 +188,93 @@ class FilesApp(App):
     read_files_into = "files"
     """Files will be passed to context with this parameter name, as a dict of
     ``{path: content}``."""
-    read_content_arg = "sources"
+    stream_inputs = False
+    """If True, files are not read on ``get_context``: they are passed as
+    ``{path: InputFile}`` lazy handles instead of their content."""
+    executor_class = ThreadPoolExecutor
+    """Executor used by ``map`` when processing files concurrently. Use
+    ``ProcessPoolExecutor`` for CPU-bound processing (the mapped function
+    must then be picklable)."""
+    build_cache = False
+    """If True, use a build cache in order to skip processing of unchanged
+    inputs (see ``get_build_units``). Adds ``--no-cache`` argument."""
+    build_cache_ignore = (
+        "sources",
+        "files",
+        "jobs",
+        "no_cache",
+        "app",
+        "apps",
+        "resources",
+        "metrics",
+        "quiet",
+        "buffered",
+    )
+    """Context values that are not part of the build cache key."""
 
     def init_parser(self, parser):
         super().init_parser(parser)
         parser.add_argument("sources", nargs="+", type=Path, metavar="SOURCES", help="Input files.")
+        parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of files processed concurrently.")
+        if self.build_cache:
+            parser.add_argument("--no-cache", action="store_true", help="Process all files, even unchanged ones.")
 
-    def get_context(self, **kwargs):
+    def dispatch(self, argv=None, **kwargs):
+        """Dispatch application. When build cache is used, skip run if all
+        inputs are unchanged, and record results once run is done."""
+        context = self.get_context(argv=argv, **kwargs)
+        cache = context.get("build_cache")
+        if cache is None:
+            return self.run(**context)
+
+        if not context[self.read_files_into]:
+            cache.report()
+            cache.close()
+            return None
+        result = self.run(**context)
+        if inspect.isawaitable(result):
+            return self._acommit(result, cache)
+        cache.commit()
+        cache.report()
+        cache.close()
+        return result
+
+    async def _acommit(self, awaitable, cache):
+        result = await awaitable
+        cache.commit()
+        cache.report()
+        cache.close()
+        return result
+
+    def get_context(self, argv=None, **kwargs):
         """Remove missing files from sources and read files (returned as
         context ``files`` value)."""
+        kwargs = super().get_context(argv=argv, **kwargs)
         paths = list(self.iter_input_paths(kwargs))
 
         # missing files
-        missings = {path for path in paths if not path[0].exists()}
+        missings = {path for path, _ in paths if not path.exists()}
         if missings:
             lst = "\n".join(f" - {p}" for p in missings)
             logs.warn(f"Following sources are missing and wont be proceed:\n{lst}")
-            paths = [path for path, _ in paths if path not in missings]
+            paths = [(path, mode) for path, mode in paths if path not in missings]
+
+        # unchanged files
+        if self.build_cache and not kwargs.get("no_cache"):
+            cache = BuildCache.for_app(self, kwargs, self.build_cache_ignore)
+            fresh = set()
+            for inputs, outputs in self.get_build_units([path for path, _ in paths], kwargs):
+                if cache.add(inputs, outputs):
+                    fresh.update(inputs)
+            paths = [(path, mode) for path, mode in paths if path not in fresh]
+            kwargs["build_cache"] = cache
 
         # source files
-        files = {}
-        for path, mode in paths:
-            with path.open(mode) as f:
-                files[path] = self.read_file(f)
-        kwargs[self.read_content_arg] = files
-        return super().get_context(**kwargs)
+        files = {path: InputFile(path, mode, self.read_file) for path, mode in paths}
+        if not self.stream_inputs:
+            files = dict(zip(files.keys(), self.map(InputFile.read, ((f,) for f in files.values()), kwargs)))
+        kwargs[self.read_files_into] = files
+        return kwargs
 
     def iter_input_paths(self, kwargs):
         for name in self.read_files_from:
@@ -193,7 +284,7 @@ class FilesApp(App):
 
             value = kwargs.get(name)
             if value:
-                self._iter_as_paths(value, mode)
+                yield from self._iter_as_paths(value, mode)
 
     def _iter_as_paths(self, value, mode):
         if isinstance(value, str):
@@ -202,23 +293,50 @@ class FilesApp(App):
             yield (value, mode)
         else:
             for val in value:
-                self._iter_as_paths(val)
+                yield from self._iter_as_paths(val, mode)
+
+    def get_build_units(self, paths, context):
+        """Return build units as a list of ``(inputs, outputs)`` files. When
+        a unit's inputs and outputs did not change since its last run, its
+        inputs are removed from the context's files.
+
+        By default, each file is updated in place.
+        """
+        return [((path,), (path,)) for path in paths]
+
+    def map(self, func, items, context=None, jobs=None):
+        """Yield ``func(*item)`` for each item in order. Items are processed
+        concurrently when ``--jobs`` is greater than 1.
+
+        :param callable func: function to call
+        :param Iterable[tuple] items: function call arguments
+        :param dict context: read ``jobs`` from this context
+        :param int jobs: number of workers (override context value)
+        """
+        if jobs is None:
+            jobs = context.get("jobs", 1) if context else 1
+        return map_ordered(func, items, jobs, self.executor_class)
 
     def read_file(self, file):
         """Return content of provided file."""
         return file.read()
 
-    def save(self, files, originals=None, mode="w"):
-        """Save provided files to disk.
+    def save(self, files, originals=None, mode="w", fsync=True):
+        """Save provided files to disk. Files are written concurrently and
+        atomically (see ``AtomicWriter``).
 
         :param {str: []} files: files to save to disk
         :param {str: []} originals: if provided only save file if different
+        :param bool fsync: flush written files to disk.
         """
         originals = originals or {}
-        for path, value in files.items():
-            if value != originals.get(path):
-                with path.open(mode) as f:
-                    self.write_file(f, value)
+        items = (
+            (path, functools.partial(self.write_file, value=value))
+            for path, value in files.items()
+            if value != originals.get(path)
+        )
+        with AtomicWriter(fsync=fsync) as writer:
+            return writer.write_many(items, mode)
 
     def write_file(self, file, value):
         """Write ``value`` to file stream."""
@@ -1,8 +1,15 @@
+import asyncio
+import atexit
+from contextlib import contextmanager
+import inspect
 from pathlib import Path
 
 from .loader import Loader
 from .app import action, App
 from .logs import logs
+from .daemon import ServeApp
+from .resources import Resources
+from .script import ScriptApp
 
 
 __all__ = (
@@ -25,10 +32,15 @@ class Apps(App):
     """ArgumentParser's subparsers."""
     apps = {}
     """Registered applications."""
+    resources: Resources = None
+    """Shared asynchronous resources, passed down to applications context."""
+    runner: asyncio.Runner = None
+    """Event loop runner used to run coroutine applications."""
 
     def __init__(self, children=None, loader=None):
         self.loader = loader
         self.apps = {}
+        self.resources = Resources()
         if children:
             for app in children:
                 self.register(app=app)
@@ -60,13 +72,36 @@ class Apps(App):
     def get(self, name):
         """Get application for the provided name.
 
-        If not found, load it.
+        If not found, load it (when a loader is provided).
         """
-        if name not in self.apps:
+        if name not in self.apps and self.loader:
             package = self.loader.load(name + ".apps")
             package and self.load_package(package)
         return self.apps.get(name)
 
+    def get_from_argv(self, argv):
+        """Get application from command line arguments: first one that is
+        not an option nor the value of ``--metrics`` (global options can
+        precede application's name)."""
+        return self._find_app(argv)[1]
+
+    def _find_app(self, argv):
+        """Return ``(index, app)`` of application in arguments."""
+        for index, arg in enumerate(argv):
+            if arg.startswith("-"):
+                continue
+            if (app := self.get(arg)) or not index or argv[index - 1] != "--metrics":
+                return index, app
+        return len(argv), None
+
+    def get_context(self, argv=None, **kwargs):
+        if argv:
+            # bare "--metrics" followed by application's name must not take it as value
+            index, app = self._find_app(argv)
+            if app and index and argv[index - 1] == "--metrics":
+                argv = [*argv[: index - 1], "--metrics=-", *argv[index:]]
+        return super().get_context(argv=argv, **kwargs)
+
     def load_all(self):
         if not self.subparsers:
             self.load()
@@ -100,14 +135,89 @@ class Apps(App):
         for app in self.apps.values():
             app.load(subparsers=self.subparsers)
 
+    def init_parser(self, parser):
+        super().init_parser(parser)
+        parser.add_argument(
+            "--metrics",
+            nargs="?",
+            const="-",
+            metavar="FILE",
+            help="Emit metrics as JSON lines into this file (default to stderr), with a summary.",
+        )
+        parser.add_argument(
+            "-q", "--quiet", action="count", default=0, help="Drop per-item lines (twice: drop informations too)."
+        )
+        parser.add_argument("--buffered", action="store_true", help="Write logs by batch from a background thread.")
+
     def dispatch(self, argv=None, app=None, **kwargs):
+        """Dispatch to application.
+
+        When application returns a coroutine, run it in Apps' event loop.
+        """
+        if app is None and argv:
+            app = self.get_from_argv(argv)
+        context = self.get_context(argv=argv, app=app, **kwargs)
+        with self.logs_options(**context):
+            result = self.run(**context)
+            if inspect.isawaitable(result):
+                result = self.run_async(result)
+        return result
+
+    async def adispatch(self, argv=None, app=None, **kwargs):
         if app is None and argv:
-            app = self.get(argv[0])
-        return super().dispatch(argv=argv, app=app, **kwargs)
+            app = self.get_from_argv(argv)
+        context = self.get_context(argv=argv, app=app, **kwargs)
+        with self.logs_options(**context):
+            result = self.run(**context)
+            if inspect.isawaitable(result):
+                result = await result
+        return result
+
+    @contextmanager
+    def logs_options(self, metrics=None, quiet=0, buffered=False, **_):
+        """Apply global logging options for the duration of a command, then
+        restore logs state (the process may serve other commands)."""
+        prev_quiet = logs.quiet
+        if metrics:
+            logs.metrics.open(metrics)
+        if quiet:
+            logs.quiet = quiet
+        if buffered:
+            logs.start_buffer()
+        try:
+            yield
+        finally:
+            if buffered:
+                logs.stop_buffer()
+            if metrics:
+                logs.metrics.close()
+            logs.quiet = prev_quiet
+
+    def run_async(self, awaitable):
+        """Run awaitable in event loop and return its result.
+
+        The loop is created on first call and kept until ``close()``.
+        """
+        if self.runner is None:
+            self.runner = asyncio.Runner()
+            atexit.register(self.close)
+        return self.runner.run(self._await(awaitable))
+
+    async def _await(self, awaitable):
+        return await awaitable
+
+    def close(self):
+        """Close shared resources and event loop."""
+        if self.runner is None:
+            return
+        atexit.unregister(self.close)
+        self.runner.run(self.resources.aclose())
+        self.runner.close()
+        self.runner = None
 
-    def run(self, app=None, **kwargs):
+    def run(self, app=None, metrics=None, quiet=0, buffered=False, **kwargs):
         if app:
-            return app.dispatch(**kwargs)
+            return app.dispatch(apps=self, resources=self.resources, **kwargs)
         return super().run(**kwargs)
 
     @action("actions", action="store_true", help="List available subcommands")
@@ -126,4 +236,4 @@ class Apps(App):
                 )
 
 
-apps = Apps(loader=Loader("apps", search_paths))
+apps = Apps(children=(ScriptApp(), ServeApp()), loader=Loader("apps", search_paths))
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+
+from .dirs import get_cache_dir
+from .hashing import hash_file, HashCache
+from .logs import logs
+
+
+__all__ = ("file_digest", "BuildCache")
+
+
+def file_digest(path, hashes=None, stat=None):
+    """Return hex digest of file's content, from ``hashes`` cache when
+    provided (see ``HashCache``).
+
+    :param Path path: file path.
+    :param HashCache hashes: digests cache.
+    :param os.stat_result stat: file's stat, if already known.
+    """
+    if hashes is None:
+        return hash_file(path)
+    return hashes.get(path, stat)
+
+
+class BuildCache:
+    """Make-style results cache, used to skip processing of unchanged inputs.
+
+    A build unit is a set of input files producing a set of output files
+    for a given application and arguments. It is considered fresh (and
+    skipped) when inputs and outputs are the same as recorded on its last
+    processing. Files are compared by modification time and size, and by
+    content digest when those differ. Digests are taken from the user's
+    ``HashCache``: unchanged files are not read again.
+
+    Usage:
+
+    - ``add()`` units of the run: return True when unit is fresh;
+    - once processed and saved, ``commit()`` records stale units.
+    """
+
+    def __init__(self, path, key=""):
+        """
+        :param Path path: cache file path.
+        :param str key: run key (digest of application name, actions and arguments).
+        """
+        self.path = Path(path)
+        self.key = key
+        self.entries = None
+        self.pending = []
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._hashes = None
+
+    @classmethod
+    def for_app(cls, app, context, ignore=tuple()):
+        """Return build cache for the provided application and run context.
+
+        :param App app: application.
+        :param dict context: run context: values (except ``ignore`` keys) are part of the run key.
+        :param Iterable[str] ignore: ignore those context keys.
+        """
+        args = {k: v for k, v in context.items() if k not in ignore and not k.startswith("_")}
+        args = json.dumps(args, default=str, sort_keys=True)
+        key = hashlib.blake2b(f"{app.name}\n{args}".encode(), digest_size=16).hexdigest()
+        return cls(get_cache_dir("build") / f"{app.name}.json", key)
+
+    @property
+    def hashes(self):
+        if self._hashes is None:
+            self._hashes = HashCache()
+        return self._hashes
+
+    def close(self):
+        """Close digests cache."""
+        if self._hashes is not None:
+            self._hashes.close()
+            self._hashes = None
+
+    def load(self):
+        if self.entries is None:
+            try:
+                with self.path.open() as stream:
+                    self.entries = json.load(stream)
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    def get_unit_key(self, inputs, outputs):
+        names = "\n".join(str(Path(p).absolute()) for p in (*inputs, "", *outputs))
+        return hashlib.blake2b(f"{self.key}\n{names}".encode(), digest_size=16).hexdigest()
+
+    def add(self, inputs, outputs):
+        """Add a build unit. Return True if it is fresh (can be skipped).
+
+        :param [Path] inputs: input files.
+        :param [Path] outputs: output files.
+        """
+        key = self.get_unit_key(inputs, outputs)
+        entry = self.load().get(key)
+        if entry and self.is_fresh(entry["inputs"], inputs) and self.is_fresh(entry["outputs"], outputs):
+            self.hits += 1
+            logs.count("files.cache_hits")
+            return True
+
+        with self.lock:
+            self.pending.append((key, tuple(inputs), tuple(outputs)))
+        self.misses += 1
+        logs.count("files.cache_misses")
+        return False
+
+    def is_fresh(self, recorded, paths):
+        """Return True if files have the same state as recorded."""
+        if len(recorded) != len(paths):
+            return False
+        for path in paths:
+            path = str(path)
+            if (sig := recorded.get(path)) is None:
+                return False
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return False
+            if [stat.st_mtime_ns, stat.st_size] == sig[:2]:
+                continue
+            if stat.st_size != sig[1] or file_digest(path, self.hashes, stat) != sig[2]:
+                return False
+            sig[0] = stat.st_mtime_ns
+        return True
+
+    def get_signatures(self, paths):
+        signatures = {}
+        for path in paths:
+            stat = os.stat(path)
+            signatures[str(path)] = [stat.st_mtime_ns, stat.st_size, file_digest(path, self.hashes, stat)]
+        return signatures
+
+    def commit(self):
+        """Record pending units' current state and save cache to disk."""
+        entries = self.load()
+        with self.lock:
+            pending, self.pending = self.pending, []
+        for key, inputs, outputs in pending:
+            try:
+                entries[key] = {"inputs": self.get_signatures(inputs), "outputs": self.get_signatures(outputs)}
+            except FileNotFoundError:
+                entries.pop(key, None)
+        self.save()
+
+    def save(self):
+        if self.entries is None:
+            return
+        try:
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp.open("w") as stream:
+                json.dump(self.entries, stream)
+            tmp.replace(self.path)
+        except OSError as err:
+            logs.warn(f"Can't save build cache {self.path}: {err}")
+
+    def report(self):
+        """Log cache statistics (if any build unit)."""
+        if self.hits or self.misses:
+            logs.info(f"Build cache: {self.hits} unchanged (skipped), {self.misses} processed.")
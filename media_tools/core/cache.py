@@ -0,0 +1,76 @@
+from collections import OrderedDict
+import os
+from pathlib import Path
+import threading
+
+
+__all__ = ("FileCache",)
+
+
+class FileCache:
+    """Keep values computed from files in memory, invalidated when the file
+    changes (modification time, size or inode).
+
+    Caching is only relevant for long-lived processes (such as ``mt serve``):
+    it is disabled until ``FileCache.enabled`` is set to True.
+    """
+
+    enabled = False
+    """Enable all file caches."""
+    maxsize = 32
+    """Maximum number of cached files (least recently used are dropped)."""
+
+    def __init__(self, maxsize=None):
+        if maxsize:
+            self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_signature(path):
+        """Return signature used to detect file changes, or None if the file
+        does not exist."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def get(self, path, load):
+        """Return value for provided path, calling ``load()`` when the file
+        is not cached or has changed.
+
+        :param Path path: file path.
+        :param callable load: compute value (called without argument).
+        """
+        if not self.enabled:
+            return load()
+
+        key = Path(path).absolute()
+        signature = self.get_signature(key)
+        with self.lock:
+            item = self.items.get(key)
+            if item and signature is not None and item[0] == signature:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return item[1]
+
+        self.misses += 1
+        value = load()
+        if signature is not None:
+            with self.lock:
+                self.items[key] = (signature, value)
+                self.items.move_to_end(key)
+                while len(self.items) > self.maxsize:
+                    self.items.popitem(last=False)
+        return value
+
+    def invalidate(self, path=None):
+        """Drop cached value for path, or all values if no path is given."""
+        with self.lock:
+            if path is None:
+                self.items.clear()
+            else:
+                self.items.pop(Path(path).absolute(), None)
@@ -1,57 +1,176 @@
+import copy
+import hashlib
+import json
 from pathlib import Path
 import os
+import threading
+
 import yaml
 
+from .dirs import get_cache_dir, get_config_home
 from .logs import logs
 
 
+__all__ = ("ConfigFile",)
+
+
 class ConfigFile:
-    """Base class used to load config files."""
+    """Base class used to load config files.
+
+    Configuration is read from all found files (``lookups`` in config
+    directories), merged by priority (user's over system's over package's
+    ones) then validated using ``model`` if provided.
+
+    The result is cached (in memory and on disk) and keyed by the source
+    files' path and modification time: it is then loaded without parsing
+    YAML while files are not changed. In memory, it is also keyed by
+    model and constructor, and each call returns a copy of it.
+    """
 
     @staticmethod
-    def default_constructor(x):
-        return x
+    def default_constructor(**kwargs):
+        return kwargs
 
     subdir = ""
+    model = None
+    """Pydantic model class used to validate configuration."""
+    cache = True
+    """Cache compiled configuration."""
+
+    _snapshots = {}
+    _lock = threading.Lock()
 
-    def __init__(self, lookups: Path | str | [Path] | None, constructor=None, logs=None):
+    def __init__(self, lookups: Path | str | list[Path] | None, constructor=None, logs=None, model=None, cache=None):
         if isinstance(lookups, (Path, str)):
             self.lookups = [
                 Path(lookups),
             ]
         else:
             self.lookups = tuple(Path(lookup) for lookup in lookups)
-        self.constructor = constructor or self.default_constructor
+        if model is not None:
+            self.model = model
+        if cache is not None:
+            self.cache = cache
+        self.constructor = constructor or self.model or self.default_constructor
 
     def read(self, paths=None):
-        paths = paths or self.get_paths()
-        if not paths:
+        """Read configuration, returning None if no file is found.
+
+        :param [Path] paths: additional configuration files, with higher priority than defaults ones.
+        """
+        layers = self.get_layers(paths)
+        signatures = tuple((str(path), self.get_signature(path)) for path in layers)
+        if not any(sig for _, sig in signatures):
             return None
-        for path in paths:
-            if not path.exists():
+
+        if self.cache:
+            key = (self.model, self.constructor, tuple(path for path, _ in signatures))
+            with self._lock:
+                snapshot = self._snapshots.get(key)
+            if snapshot and snapshot[0] == signatures:
+                return copy.deepcopy(snapshot[1])
+            if (data := self.load_snapshot(signatures)) is None:
+                data = self.compile(layers, signatures)
+            obj = self.get_object(**data)
+            with self._lock:
+                self._snapshots[key] = (signatures, obj)
+            return copy.deepcopy(obj)
+
+        return self.get_object(**self.compile(layers, signatures))
+
+    def compile(self, layers, signatures):
+        """Read, merge and validate configuration files, returning data as a
+        dict."""
+        data = {}
+        for path, (_, sig) in zip(layers, signatures):
+            if sig is None:
                 continue
             try:
                 with path.open() as f:
-                    data = self.parse(f)
-                    return self.get_object(**data)
+                    self.merge(data, self.parse(f) or {})
             except Exception as err:
-                logs.warning(f"Reading file {path} raised an error: {err}")
+                logs.warn(f"Reading file {path} raised an error: {err}")
                 raise
-        return None
+
+        if self.model is not None:
+            data = self.model.model_validate(data).model_dump(mode="json")
+        if self.cache:
+            self.save_snapshot(signatures, data)
+        return data
+
+    def merge(self, data, layer):
+        """Deep merge ``layer`` dict into ``data``."""
+        if not isinstance(layer, dict):
+            raise ValueError("Configuration file must contain a mapping.")
+        for key, value in layer.items():
+            if isinstance(value, dict) and isinstance(data.get(key), dict):
+                self.merge(data[key], value)
+            else:
+                data[key] = value
+        return data
+
+    @staticmethod
+    def get_signature(path):
+        """Return file ``[mtime_ns, size]`` or None if it does not exist."""
+        try:
+            stat = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    # ---- snapshots
+    def get_snapshot_path(self, signatures):
+        key = "\n".join(path for path, _ in signatures)
+        if self.model is not None:
+            key += f"\n{self.model.__module__}.{self.model.__qualname__}"
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return get_cache_dir("config") / f"{digest}.json"
+
+    def load_snapshot(self, signatures):
+        """Return cached configuration data if source files did not change,
+        else None."""
+        try:
+            with self.get_snapshot_path(signatures).open() as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get("signatures") != [list(sig) for sig in signatures]:
+            return None
+        return snapshot.get("data")
+
+    def save_snapshot(self, signatures, data):
+        """Save configuration data into cache (skipped when data can't be
+        serialized to JSON as is)."""
+        try:
+            content = json.dumps({"signatures": signatures, "data": data})
+            path = self.get_snapshot_path(signatures)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(content)
+            tmp.replace(path)
+        except (TypeError, ValueError, OSError):
+            pass
+
+    # ---- paths
+    def get_layers(self, paths=None):
+        """Return configuration file candidates, by increasing priority."""
+        layers = list(self.get_paths())[::-1]
+        if paths:
+            layers += [Path(path) for path in paths]
+        return layers
 
     def get_paths(self):
         return (dir / lookup for dir in self.get_config_dirs() for lookup in self.lookups)
 
     def get_config_dirs(self):
-        user_conf = Path(os.environ.get("XDG_CONFIG_HOME")) or Path.home() / ".config"
+        """Return configuration directories, by decreasing priority."""
         return (
-            user_conf / "media_tools" / self.subdir,
-            "/etc/media_tools" / self.subdir,
-            Path(__file__) / "../../config",
+            get_config_home() / "media_tools" / self.subdir,
+            Path("/etc/media_tools") / self.subdir,
+            Path(__file__).parent.parent / "config" / self.subdir,
         )
 
     def parse(self, value):
-        return yaml.load(value)
+        return yaml.load(value, Loader=yaml.SafeLoader)
 
     def get_object(self, **kwargs):
         return self.constructor(**kwargs)
@@ -0,0 +1,263 @@
+import contextlib
+import io
+import json
+import os
+from pathlib import Path
+import socket
+import struct
+import sys
+import threading
+import traceback
+
+from .app import App
+from .cache import FileCache
+from .logs import logs
+
+
+__all__ = ("get_socket_path", "check_owner", "SocketWriter", "Server", "Client", "ServeApp")
+
+
+def get_socket_path():
+    """Return default daemon socket path (``MT_SOCKET`` environment variable
+    if provided).
+
+    The socket is created in a private directory, under ``XDG_RUNTIME_DIR``
+    when available.
+    """
+    if path := os.environ.get("MT_SOCKET"):
+        return Path(path)
+    if runtime_dir := os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(runtime_dir) / "media_tools" / "mt.sock"
+    return Path(f"/tmp/media_tools-{os.getuid()}") / "mt.sock"
+
+
+def check_owner(path, private=False):
+    """Raise PermissionError if path is not owned by current user (or if
+    ``private`` and group or others have access to it)."""
+    stat = os.lstat(path)
+    if stat.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not owned by current user.")
+    if private and stat.st_mode & 0o077:
+        raise PermissionError(f"{path} is accessible by other users.")
+
+
+# Response frames: channel (1 byte) + payload length (4 bytes) + payload.
+FRAME_HEADER = struct.Struct(">cI")
+STDOUT, STDERR, EXIT = b"o", b"e", b"x"
+
+
+def send_frame(conn, channel, data):
+    conn.sendall(FRAME_HEADER.pack(channel, len(data)) + data)
+
+
+def recv_exactly(conn, size):
+    chunks = []
+    while size:
+        chunk = conn.recv(size)
+        if not chunk:
+            raise ConnectionError("Connection closed by server.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class SocketWriter(io.TextIOBase):
+    """Text stream sending written data to client as frames."""
+
+    def __init__(self, conn, channel, tty=False):
+        self.conn = conn
+        self.channel = channel
+        self.tty = tty
+        self.lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, text):
+        if text:
+            with self.lock:
+                send_frame(self.conn, self.channel, text.encode("utf-8"))
+        return len(text)
+
+
+class Server:
+    """Serve commands from a Unix socket using a resident ``Apps`` instance.
+
+    Requests are handled one at a time, since the working directory and
+    standard streams are process-wide.
+    """
+
+    def __init__(self, apps, path=None):
+        self.apps = apps
+        self.path = Path(path or get_socket_path())
+        self.running = False
+
+    def serve(self):
+        """Bind socket and serve requests until stopped."""
+        if Client.connect(self.path):
+            raise RuntimeError(f"A server is already running on {self.path}.")
+        if self.path == get_socket_path() and not os.environ.get("MT_SOCKET"):
+            # default socket is in a private directory
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            check_owner(self.path.parent, private=True)
+        self.path.unlink(missing_ok=True)
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            # socket is created with 0600 mode, instead of being reachable
+            # until chmod
+            umask = os.umask(0o177)
+            try:
+                sock.bind(str(self.path))
+            finally:
+                os.umask(umask)
+            sock.listen()
+            logs.info(f"Serving on {self.path}")
+            self.running = True
+            while self.running:
+                conn, _ = sock.accept()
+                with conn:
+                    self.handle(conn)
+        finally:
+            sock.close()
+            self.path.unlink(missing_ok=True)
+
+    def handle(self, conn):
+        """Handle a single client request."""
+        try:
+            with conn.makefile("rb") as stream:
+                request = json.loads(stream.readline())
+        except (OSError, ValueError) as err:
+            logs.warn(f"Invalid request: {err}")
+            return
+
+        if request.get("stop"):
+            self.running = False
+            send_frame(conn, EXIT, b"0")
+            return
+
+        tty = request.get("tty", False)
+        stdout, stderr = SocketWriter(conn, STDOUT, tty), SocketWriter(conn, STDERR, tty)
+        try:
+            code = self.run(request.get("argv", []), request.get("cwd"), stdout, stderr)
+            send_frame(conn, EXIT, str(code).encode())
+        except OSError:
+            # client disconnected
+            pass
+
+    def run(self, argv, cwd, stdout, stderr):
+        """Run command and return its exit code."""
+        prev_cwd = os.getcwd()
+        code = 0
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            sys.stdin, stdin = io.StringIO(), sys.stdin
+            try:
+                cwd and os.chdir(cwd)
+                self.apps.dispatch(argv=argv)
+            except SystemExit as err:
+                code = err.code if isinstance(err.code, int) else (1 if err.code else 0)
+                if isinstance(err.code, str):
+                    print(err.code, file=sys.stderr)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                self.reset()
+                sys.stdin = stdin
+                os.chdir(prev_cwd)
+        return code
+
+    def reset(self):
+        """Reset per-command state."""
+        logs.stop_buffer()
+        logs.metrics.close()
+        logs.metrics.reset()
+        logs.quiet = 0
+        sys.stdout.flush()
+
+
+class Client:
+    """Forward commands to a running server."""
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    @classmethod
+    def connect(cls, path=None):
+        """Return a client connected to the server, or None if no server is
+        running or if the socket is not owned by current user."""
+        path = Path(path or get_socket_path())
+        if not path.exists():
+            return None
+        try:
+            check_owner(path)
+        except PermissionError as err:
+            logs.warn(f"{err} Ignored.", format=False)
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(path))
+        except OSError:
+            sock.close()
+            return None
+        return cls(sock)
+
+    def request(self, argv=None, cwd=None, stop=False):
+        """Send command to server, writing its output to standard streams.
+
+        :return the command's exit code.
+        """
+        if stop:
+            request = {"stop": True}
+        else:
+            request = {"argv": list(argv or []), "cwd": str(cwd or os.getcwd()), "tty": sys.stdout.isatty()}
+        streams = {STDOUT: sys.stdout, STDERR: sys.stderr}
+        with self.sock:
+            self.sock.sendall(json.dumps(request).encode() + b"\n")
+            while True:
+                channel, size = FRAME_HEADER.unpack(recv_exactly(self.sock, FRAME_HEADER.size))
+                data = recv_exactly(self.sock, size)
+                if channel == EXIT:
+                    return int(data)
+                stream = streams[channel]
+                stream.write(data.decode("utf-8"))
+                stream.flush()
+
+
+class ServeApp(App):
+    name = "serve"
+    label = "Serve"
+    help = "Run commands from a resident server."
+    description = (
+        "Keep applications loaded in a server process listening on a Unix socket. While it runs, `mt` "
+        "forwards commands to it (set `MT_NO_DAEMON=1` to disable). Interactive prompts are not supported."
+    )
+
+    def init_parser(self, parser):
+        super().init_parser(parser)
+        parser.add_argument("--socket", type=Path, help="Socket path.")
+        parser.add_argument("--stop", action="store_true", help="Stop running server.")
+
+    def run(self, socket=None, stop=False, apps=None, **kwargs):
+        if stop:
+            if client := Client.connect(socket):
+                return client.request(stop=True)
+            logs.warn("No server is running.")
+            return
+
+        if apps is None:
+            from .apps import apps
+
+        apps.load_all()
+        FileCache.enabled = True
+        try:
+            Server(apps, socket).serve()
+        except KeyboardInterrupt:
+            logs.info("Server stopped.")
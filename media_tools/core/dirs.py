@@ -0,0 +1,30 @@
+import os
+from pathlib import Path
+
+
+__all__ = ("get_config_home", "get_cache_dir")
+
+
+def get_config_home():
+    """Return user configuration directory (``XDG_CONFIG_HOME`` or
+    ``~/.config``)."""
+    if path := os.environ.get("XDG_CONFIG_HOME"):
+        return Path(path)
+    return Path.home() / ".config"
+
+
+def get_cache_dir(*parts, create=True):
+    """Return media tools' user cache directory (under ``XDG_CACHE_HOME`` or
+    ``~/.cache``), joined with provided parts.
+
+    :param *parts: sub-directories.
+    :param bool create: create directory if it does not exist.
+    """
+    if path := os.environ.get("XDG_CACHE_HOME"):
+        path = Path(path)
+    else:
+        path = Path.home() / ".cache"
+    path = path.joinpath("media_tools", *parts)
+    if create:
+        path.mkdir(parents=True, exist_ok=True)
+    return path
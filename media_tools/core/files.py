@@ -0,0 +1,250 @@
+from collections import deque
+from contextlib import contextmanager
+import errno
+import mmap as mmap_
+import os
+from pathlib import Path
+
+
+__all__ = ("InputFile", "map_ordered", "list_dir", "walk_files", "is_same_file", "copy_file")
+
+
+class InputFile:
+    """Lazy handle on an input file.
+
+    File content is only read when required, using ``read()``, ``lines()``
+    or ``mmap()``.
+    """
+
+    __slots__ = ("path", "mode", "reader")
+
+    def __init__(self, path, mode="r", reader=None):
+        """
+        :param Path path: file path.
+        :param str mode: reading mode.
+        :param callable reader: if provided, ``read()`` returns ``reader(file)``.
+        """
+        self.path = Path(path)
+        self.mode = mode
+        self.reader = reader
+
+    @property
+    def size(self):
+        return self.path.stat().st_size
+
+    def open(self):
+        """Open and return file stream."""
+        return self.path.open(self.mode)
+
+    def read(self):
+        """Read and return file content (using ``reader`` if any)."""
+        with self.open() as stream:
+            return self.reader(stream) if self.reader else stream.read()
+
+    def lines(self):
+        """Yield file lines lazily, without line endings."""
+        with self.open() as stream:
+            for line in stream:
+                yield line.rstrip("\r\n") if isinstance(line, str) else line.rstrip(b"\r\n")
+
+    @contextmanager
+    def mmap(self):
+        """Context manager providing a read-only memory map of the file (empty
+        bytes for empty files)."""
+        with self.path.open("rb") as stream:
+            if not self.size:
+                yield b""
+                return
+            with mmap_.mmap(stream.fileno(), 0, access=mmap_.ACCESS_READ) as buffer:
+                yield buffer
+
+    def __fspath__(self):
+        return str(self.path)
+
+    def __repr__(self):
+        return f"<InputFile {self.path}>"
+
+
+def map_ordered(func, items, jobs=1, executor_class=None):
+    """Yield ``func(*item)`` for each item, preserving items' order.
+
+    When ``jobs > 1``, items are processed concurrently using an executor
+    (threads by default). At most ``2 * jobs`` items are in flight at once,
+    so that results are streamed and inputs are not all loaded in memory.
+
+    :param callable func: function to call.
+    :param Iterable[tuple] items: function arguments.
+    :param int jobs: number of workers.
+    :param executor_class: ``concurrent.futures`` executor class.
+    """
+    if jobs is None or jobs <= 1:
+        for item in items:
+            yield func(*item)
+        return
+
+    if executor_class is None:
+        from concurrent.futures import ThreadPoolExecutor as executor_class
+
+    with executor_class(jobs) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, *item))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def list_dir(path, stats=False):
+    """Return directory's entries as a list of ``(name, is_dir, stat)``, or
+    None if it can't be read.
+
+    :param str path: directory path.
+    :param bool stats: get files' ``stat_result`` (one more syscall per file).
+    """
+    items = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                is_dir = entry.is_dir()
+                try:
+                    stat = entry.stat() if stats and not is_dir else None
+                except OSError:
+                    # broken symlink
+                    continue
+                items.append((entry.name, is_dir, stat))
+    except OSError:
+        return None
+    return items
+
+
+def walk_files(roots, jobs=8):
+    """Yield ``(directory, name, stat)`` of files under provided
+    directories. Directories of a same depth are listed concurrently.
+
+    :param Iterable[str] roots: directories to walk.
+    :param int jobs: number of threads.
+    """
+    dirs = [str(root) for root in roots]
+    while dirs:
+        subdirs = []
+        for path, entries in zip(dirs, map_ordered(list_dir, ((d, True) for d in dirs), jobs)):
+            for name, is_dir, stat in entries or ():
+                if is_dir:
+                    subdirs.append(os.path.join(path, name))
+                else:
+                    yield path, name, stat
+        dirs = subdirs
+
+
+def is_same_file(src, dst, tolerance=2_000_000_000):
+    """Return True if both stats have the same size and modification time.
+
+    :param os.stat_result src: source stat.
+    :param os.stat_result dst: destination stat.
+    :param int tolerance: mtime tolerance in nanoseconds (FAT filesystems store it with 2 seconds precision).
+    """
+    return src.st_size == dst.st_size and abs(src.st_mtime_ns - dst.st_mtime_ns) < tolerance
+
+
+def copy_file(src, dst, resume=True, chunk_size=1 << 26, digest=None):
+    """Copy file content and modification time, using kernel zero-copy
+    (``copy_file_range``, then ``sendfile``) when available. Return number
+    of copied bytes.
+
+    Content is copied into a ``.{name}.part`` file renamed once done. When
+    ``resume`` is set, an existing part file from an interrupted copy is
+    completed instead of restarted. The part file is given source's
+    modification time when interrupted: it is only resumed if it matches
+    (same source version), otherwise the copy starts over.
+
+    When ``digest`` is provided, content is copied through user space and
+    hashed on the way, so that it is read only once.
+
+    :param Path src: source file.
+    :param Path dst: destination file.
+    :param bool resume: resume interrupted copy.
+    :param int chunk_size: maximum number of bytes copied by syscall.
+    :param digest: hash object (``hashlib``) updated with whole source content.
+    """
+    dst = Path(dst)
+    tmp = dst.with_name(f".{dst.name}.part")
+    fd_in = os.open(src, os.O_RDONLY)
+    try:
+        stat = os.fstat(fd_in)
+        fd_out = os.open(tmp, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            part = os.fstat(fd_out)
+            offset = part.st_size if resume and part.st_mtime_ns == stat.st_mtime_ns else 0
+            if offset > stat.st_size or not offset:
+                offset = 0
+                os.ftruncate(fd_out, 0)
+            if digest is None:
+                copied = _copy_range(fd_in, fd_out, offset, stat.st_size, chunk_size)
+            else:
+                copied = _copy_hashed(fd_in, fd_out, offset, stat.st_size, digest)
+        finally:
+            os.close(fd_out)
+            # source signature, also when interrupted
+            os.utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    finally:
+        os.close(fd_in)
+
+    os.replace(tmp, dst)
+    return copied
+
+
+_zero_copy_errors = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP)
+
+
+def _copy_range(fd_in, fd_out, offset, size, chunk_size):
+    """Copy ``[offset:size]`` bytes range from a file into another one."""
+    start = offset
+    # copy_file_range: same or different filesystems (Linux >= 5.3)
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < size:
+                count = os.copy_file_range(fd_in, fd_out, min(chunk_size, size - offset), offset, offset)
+                if not count:
+                    break
+                offset += count
+            return offset - start
+        except OSError as err:
+            if err.errno not in _zero_copy_errors:
+                raise
+
+    os.lseek(fd_out, offset, os.SEEK_SET)
+    if hasattr(os, "sendfile"):
+        try:
+            while offset < size:
+                count = os.sendfile(fd_out, fd_in, offset, min(chunk_size, size - offset))
+                if not count:
+                    break
+                offset += count
+            return offset - start
+        except OSError as err:
+            if err.errno not in _zero_copy_errors:
+                raise
+        os.lseek(fd_out, offset, os.SEEK_SET)
+
+    os.lseek(fd_in, offset, os.SEEK_SET)
+    while offset < size and (data := os.read(fd_in, min(1 << 20, size - offset))):
+        os.write(fd_out, data)
+        offset += len(data)
+    return offset - start
+
+
+def _copy_hashed(fd_in, fd_out, offset, size, digest):
+    """Copy ``[offset:size]`` bytes range from a file into another one,
+    updating digest with ``[0:size]`` content."""
+    pos = 0
+    os.lseek(fd_in, 0, os.SEEK_SET)
+    os.lseek(fd_out, offset, os.SEEK_SET)
+    while pos < size and (data := os.read(fd_in, min(1 << 20, size - pos))):
+        digest.update(data)
+        if pos + len(data) > offset:
+            view = memoryview(data)[max(offset - pos, 0) :]
+            while view:
+                view = view[os.write(fd_out, view) :]
+        pos += len(data)
+    return max(pos - offset, 0)
@@ -0,0 +1,155 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import mmap
+import os
+import sqlite3
+from pathlib import Path
+
+from .dirs import get_cache_dir
+from .files import map_ordered
+from .logs import logs
+
+
+__all__ = ("hash_file", "HashCache")
+
+
+MMAP_MIN_SIZE = 1 << 22
+"""Files larger than this are hashed from a memory map."""
+READ_SIZE = 1 << 20
+"""Read buffer size for smaller files."""
+
+
+def hash_file(path):
+    """Return blake2b hex digest of file's content (same as
+    ``build.file_digest``).
+
+    Large files are hashed from a memory map in a single call: the hash
+    function then releases the GIL for the whole file, so that threads
+    hash files concurrently.
+    """
+    digest = hashlib.blake2b()
+    with open(path, "rb", buffering=0) as stream:
+        size = os.fstat(stream.fileno()).st_size
+        if size >= MMAP_MIN_SIZE:
+            with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                data.madvise(mmap.MADV_SEQUENTIAL)
+                digest.update(data)
+        else:
+            buffer = bytearray(READ_SIZE)
+            view = memoryview(buffer)
+            while count := stream.readinto(buffer):
+                digest.update(view[:count])
+    return digest.hexdigest()
+
+
+def hash_stat(path):
+    """Return ``(stat, digest)`` of a file (used in worker pools)."""
+    try:
+        return os.stat(path), hash_file(path)
+    except OSError:
+        return None, None
+
+
+class HashCache:
+    """Persistent files content digests, keyed by device and inode, and
+    validated by size and modification time: a file is only hashed again
+    when it changed (a changed entry replaces the previous one).
+
+    Digests are stored as raw bytes in a SQLite table under user cache
+    directory. Missing ones are computed concurrently (see ``get_many``),
+    in threads by default, or processes with ``executor_class``.
+
+    Usage:
+
+    .. code-block:: python
+
+        with HashCache() as hashes:
+            digests = hashes.get_many(paths)
+    """
+
+    jobs = 4
+    """Number of files hashed concurrently."""
+
+    def __init__(self, path=None, jobs=None, executor_class=ThreadPoolExecutor):
+        self.path = Path(path) if path else get_cache_dir() / "hashes.sqlite3"
+        if jobs:
+            self.jobs = jobs
+        self.executor_class = executor_class
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                " dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, digest BLOB,"
+                " PRIMARY KEY (dev, ino)) WITHOUT ROWID"
+            )
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            logs.count("hash.cache_hits", self.hits)
+            logs.count("hash.cache_misses", self.misses)
+            self._db.close()
+            self._db = None
+
+    def get(self, path, stat=None):
+        """Return digest of a single file, or None if it is missing."""
+        return self.get_many((path,), stat and (stat,))[path]
+
+    def get_many(self, paths, stats=None):
+        """Return ``{path: digest}`` for provided files (digest is None for
+        missing files).
+
+        Cached digests only cost a ``stat``; others are computed in a
+        pool then stored.
+
+        :param Iterable[Path|str] paths: files paths.
+        :param Iterable[os.stat_result] stats: files' stat, if already known (in same order).
+        """
+        db = self.db
+        select = "SELECT size, mtime_ns, digest FROM hashes WHERE dev = ? AND ino = ?"
+        paths = list(paths)
+        stats = list(stats) if stats is not None else (self.stat(path) for path in paths)
+        digests, missing = {}, []
+        for path, stat in zip(paths, stats):
+            if stat is None:
+                digests[path] = None
+                continue
+            row = db.execute(select, (stat.st_dev, stat.st_ino)).fetchone()
+            if row and row[:2] == (stat.st_size, stat.st_mtime_ns):
+                self.hits += 1
+                digests[path] = row[2].hex()
+            else:
+                missing.append(path)
+
+        if missing:
+            results = map_ordered(hash_stat, ((path,) for path in missing), self.jobs, self.executor_class)
+            with db:
+                for path, (stat, digest) in zip(missing, results):
+                    digests[path] = digest
+                    if digest is None:
+                        continue
+                    self.misses += 1
+                    db.execute(
+                        "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                        (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, bytes.fromhex(digest)),
+                    )
+        return digests
+
+    @staticmethod
+    def stat(path):
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
@@ -1,5 +1,11 @@
-import re
+import atexit
 import logging
+import queue
+import re
+import sys
+import threading
+
+from .metrics import Metrics
 
 __all__ = ("Logs", "logs")
 
@@ -11,14 +17,36 @@ class Logs:
     """Logger used by the task in order to log informations."""
 
     _log_levels = {
-        "out": (0, "", logging.INFO),
-        "info": (34, "I", logging.INFO),
-        "success": (92, "S", logging.INFO),
-        "error": (91, "E", logging.ERROR),
-        "warning": (33, "W", logging.WARNING),
+        "out": (0, "", logging.INFO, None),
+        "detail": (0, "", logging.DEBUG, 1),
+        "info": (34, "I", logging.INFO, 2),
+        "success": (92, "S", logging.INFO, 2),
+        "error": (91, "E", logging.ERROR, None),
+        "warning": (33, "W", logging.WARNING, None),
     }
+    """Log levels as ``{level: (color, key, logging level, quiet)}``.
+
+    Messages are dropped when ``Logs.quiet`` is greater or equal to
+    ``quiet`` level's value.
+    """
+
+    metrics: Metrics = None
+    """Metrics collector: counters, gauges and timing spans."""
+    quiet: int = 0
+    """Quiet level: ``1`` drops per-item lines (``detail``), ``2`` drops
+    informations too. Warnings and errors are always displayed."""
+    colors: bool | None = None
+    """Use ANSI styling. If ``None``, enabled when output is a TTY."""
+    stream = None
+    """Output stream. Defaults to ``sys.stdout`` (resolved at each call)."""
+    batch_size: int = 512
+    """Buffered mode: max number of lines written at once."""
 
     def __init__(self, name):
+        self.metrics = Metrics()
+        self._queue = None
+        self._thread = None
+        self._tty = (None, False)
         self.reset(name)
 
     def reset(self, name):
@@ -26,22 +54,35 @@ class Logs:
 
     # ---- output
     def log(self, level, prefix, msg=None, *args, exc=None, pad=0, format=True, **kwargs):
-        color, key, lev = self._log_levels[level]
+        color, key, lev, quiet = self._log_levels[level]
+        if quiet is not None and self.quiet >= quiet:
+            return
         if msg is None:
             msg, prefix = prefix, ""
 
+        stream = self.stream or sys.stdout
+        colors = self.use_colors(stream)
         if format:
-            msg = self.format(msg)
+            msg = self.format(msg, colors=colors)
+        if args:
+            msg = " ".join((msg, *(str(arg) for arg in args)))
 
         prefix = (f"[{key}]" if key else "") + (f"[{prefix}]" if prefix else "")
         if prefix:
             prefix = prefix + " "
-        msg = f"\033[{color}m" + prefix + (f"{msg}\033[0m")
-        print(msg, *args)
+        if colors:
+            msg = f"\033[{color}m{prefix}{msg}\033[0m\n"
+        else:
+            msg = f"{prefix}{msg}\n"
+        self.write(stream, msg)
 
     def out(self, *args, **kw):
         self.log("out", *args, **kw)
 
+    def detail(self, *args, **kw):
+        """Log per-item information (dropped by quiet mode)."""
+        self.log("detail", *args, **kw)
+
     def info(self, *a, **kw):
         self.log("info", *a, **kw)
 
@@ -54,20 +95,123 @@ class Logs:
     def err(self, *a, **kw):
         self.log("error", *a, **kw)
 
+    def use_colors(self, stream):
+        """Return True if ANSI styling is used for this stream."""
+        if self.colors is not None:
+            return self.colors
+        # isatty is cached for the last stream
+        if self._tty[0] is not stream:
+            isatty = getattr(stream, "isatty", None)
+            self._tty = (stream, bool(isatty and isatty()))
+        return self._tty[1]
+
+    # ---- buffered output
+    @property
+    def buffered(self):
+        """True when buffered output is running."""
+        return self._queue is not None
+
+    def write(self, stream, text):
+        """Write text to stream, or enqueue it in buffered mode."""
+        if self._queue is not None:
+            self._queue.put((stream, text))
+        else:
+            stream.write(text)
+
+    def start_buffer(self):
+        """Start buffered mode: lines are queued and written by batch from a
+        background thread."""
+        if self._queue is not None:
+            return
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_worker, args=(self._queue,), name="logs", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop_buffer)
+
+    def stop_buffer(self):
+        """Flush queued lines and stop buffered mode."""
+        if self._queue is None:
+            return
+        atexit.unregister(self.stop_buffer)
+        self._queue.put(None)
+        self._thread.join()
+        self._queue, self._thread = None, None
+
+    def flush(self):
+        """Wait for queued lines to be written, then flush output stream."""
+        if self._queue is not None:
+            self._queue.join()
+        (self.stream or sys.stdout).flush()
+
+    def _write_worker(self, queue_):
+        running = True
+        while running:
+            batch = [queue_.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(queue_.get_nowait())
+                except queue.Empty:
+                    break
+
+            streams = {}
+            for item in batch:
+                if item is None:
+                    running = False
+                else:
+                    streams.setdefault(item[0], []).append(item[1])
+            for stream, lines in streams.items():
+                try:
+                    stream.write("".join(lines))
+                    stream.flush()
+                except (OSError, ValueError):
+                    pass
+            for _ in batch:
+                queue_.task_done()
+
+    # ---- instrumentation
+    def span(self, name, **tags):
+        """Time enclosed block (context manager). See ``Metrics.span``."""
+        return self.metrics.span(name, **tags)
+
+    def count(self, name, value=1, **tags):
+        """Increment a counter. See ``Metrics.count``."""
+        self.metrics.count(name, value, **tags)
+
+    def gauge(self, name, value, **tags):
+        """Set a gauge value. See ``Metrics.gauge``."""
+        self.metrics.gauge(name, value, **tags)
+
     # ---- formatting
     effects = {
-        "bold": (1, re.compile(r"\*\*([^\n]+)\*\*")),
-        "italic": (3, re.compile(r"//([^\n]+)//")),
-        "underline": (4, re.compile(r"__([^\n]+)__")),
-        "strike": (4, re.compile(r"~~([^\n]+)~~")),
-        "warning": (33, re.compile(r"!!([^\n]+)!!")),
-        "error": (91, re.compile(r"!!!([^\n]+)!!!")),
+        "bold": (1, "**"),
+        "italic": (3, "//"),
+        "underline": (4, "__"),
+        "strike": (4, "~~"),
+        "error": (91, "!!!"),
+        "warning": (33, "!!"),
     }
-
-    def format(self, msg, **kwargs):
-        for code, reg in self.effects.values():
-            msg = reg.sub(f"\033[{code}m\\1\033[0m", msg)
-        return msg
+    """Text effects as ``{name: (ANSI code, markup)}``.
+
+    Markup is matched in this order (longer ones first).
+    """
+    _effects_re = re.compile(
+        "|".join(f"{re.escape(mark)}(?P<{name}>[^\n]+?){re.escape(mark)}" for name, (_, mark) in effects.items())
+    )
+
+    def format(self, msg, colors=True, **kwargs):
+        """Apply effects markup on message, as ANSI styles (or remove markup
+        when ``colors`` is False)."""
+        if colors:
+            return self._effects_re.sub(self._format_ansi, msg)
+        return self._effects_re.sub(self._format_plain, msg)
+
+    def _format_ansi(self, match):
+        name = match.lastgroup
+        text = self._effects_re.sub(self._format_ansi, match.group(name))
+        return f"\033[{self.effects[name][0]}m{text}\033[0m"
+
+    def _format_plain(self, match):
+        return self._effects_re.sub(self._format_plain, match.group(match.lastgroup))
 
 
 logs = Logs("media_tools")
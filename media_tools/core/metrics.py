@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+import atexit
+import json
+import sys
+import threading
+import time
+
+
+__all__ = ("Metrics",)
+
+
+class Metrics:
+    """Collect counters, gauges and timing spans.
+
+    When a sink is opened (using ``open()``), each record is emitted as a JSON
+    line. A summary record of all collected values is written at exit.
+
+    Metrics are always collected, even when no sink is opened: it costs a
+    dict update per call.
+    """
+
+    counters: dict[str, float] = None
+    """Counters values by name."""
+    gauges: dict[str, float] = None
+    """Last gauges values by name."""
+    spans: dict[str, list] = None
+    """Spans statistics by name, as ``[count, total, min, max]`` (seconds)."""
+    stream = None
+    """Output stream of JSON lines records."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset collected values."""
+        self.counters = {}
+        self.gauges = {}
+        self.spans = {}
+
+    def open(self, target="-"):
+        """Emit records as JSON lines to this target.
+
+        :param str|Path target: file path to append to, or ``"-"`` for stderr.
+        """
+        self.close(summary=False)
+        if str(target) == "-":
+            self.stream = sys.stderr
+        else:
+            self.stream = open(target, "a")
+        atexit.register(self.close)
+
+    def close(self, summary=True):
+        """Write summary (if ``summary``) and close output stream."""
+        if self.stream is None:
+            return
+        atexit.unregister(self.close)
+        if summary:
+            self.emit("summary", "", **self.summary())
+        if self.stream is not sys.stderr:
+            self.stream.close()
+        else:
+            self.stream.flush()
+        self.stream = None
+
+    @property
+    def enabled(self):
+        """True when records are emitted."""
+        return self.stream is not None
+
+    def emit(self, type, name, **data):
+        """Write a record to output stream (if any)."""
+        if self.stream is None:
+            return
+        record = {"ts": round(time.time(), 6), "type": type, "name": name, **data}
+        line = json.dumps(record, default=str)
+        with self.lock:
+            self.stream.write(line + "\n")
+
+    def count(self, name, value=1, **tags):
+        """Increment counter ``name`` by ``value``."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.stream and self.emit("counter", name, value=value, **tags)
+
+    def gauge(self, name, value, **tags):
+        """Set gauge ``name`` to ``value``."""
+        with self.lock:
+            self.gauges[name] = value
+        self.stream and self.emit("gauge", name, value=value, **tags)
+
+    @contextmanager
+    def span(self, name, **tags):
+        """Context manager timing the enclosed block as span ``name``."""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as err:
+            error = type(err).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.add_span(name, duration)
+            if self.stream:
+                if error:
+                    tags["error"] = error
+                self.emit("span", name, duration=round(duration, 6), **tags)
+
+    def add_span(self, name, duration):
+        """Add duration of a span to statistics."""
+        with self.lock:
+            if stats := self.spans.get(name):
+                stats[0] += 1
+                stats[1] += duration
+                stats[2] = min(stats[2], duration)
+                stats[3] = max(stats[3], duration)
+            else:
+                self.spans[name] = [1, duration, duration, duration]
+
+    def summary(self):
+        """Return a dict summary of collected values."""
+        with self.lock:
+            spans = {
+                name: {
+                    "count": count,
+                    "total": round(total, 6),
+                    "mean": round(total / count, 6),
+                    "min": round(min_, 6),
+                    "max": round(max_, 6),
+                }
+                for name, (count, total, min_, max_) in self.spans.items()
+            }
+            return {"counters": dict(self.counters), "gauges": dict(self.gauges), "spans": spans}
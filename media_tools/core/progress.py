@@ -0,0 +1,141 @@
+import sys
+import threading
+import time
+
+from .logs import logs
+
+
+__all__ = ("Progress",)
+
+
+def format_bytes(value):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}TiB"
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class Progress:
+    """Report progress of a long-running operation: done items and bytes,
+    throughput and ETA.
+
+    On a TTY, a single status line is refreshed; otherwise a summary line is
+    written periodically. Output is rate-limited: ``update()`` only costs a
+    clock read between two refreshes. Nothing is displayed when logs are
+    quiet (``logs.quiet >= 2``).
+
+    Example:
+
+    .. code-block:: python
+
+        with Progress("download", total=len(urls)) as progress:
+            for url in urls:
+                ...
+                progress.update(bytes=len(content))
+    """
+
+    interval = 0.2
+    """Minimum delay between two refreshes on a TTY (seconds)."""
+    summary_interval = 10.0
+    """Delay between two summary lines when output is not a TTY (seconds)."""
+
+    def __init__(self, label, total=None, total_bytes=None, stream=None):
+        """
+        :param str label: operation label.
+        :param int total: total number of items, if known.
+        :param int total_bytes: total number of bytes, if known.
+        :param stream: output stream (default: stderr).
+        """
+        self.label = label
+        self.total = total
+        self.total_bytes = total_bytes
+        self.stream = stream or sys.stderr
+        self.done = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.enabled = logs.quiet < 2
+        self.tty = self.enabled and self.stream.isatty()
+        self.start = time.monotonic()
+        self._next = self.start + (self.interval if self.tty else self.summary_interval)
+        self._rendered = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.finish()
+
+    def update(self, done=1, bytes=0):
+        """Add done items and bytes."""
+        with self.lock:
+            self.done += done
+            self.bytes += bytes
+        if self.enabled and time.monotonic() >= self._next:
+            self.render()
+
+    def add_total(self, total=0, total_bytes=0):
+        """Increase expected totals (when discovered while running)."""
+        with self.lock:
+            if total:
+                self.total = (self.total or 0) + total
+            if total_bytes:
+                self.total_bytes = (self.total_bytes or 0) + total_bytes
+
+    def get_status(self):
+        """Return status line."""
+        elapsed = max(time.monotonic() - self.start, 1e-6)
+        parts = [f"{self.done}/{self.total}" if self.total else str(self.done)]
+        if self.total:
+            parts[0] += f" ({self.done * 100 // max(self.total, 1)}%)"
+        parts.append(f"{self.done / elapsed:.1f} items/s")
+        if self.bytes or self.total_bytes:
+            parts.append(f"{format_bytes(self.bytes)} at {format_bytes(self.bytes / elapsed)}/s")
+
+        # ETA, based on bytes if known, else items.
+        if self.total_bytes and self.bytes:
+            remaining = (self.total_bytes - self.bytes) * elapsed / self.bytes
+        elif self.total and self.done:
+            remaining = (self.total - self.done) * elapsed / self.done
+        else:
+            remaining = None
+        if remaining is not None:
+            parts.append(f"ETA {format_duration(max(remaining, 0))}")
+        return f"{self.label}: {', '.join(parts)}"
+
+    def render(self):
+        """Write status line."""
+        with self.lock:
+            now = time.monotonic()
+            if now < self._next:
+                return
+            self._next = now + (self.interval if self.tty else self.summary_interval)
+            status = self.get_status()
+            if self.tty:
+                self.stream.write(f"\r{status}\033[K")
+            else:
+                self.stream.write(f"{status}\n")
+            self.stream.flush()
+            self._rendered = True
+
+    def finish(self):
+        """Write final status line, with elapsed time. Nothing is written
+        for operations done before the first refresh."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        elapsed = time.monotonic() - self.start
+        if not self._rendered and elapsed < self.interval:
+            return
+        status = f"{self.get_status()} in {format_duration(elapsed)}"
+        self.stream.write(f"\r{status}\033[K\n" if self.tty else f"{status}\n")
+        self.stream.flush()
@@ -0,0 +1,84 @@
+import asyncio
+
+
+__all__ = ("Resources",)
+
+
+class Resources:
+    """Shared asynchronous resources, passed down to applications as context
+    ``resources`` value.
+
+    Resources are lazily created on first use, inside the event loop owned
+    by ``Apps``. When used standalone, they are closed on exit of ``async
+    with`` block.
+    """
+
+    concurrency = 8
+    """Maximum number of concurrent I/O operations."""
+    http_limits = {"max_connections": 16, "max_keepalive_connections": 8}
+    """HTTP connection pool limits."""
+    http_headers = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"}
+    """Default HTTP headers."""
+    http_timeout = 30
+    """HTTP requests timeout in seconds."""
+
+    def __init__(self, concurrency=None):
+        if concurrency:
+            self.concurrency = concurrency
+        self._http = None
+        self._semaphore = None
+
+    @property
+    def http(self):
+        """Shared ``httpx.AsyncClient`` (connection pool)."""
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                http2=True,
+                follow_redirects=True,
+                headers=self.http_headers,
+                timeout=self.http_timeout,
+                limits=httpx.Limits(**self.http_limits),
+            )
+        return self._http
+
+    @property
+    def semaphore(self):
+        """Bounded semaphore limiting concurrent operations to
+        ``concurrency``."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.BoundedSemaphore(self.concurrency)
+        return self._semaphore
+
+    async def run(self, awaitable):
+        """Await provided awaitable once the semaphore is acquired."""
+        async with self.semaphore:
+            return await awaitable
+
+    async def to_thread(self, func, *args, **kwargs):
+        """Run blocking function (such as disk I/O) in a thread, bounded by
+        the semaphore."""
+        async with self.semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def gather(self, awaitables, return_exceptions=False):
+        """Run awaitables concurrently (bounded by the semaphore) and return
+        their results in order."""
+        return await asyncio.gather(
+            *(self.run(aw) for aw in awaitables),
+            return_exceptions=return_exceptions,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close opened resources."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._semaphore = None
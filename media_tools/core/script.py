@@ -1,21 +1,430 @@
+import asyncio
+import contextlib
+import enum
+import inspect
+import os
 from pathlib import Path
-import sys
+import shlex
+import signal
+import time
 
-from .apps import apps
-from .loader import Loader
+import yaml
 
+from .app import App
+from .logs import logs
 
-default_paths = [
-    Path(__file__).parent,
-]
 
+__all__ = ("Command", "Script", "ScriptApp")
 
-def main(argv=None, paths=None):
-    argv = argv or sys.argv
-    paths = paths or default_paths
 
-    loader = Loader(paths)
-    loader.load()
-    apps.dispatch(argv)
+class Command:
+    """A single command of a script."""
 
+    class Status(enum.StrEnum):
+        PENDING = "pending"
+        OK = "ok"
+        FAILED = "failed"
+        SKIPPED = "skipped"
 
+    id: str = ""
+    """Command identifier, used to declare dependencies."""
+    argv: list[str] = None
+    """Command line arguments (without program name)."""
+    shell: str | list[str] = None
+    """Process to run instead of an application: a shell command line, or
+    a list of arguments executed directly."""
+    after: tuple[str] = tuple()
+    """Identifiers of commands that must succeed (or be ready) before this
+    one runs."""
+    ready: dict = None
+    """Process readiness check: a dict with one of ``file`` (path exists),
+    ``port`` (``PORT`` or ``HOST:PORT`` accepts connections) or ``process``
+    (a process with this name is running), and an optional ``timeout`` in
+    seconds. Dependent commands start once the check succeeds, instead of
+    waiting for the process to exit."""
+    group: str = None
+    """Concurrency limit group (see ``Script.limits``)."""
+    detach: bool = False
+    """Do not wait for the process to exit (once ready). Its output is
+    not captured."""
+    status: Status = Status.PENDING
+    """Execution status."""
+    result = None
+    """Value returned by the application (exit code for processes)."""
+    error: str = ""
+    """Error message on failure."""
+    duration: float = 0.0
+    """Execution duration in seconds (until ready for processes with
+    readiness check)."""
+
+    ready_keys = ("file", "port", "process")
+    """Available readiness checks."""
+    ready_timeout = 30
+    """Default readiness timeout, in seconds."""
+    ready_interval = 0.1
+    """Delay between two readiness checks, in seconds."""
+
+    def __init__(self, id, argv=None, after=None, shell=None, ready=None, group=None, detach=False):
+        self.id = str(id)
+        self.argv = shlex.split(argv) if isinstance(argv, str) else list(argv or ())
+        self.shell = shell
+        if isinstance(after, str):
+            after = (after,)
+        self.after = tuple(str(a) for a in after or tuple())
+        self.ready = ready
+        self.group = group and str(group)
+        self.detach = detach
+        if not self.argv and not shell:
+            raise ValueError(f"Command `{self.id}`: no command to run.")
+        if ready is not None and (not isinstance(ready, dict) or len(set(ready) & set(self.ready_keys)) != 1):
+            raise ValueError(f"Command `{self.id}`: readiness check must have one of: {', '.join(self.ready_keys)}.")
+        if ready and self.shell is None:
+            raise ValueError(f"Command `{self.id}`: readiness checks only apply to processes (`sh`).")
+
+    def __str__(self):
+        if self.shell is not None:
+            return self.shell if isinstance(self.shell, str) else shlex.join(self.shell)
+        return shlex.join(self.argv)
+
+    async def is_ready(self):
+        """Return True if readiness check succeeds."""
+        if path := self.ready.get("file"):
+            return os.path.exists(os.path.expanduser(path))
+        if port := self.ready.get("port"):
+            host, _, port = str(port).rpartition(":")
+            try:
+                _, writer = await asyncio.open_connection(host or "localhost", int(port))
+            except OSError:
+                return False
+            writer.close()
+            return True
+        return is_process_running(str(self.ready["process"]))
+
+
+def is_process_running(name):
+    """Return True if a process with this name (or executable path) is
+    running (Linux ``/proc``)."""
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/comm") as stream:
+                if stream.read().strip() == name[:15]:
+                    return True
+            with open(f"/proc/{pid}/cmdline", "rb") as stream:
+                if stream.read().split(b"\0", 1)[0].decode(errors="replace") == name:
+                    return True
+        except OSError:
+            continue
+    return False
+
+
+class Script:
+    """Run multiple commands through an ``Apps`` instance, concurrently
+    when they do not depend on each other.
+
+    Commands are either applications' commands, or processes (shell
+    commands). Processes output is printed line by line, prefixed by
+    their command id.
+
+    Script files are either:
+
+    - YAML (``.yaml``, ``.yml``): a list of commands, as strings or dicts of
+      ``{id, cmd, sh, after, ready, group, detach}`` where ``cmd`` (an
+      application command) or ``sh`` (a process) is a string or a list of
+      arguments (see ``Command``). It can also be a dict of ``{commands,
+      limits, jobs}``;
+    - plain text: one command per line. Empty lines and lines starting
+      with ``#`` are ignored.
+
+    Example:
+
+    .. code-block:: yaml
+
+        jobs: 8
+        limits: {browser: 1}
+        commands:
+          - {id: db, sh: postgres -D data, ready: {port: 5432}}
+          - {id: server, sh: ./manage.py runserver, after: db, ready: {port: 8000}}
+          - {id: browser, sh: firefox localhost:8000, after: server, group: browser, detach: true}
+    """
+
+    commands: dict[str, Command] = None
+    """Commands by id, in declaration order."""
+    limits: dict[str, int] = None
+    """Maximum number of concurrently starting commands per group. A
+    process with a readiness check releases its slot once ready."""
+    jobs: int = None
+    """Default number of concurrently starting commands."""
+
+    def __init__(self, commands, limits=None, jobs=None):
+        self.commands = {}
+        for command in commands:
+            if command.id in self.commands:
+                raise ValueError(f"Command id `{command.id}` is declared twice.")
+            self.commands[command.id] = command
+        self.limits = dict(limits or {})
+        self.jobs = jobs
+        self.validate()
+
+    @classmethod
+    def from_file(cls, path, prog=None):
+        """Read script from provided file.
+
+        :param Path path: script file path.
+        :param str prog: if provided, remove this program name from commands' arguments.
+        """
+        path = Path(path)
+        options = {}
+        with path.open() as stream:
+            if path.suffix in (".yaml", ".yml"):
+                items = yaml.load(stream, Loader=yaml.SafeLoader) or []
+                if isinstance(items, dict):
+                    options = {key: items[key] for key in ("limits", "jobs") if key in items}
+                    items = items.get("commands") or []
+            else:
+                items = [line.strip() for line in stream]
+                items = [line for line in items if line and not line.startswith("#")]
+
+        commands = []
+        for index, item in enumerate(items, 1):
+            if isinstance(item, dict):
+                kwargs = {key: item[key] for key in ("after", "ready", "group", "detach") if key in item}
+                command = Command(item.get("id", index), item.get("cmd"), shell=item.get("sh"), **kwargs)
+            else:
+                command = Command(index, item)
+            if prog and command.argv and command.argv[0] == prog:
+                command.argv = command.argv[1:]
+            commands.append(command)
+        return cls(commands, **options)
+
+    def validate(self):
+        """Check dependencies: raise ValueError on unknown ones or cycles."""
+        for command in self.commands.values():
+            if missing := [a for a in command.after if a not in self.commands]:
+                raise ValueError(f"Command `{command.id}` depends on unknown command(s): {', '.join(missing)}.")
+
+        visited, stack = set(), set()
+
+        def visit(id):
+            if id in stack:
+                raise ValueError(f"Dependency cycle detected on command `{id}`.")
+            if id in visited:
+                return
+            stack.add(id)
+            for dep in self.commands[id].after:
+                visit(dep)
+            stack.remove(id)
+            visited.add(id)
+
+        for id in self.commands:
+            visit(id)
+
+    async def run(self, apps, jobs=None, keep_going=True):
+        """Run all commands, returning them once done.
+
+        A command starts as soon as its dependencies succeeded (or are
+        ready), within concurrency limits: the script takes as long as its
+        critical path.
+
+        :param Apps apps: dispatch commands to this instance.
+        :param int jobs: maximum number of commands starting concurrently (default: ``self.jobs`` or 1).
+        :param bool keep_going: if False, skip pending commands after a failure.
+        """
+        semaphore = asyncio.Semaphore(max(jobs or self.jobs or 1, 1))
+        limits = {group: asyncio.Semaphore(max(int(count), 1)) for group, count in self.limits.items()}
+        ready = {id: asyncio.Event() for id in self.commands}
+        self._failed = False
+
+        async def run_command(command):
+            slots = []
+
+            def release():
+                # dependent commands can start, and slots are made available
+                ready[command.id].set()
+                while slots:
+                    slots.pop().release()
+
+            try:
+                if command.after:
+                    await asyncio.gather(*(ready[dep].wait() for dep in command.after))
+                    if failed := [dep for dep in command.after if self.commands[dep].status != Command.Status.OK]:
+                        command.status = Command.Status.SKIPPED
+                        command.error = f"dependency not satisfied: {', '.join(failed)}"
+                        return
+                for slot in (limits.get(command.group), semaphore):
+                    if slot is not None:
+                        await slot.acquire()
+                        slots.append(slot)
+                if self._failed and not keep_going:
+                    command.status = Command.Status.SKIPPED
+                    command.error = "a previous command failed"
+                    return
+                if command.shell is None:
+                    await self.run_command(apps, command)
+                else:
+                    await self.run_process(command, release)
+                if command.status == Command.Status.FAILED:
+                    self._failed = True
+            finally:
+                release()
+
+        # all tasks are created before any of them starts running.
+        tasks = [asyncio.ensure_future(run_command(command)) for command in self.commands.values()]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return list(self.commands.values())
+
+    async def run_process(self, command, on_ready):
+        """Run a process command. ``on_ready()`` is called once the process
+        is ready (readiness check succeeded, or process exited)."""
+        start = time.perf_counter()
+        logs.detail(f"[{command.id}] start: {command}", format=False)
+        output = asyncio.subprocess.DEVNULL if command.detach else asyncio.subprocess.PIPE
+        # own process group, so that shell commands' children are terminated too
+        kwargs = {"stdout": output, "stderr": asyncio.subprocess.STDOUT, "start_new_session": True}
+        try:
+            if isinstance(command.shell, str):
+                process = await asyncio.create_subprocess_shell(command.shell, **kwargs)
+            else:
+                process = await asyncio.create_subprocess_exec(*command.shell, **kwargs)
+        except OSError as err:
+            command.status, command.error = Command.Status.FAILED, str(err)
+            logs.count(f"script.{command.status}")
+            return
+
+        pump = None if command.detach else asyncio.ensure_future(self.pump_output(command, process.stdout))
+        try:
+            if command.ready is not None:
+                await self.wait_ready(command, process)
+                command.duration = time.perf_counter() - start
+                if command.status != Command.Status.FAILED:
+                    command.status = Command.Status.OK
+                    logs.detail(f"[{command.id}] ready ({command.duration:.2f}s)", format=False)
+                    on_ready()
+            if command.detach:
+                if command.status == Command.Status.PENDING:
+                    command.status = Command.Status.OK
+            elif command.status != Command.Status.FAILED:
+                command.result = await process.wait()
+                if command.result:
+                    command.status, command.error = Command.Status.FAILED, f"exit code {command.result}"
+                elif command.status == Command.Status.PENDING:
+                    command.status = Command.Status.OK
+                if command.ready is None:
+                    command.duration = time.perf_counter() - start
+            if pump:
+                await pump
+        except asyncio.CancelledError:
+            await self.terminate(process)
+            raise
+        logs.count(f"script.{command.status}")
+
+    async def wait_ready(self, command, process):
+        """Wait for process readiness: mark command as failed on timeout or
+        if the process exited with an error."""
+        timeout = float(command.ready.get("timeout", command.ready_timeout))
+        deadline = time.perf_counter() + timeout
+        while not await command.is_ready():
+            if process.returncode is not None and process.returncode != 0:
+                command.status, command.error = Command.Status.FAILED, f"exit code {process.returncode}"
+                return
+            if time.perf_counter() >= deadline:
+                command.status, command.error = Command.Status.FAILED, f"not ready after {timeout:g}s"
+                await self.terminate(process)
+                return
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(process.wait(), command.ready_interval)
+
+    async def pump_output(self, command, stream):
+        """Print process output lines, prefixed by command id."""
+        while line := await stream.readline():
+            logs.out(command.id, line.decode(errors="replace").rstrip("\r\n"), format=False)
+
+    async def terminate(self, process, timeout=5):
+        """Terminate process group, killing it if it doesn't exit in time."""
+        if process.returncode is not None:
+            return
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(process.pid, signal.SIGKILL)
+            await process.wait()
+
+    async def run_command(self, apps, command):
+        """Dispatch a single command. Synchronous applications are run in a
+        worker thread."""
+        start = time.perf_counter()
+        logs.detail(f"[{command.id}] start: {command}", format=False)
+        try:
+            with logs.span("script.command", id=command.id):
+                command.argv and apps.get(command.argv[0])
+                context = apps.get_context(argv=command.argv)
+                app = context.get("app")
+                if app and inspect.iscoroutinefunction(app.run):
+                    result = apps.run(**context)
+                else:
+                    result = await asyncio.to_thread(apps.run, **context)
+                if inspect.isawaitable(result):
+                    result = await result
+            command.result = result
+            command.status = Command.Status.OK
+        except (Exception, SystemExit) as err:
+            command.status = Command.Status.FAILED
+            command.error = str(err) or type(err).__name__
+        command.duration = time.perf_counter() - start
+        logs.count(f"script.{command.status}")
+
+    def report(self):
+        """Log commands results."""
+        for command in self.commands.values():
+            msg = f"[{command.id}] {command} ({command.duration:.2f}s)"
+            match command.status:
+                case Command.Status.OK:
+                    logs.success(msg, format=False)
+                case Command.Status.FAILED:
+                    logs.err(f"{msg}: {command.error}", format=False)
+                case _:
+                    logs.warn(f"[{command.id}] {command} {command.status}: {command.error}", format=False)
+
+        counts = {}
+        for command in self.commands.values():
+            counts[command.status] = counts.get(command.status, 0) + 1
+        logs.info(", ".join(f"{count} {status}" for status, count in counts.items()))
+
+
+class ScriptApp(App):
+    name = "run"
+    label = "Run"
+    help = "Run commands from a file."
+    description = (
+        "Run multiple commands from a file in a single process: applications' commands, or processes with "
+        "prefixed output. Independent commands can run concurrently, and commands can declare dependencies on "
+        "others and readiness checks (YAML files only)."
+    )
+
+    def init_parser(self, parser):
+        super().init_parser(parser)
+        parser.add_argument("file", type=Path, metavar="FILE", help="Script file (YAML or one command per line).")
+        parser.add_argument(
+            "-j", "--jobs", type=int, help="Number of commands started concurrently (default: script's jobs, or 1)."
+        )
+        parser.add_argument("--stop", action="store_true", help="Do not start new commands after a failure.")
+
+    async def run(self, file, jobs=None, stop=False, apps=None, **kwargs):
+        if apps is None:
+            from .apps import apps
+
+        script = Script.from_file(file, prog=apps.name)
+        with logs.span("script.run", path=str(file), commands=len(script.commands)):
+            commands = await script.run(apps, jobs=jobs, keep_going=not stop)
+        script.report()
+        if any(command.status != Command.Status.OK for command in commands):
+            raise SystemExit(1)
+        return commands
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+
+from media_tools.core import logs
+from media_tools.core.app import App
+from media_tools.core.apps import Apps
+
+
+class EchoApp(App):
+    name = "echo"
+
+    def init_parser(self, parser):
+        super().init_parser(parser)
+        parser.add_argument("words", nargs="*")
+
+    def run(self, words=None, **kwargs):
+        logs.count("echo.runs")
+        if words == ["fail"]:
+            raise RuntimeError("failed")
+        return {"words": words, "quiet": logs.quiet}
+
+
+class AsyncEchoApp(EchoApp):
+    name = "aecho"
+
+    async def run(self, **kwargs):
+        await asyncio.sleep(0)
+        return super().run(**kwargs)
+
+
+@pytest.fixture
+def apps():
+    apps = Apps(children=(EchoApp(), AsyncEchoApp()))
+    apps.load()
+    yield apps
+    apps.close()
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["echo", "a"],
+        ["-q", "echo", "a"],
+        ["--metrics", "echo", "a"],
+        ["-q", "--buffered", "--metrics=-", "echo", "a"],
+    ],
+)
+def test_dispatch_global_options(apps, argv):
+    assert apps.get_from_argv(argv) is apps.apps["echo"]
+    result = apps.dispatch(argv=argv)
+    assert result == {"words": ["a"], "quiet": 1 if "-q" in argv else 0}
+
+
+@pytest.mark.parametrize("separate", [True, False])
+def test_dispatch_metrics_file(apps, tmp_path, separate):
+    path = str(tmp_path / "metrics.jsonl")
+    argv = ["--metrics", path, "echo", "a"] if separate else [f"--metrics={path}", "echo", "a"]
+    assert apps.get_from_argv(argv) is apps.apps["echo"]
+    assert apps.dispatch(argv=argv)["words"] == ["a"]
+    records = [json.loads(line) for line in open(path)]
+    assert any(record["name"] == "echo.runs" for record in records)
+
+
+def test_dispatch_restores_logs_state(apps, tmp_path, capsys):
+    path = tmp_path / "metrics.jsonl"
+    assert apps.dispatch(argv=["-qq", f"--metrics={path}", "--buffered", "aecho", "x"])["quiet"] == 2
+    assert logs.quiet == 0
+    assert not logs.metrics.enabled
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert records[-1]["type"] == "summary"
+    assert any(record["name"] == "echo.runs" for record in records)
+
+
+def test_dispatch_restores_logs_state_on_error(apps):
+    with pytest.raises(RuntimeError):
+        apps.dispatch(argv=["-q", "--metrics", "--buffered", "echo", "fail"])
+    assert logs.quiet == 0
+    assert not logs.metrics.enabled
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from media_tools.core.app import FilesApp
+from media_tools.core.build import BuildCache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def files(tmp_path):
+    inputs, outputs = [tmp_path / "in.txt"], [tmp_path / "out.txt"]
+    inputs[0].write_text("input")
+    outputs[0].write_text("output")
+    return inputs, outputs
+
+
+def is_fresh(tmp_path, inputs, outputs, key=""):
+    cache = BuildCache(tmp_path / "build.json", key)
+    fresh = cache.add(inputs, outputs)
+    cache.commit()
+    cache.close()
+    return fresh
+
+
+def test_fresh_units_are_skipped(tmp_path, files):
+    assert not is_fresh(tmp_path, *files)
+    assert is_fresh(tmp_path, *files)
+    # other arguments
+    assert not is_fresh(tmp_path, *files, key="other")
+
+
+def test_same_content_is_fresh(tmp_path, files):
+    inputs, outputs = files
+    is_fresh(tmp_path, *files)
+    os.utime(inputs[0], ns=(0, 1))
+    assert is_fresh(tmp_path, *files)
+
+
+@pytest.mark.parametrize("change", ["input", "output", "missing"])
+def test_changed_units_are_stale(tmp_path, files, change):
+    inputs, outputs = files
+    is_fresh(tmp_path, *files)
+    if change == "missing":
+        outputs[0].unlink()
+    else:
+        path = inputs[0] if change == "input" else outputs[0]
+        path.write_text("changed")
+        os.utime(path, ns=(0, 1))
+    assert not is_fresh(tmp_path, *files)
+
+
+class UpperApp(FilesApp):
+    name = "upper"
+    build_cache = True
+
+    def run(self, files, **kwargs):
+        self.processed = sorted(path.name for path in files)
+        self.save({path: content.upper() for path, content in files.items()}, files)
+
+
+def dispatch(*argv):
+    app = UpperApp()
+    app.processed = None
+    app.load()
+    app.dispatch(argv=list(map(str, argv)))
+    return app.processed
+
+
+def test_files_app_build_cache(tmp_path):
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    a.write_text("a")
+    b.write_text("b")
+    assert dispatch(a, b) == ["a.txt", "b.txt"]
+    assert a.read_text() == "A"
+    assert dispatch(a, b) is None
+
+    b.write_text("bb")
+    os.utime(b, ns=(0, 1))
+    assert dispatch(a, b) == ["b.txt"]
+    assert dispatch(a, b, "--no-cache") == ["a.txt", "b.txt"]
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from media_tools.core.conf import ConfigFile
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(ConfigFile, "_snapshots", {})
+    conf_dir = tmp_path / "config" / "media_tools"
+    conf_dir.mkdir(parents=True)
+    return conf_dir
+
+
+@pytest.fixture
+def conf_file(dirs):
+    return ConfigFile("test.yaml")
+
+
+class TestConfigFile:
+    def test_read_missing(self, conf_file):
+        assert conf_file.read() is None
+
+    def test_read(self, dirs, conf_file):
+        (dirs / "test.yaml").write_text("a: 1\nb:\n  c: 2\n")
+        assert conf_file.read() == {"a": 1, "b": {"c": 2}}
+
+    def test_read_merge_layers(self, tmp_path, dirs, conf_file):
+        (dirs / "test.yaml").write_text("a: 1\nb:\n  c: 2\n  d: 3\n")
+        extra = tmp_path / "extra.yaml"
+        extra.write_text("b:\n  d: 4\ne: 5\n")
+        assert conf_file.read([extra]) == {"a": 1, "b": {"c": 2, "d": 4}, "e": 5}
+
+    def test_read_from_snapshot(self, dirs, conf_file, monkeypatch):
+        (dirs / "test.yaml").write_text("a: 1\n")
+        assert conf_file.read() == {"a": 1}
+
+        monkeypatch.setattr(ConfigFile, "_snapshots", {})
+        monkeypatch.setattr(ConfigFile, "parse", lambda *_: pytest.fail("File should not be parsed"))
+        assert conf_file.read() == {"a": 1}
+
+    def test_read_invalidated(self, dirs, conf_file):
+        path = dirs / "test.yaml"
+        path.write_text("a: 1\n")
+        assert conf_file.read() == {"a": 1}
+
+        path.write_text("a: 22\n")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        assert conf_file.read() == {"a": 22}
+
+    def test_get_config_dirs_without_xdg(self, monkeypatch, conf_file):
+        monkeypatch.delenv("XDG_CONFIG_HOME", raising=False)
+        dirs = list(conf_file.get_config_dirs())
+        assert dirs[0].parts[-2:] == (".config", "media_tools")
+
+    def test_read_returns_copy(self, dirs, conf_file):
+        (dirs / "test.yaml").write_text("a: 1\nb:\n  c: 2\n")
+        conf = conf_file.read()
+        conf["b"]["c"] = 3
+        assert conf_file.read() == {"a": 1, "b": {"c": 2}}
+
+    def test_read_keyed_by_constructor(self, dirs, conf_file):
+        (dirs / "test.yaml").write_text("a: 1\n")
+        assert conf_file.read() == {"a": 1}
+        assert ConfigFile("test.yaml", constructor=lambda **kw: sorted(kw)).read() == ["a"]
@@ -0,0 +1,66 @@
+import os
+import stat
+import threading
+
+import pytest
+
+from media_tools.core import daemon
+from media_tools.core.daemon import Client, Server, check_owner, get_socket_path
+
+
+class Apps:
+    def dispatch(self, argv):
+        print(" ".join(argv))
+        if argv == ["fail"]:
+            raise SystemExit(2)
+
+
+@pytest.fixture
+def runtime_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("MT_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_socket_path_is_in_private_dir(runtime_dir, monkeypatch):
+    assert get_socket_path() == runtime_dir / "media_tools" / "mt.sock"
+    monkeypatch.setenv("MT_SOCKET", "/run/mt.sock")
+    assert str(get_socket_path()) == "/run/mt.sock"
+    monkeypatch.delenv("MT_SOCKET")
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    assert get_socket_path().parent.name == f"media_tools-{os.getuid()}"
+
+
+def test_check_owner(tmp_path):
+    check_owner(tmp_path)
+    os.chmod(tmp_path, 0o755)
+    with pytest.raises(PermissionError):
+        check_owner(tmp_path, private=True)
+
+
+def test_connect_refuses_foreign_socket(tmp_path, monkeypatch):
+    path = tmp_path / "mt.sock"
+    path.touch()
+    monkeypatch.setattr(daemon.os, "getuid", lambda: os.stat(path).st_uid + 1)
+    assert Client.connect(path) is None
+
+
+def test_serve_and_request(runtime_dir, capsys):
+    server = Server(Apps())
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    try:
+        path = get_socket_path()
+        for _ in range(100):
+            if client := Client.connect(path):
+                break
+            thread.join(0.02)
+        assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert client.request(["sync", "a"], cwd=runtime_dir) == 0
+        assert Client.connect(path).request(["fail"]) == 2
+        assert capsys.readouterr().out.endswith("sync a\nfail\n")
+    finally:
+        Client.connect().request(stop=True)
+        thread.join(5)
+    assert not path.exists()
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from media_tools.core import files
+from media_tools.core.files import copy_file
+
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / "src.flac"
+    path.write_bytes(os.urandom(100_000))
+    os.utime(path, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+    return path
+
+
+def test_copy_file(src, tmp_path):
+    dst = tmp_path / "dst.flac"
+    assert copy_file(src, dst) == 100_000
+    assert dst.read_bytes() == src.read_bytes()
+    assert os.stat(dst).st_mtime_ns == os.stat(src).st_mtime_ns
+    assert not (tmp_path / ".dst.flac.part").exists()
+
+
+def test_copy_file_resumes_same_source(src, tmp_path):
+    dst = tmp_path / "dst.flac"
+    part = tmp_path / ".dst.flac.part"
+    part.write_bytes(src.read_bytes()[:30_000])
+    os.utime(part, ns=(0, os.stat(src).st_mtime_ns))
+    assert copy_file(src, dst) == 70_000
+    assert dst.read_bytes() == src.read_bytes()
+
+
+@pytest.mark.parametrize("resume", [True, False])
+def test_copy_file_restarts_other_source(src, tmp_path, resume):
+    dst = tmp_path / "dst.flac"
+    part = tmp_path / ".dst.flac.part"
+    part.write_bytes(b"x" * 30_000)
+    if not resume:
+        os.utime(part, ns=(0, os.stat(src).st_mtime_ns))
+    assert copy_file(src, dst, resume=resume) == 100_000
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_copy_file_interrupted_part_is_resumable(src, tmp_path, monkeypatch):
+    def copy_range(fd_in, fd_out, offset, size, chunk_size):
+        os.write(fd_out, os.pread(fd_in, 40_000, offset))
+        raise KeyboardInterrupt()
+
+    dst = tmp_path / "dst.flac"
+    with monkeypatch.context() as m:
+        m.setattr(files, "_copy_range", copy_range)
+        with pytest.raises(KeyboardInterrupt):
+            copy_file(src, dst)
+    part = tmp_path / ".dst.flac.part"
+    assert os.stat(part).st_mtime_ns == os.stat(src).st_mtime_ns
+    assert not dst.exists()
+
+    assert copy_file(src, dst) == 60_000
+    assert dst.read_bytes() == src.read_bytes()
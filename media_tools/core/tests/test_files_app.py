@@ -0,0 +1,74 @@
+import random
+import time
+
+import pytest
+
+from media_tools.core.app import FilesApp
+from media_tools.core.files import InputFile, map_ordered
+
+
+def slow_square(value):
+    time.sleep(random.random() / 100)
+    return value * value
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_map_ordered_keeps_order(jobs):
+    assert list(map_ordered(slow_square, ((i,) for i in range(50)), jobs)) == [i * i for i in range(50)]
+
+
+def test_map_ordered_bounds_inflight_items():
+    consumed = []
+
+    def items():
+        for i in range(100):
+            consumed.append(i)
+            yield (i,)
+
+    results = map_ordered(slow_square, items(), 2)
+    assert next(results) == 0
+    # at most 2 * jobs items are submitted ahead
+    assert len(consumed) <= 5
+    assert list(results) == [i * i for i in range(1, 100)]
+
+
+class LinesApp(FilesApp):
+    name = "lines"
+
+    def read_file(self, file):
+        return file.read().splitlines()
+
+
+@pytest.fixture
+def sources(tmp_path):
+    paths = []
+    for i in range(10):
+        path = tmp_path / f"{i}.txt"
+        path.write_text(f"{i}\n{i * 2}\n")
+        paths.append(path)
+    return paths
+
+
+def get_context(app_class, argv):
+    app = app_class()
+    app.load()
+    return app.get_context(argv=argv)
+
+
+def test_read_files_in_order(sources):
+    context = get_context(LinesApp, [*map(str, sources), "-j", "4"])
+    assert list(context["files"]) == sources
+    assert list(context["files"].values()) == [[str(i), str(i * 2)] for i in range(10)]
+
+
+def test_stream_inputs(sources, tmp_path):
+    class StreamApp(LinesApp):
+        stream_inputs = True
+
+    context = get_context(StreamApp, [*map(str, sources), str(tmp_path / "missing.txt")])
+    assert list(context["files"]) == sources
+    file = context["files"][sources[3]]
+    assert isinstance(file, InputFile)
+    assert list(file.lines()) == ["3", "6"]
+    with file.mmap() as data:
+        assert data[:] == b"3\n6\n"
@@ -0,0 +1,61 @@
+import hashlib
+import os
+
+import pytest
+
+from media_tools.core import hashing
+from media_tools.core.build import file_digest
+from media_tools.core.hashing import HashCache, hash_file
+
+
+@pytest.fixture
+def hashes(tmp_path):
+    with HashCache(tmp_path / "hashes.sqlite3", jobs=2) as hashes:
+        yield hashes
+
+
+@pytest.mark.parametrize("size", [0, 1000, hashing.MMAP_MIN_SIZE + 1])
+def test_hash_file(tmp_path, size):
+    path = tmp_path / "file"
+    data = os.urandom(size)
+    path.write_bytes(data)
+    assert hash_file(path) == hashlib.blake2b(data).hexdigest()
+
+
+def test_cache_hits_and_invalidation(tmp_path, hashes, monkeypatch):
+    paths = [tmp_path / f"{i}.flac" for i in range(3)]
+    for path in paths:
+        path.write_bytes(path.name.encode())
+    digests = hashes.get_many(paths + [tmp_path / "missing"])
+    assert digests[tmp_path / "missing"] is None
+    assert digests[paths[0]] == hash_file(paths[0])
+    assert (hashes.hits, hashes.misses) == (0, 3)
+
+    # unchanged files are not read
+    monkeypatch.setattr(hashing, "hash_file", lambda path: pytest.fail(f"{path} hashed"))
+    assert hashes.get_many(paths) == {path: digests[path] for path in paths}
+    assert hashes.hits == 3
+    monkeypatch.undo()
+
+    # same size, new modification time
+    paths[1].write_bytes(b"X.flac")
+    os.utime(paths[1], ns=(0, 1))
+    assert hashes.get(paths[1]) == hash_file(paths[1]) != digests[paths[1]]
+    assert hashes.misses == 4
+
+
+def test_cache_persists(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"data")
+    with HashCache(tmp_path / "hashes.sqlite3") as hashes:
+        digest = hashes.get(path)
+    with HashCache(tmp_path / "hashes.sqlite3") as hashes:
+        assert hashes.get(path) == digest
+        assert hashes.hits == 1
+
+
+def test_file_digest(tmp_path, hashes):
+    path = tmp_path / "file"
+    path.write_bytes(b"data")
+    assert file_digest(path) == file_digest(path, hashes) == hashlib.blake2b(b"data").hexdigest()
+    assert file_digest(path, hashes, os.stat(path)) and hashes.hits == 1
@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+from media_tools.core.logs import Logs
+
+
+class TTY(io.StringIO):
+    def isatty(self):
+        return True
+
+
+@pytest.fixture
+def logs():
+    logs = Logs("media_tools.tests")
+    logs.stream = io.StringIO()
+    yield logs
+    logs.stop_buffer()
+
+
+def test_format_nested():
+    logs = Logs("media_tools.tests")
+    assert logs.format("**bold __both__** !!warn!!") == "\033[1mbold \033[4mboth\033[0m\033[0m \033[33mwarn\033[0m"
+    assert logs.format("**bold __both__** !!warn!!", colors=False) == "bold both warn"
+    assert logs.format("!!!error!!!", colors=False) == "error"
+
+
+def test_plain_output_when_not_tty(logs):
+    logs.info("**done**")
+    logs.err("failed")
+    assert logs.stream.getvalue() == "[I] done\n[E] failed\n"
+
+    logs.stream = TTY()
+    logs.info("**done**")
+    assert logs.stream.getvalue() == "\033[34m[I] \033[1mdone\033[0m\033[0m\n"
+
+
+def test_flush_drains_queue_in_order(logs):
+    logs.batch_size = 7
+    logs.start_buffer()
+    assert logs.buffered
+    for i in range(100):
+        logs.out(str(i))
+    logs.flush()
+    assert logs.stream.getvalue() == "".join(f"{i}\n" for i in range(100))
+
+    logs.out("last")
+    logs.stop_buffer()
+    assert not logs.buffered
+    assert logs.stream.getvalue().endswith("99\nlast\n")
+
+
+@pytest.mark.parametrize("quiet,expected", [(0, "item\n[I] info\n"), (1, "[I] info\n"), (2, "")])
+def test_quiet_levels(logs, quiet, expected):
+    logs.quiet = quiet
+    logs.detail("item")
+    logs.info("info")
+    logs.warn("warning")
+    assert logs.stream.getvalue() == expected + "[W] warning\n"
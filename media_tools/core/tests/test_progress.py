@@ -0,0 +1,68 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from media_tools.core import progress as progress_module
+from media_tools.core.logs import logs
+from media_tools.core.progress import Progress
+
+
+class TTY(io.StringIO):
+    def isatty(self):
+        return True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    clock.monotonic = lambda: clock.now
+    monkeypatch.setattr(progress_module, "time", clock)
+    return clock
+
+
+def test_tty_refresh_is_rate_limited(clock):
+    stream = TTY()
+    with Progress("copy", total=10, stream=stream) as progress:
+        for now in (100.1, 100.15, 100.25, 100.3, 100.35, 100.5):
+            clock.now = now
+            progress.update()
+        # refreshed at 100.25 and 100.5 only
+        assert stream.getvalue().count("\r") == 2
+        assert stream.getvalue().endswith("\rcopy: 6/10 (60%), 12.0 items/s, ETA 0s\033[K")
+        clock.now = 101
+    assert stream.getvalue().endswith("\rcopy: 6/10 (60%), 6.0 items/s, ETA 0s in 1s\033[K\n")
+
+
+def test_summary_lines_when_not_tty(clock):
+    stream = io.StringIO()
+    with Progress("sync", total=4, total_bytes=4096, stream=stream) as progress:
+        clock.now = 105
+        progress.update(bytes=1024)
+        assert stream.getvalue() == ""
+        clock.now = 110
+        progress.update(bytes=1024)
+        clock.now = 112
+    assert stream.getvalue().splitlines() == [
+        "sync: 2/4 (50%), 0.2 items/s, 2.0KiB at 205B/s, ETA 10s",
+        "sync: 2/4 (50%), 0.2 items/s, 2.0KiB at 171B/s, ETA 12s in 12s",
+    ]
+
+
+@pytest.mark.parametrize("stream", [io.StringIO(), TTY()])
+def test_quick_operations_are_silent(clock, stream):
+    with Progress("prepare", total=3, stream=stream) as progress:
+        progress.update(3)
+        clock.now += Progress.interval / 2
+    assert stream.getvalue() == ""
+
+
+def test_disabled_when_quiet(clock, monkeypatch):
+    monkeypatch.setattr(logs, "quiet", 2)
+    stream = TTY()
+    with Progress("copy", stream=stream) as progress:
+        for _ in range(5):
+            clock.now += 60
+            progress.update(bytes=1 << 20)
+    assert stream.getvalue() == ""
+    assert progress.done == 5
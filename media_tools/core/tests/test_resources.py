@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from media_tools.core.app import App
+from media_tools.core.apps import Apps
+from media_tools.core.resources import Resources
+
+
+class Client:
+    closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_semaphore_limits_concurrency():
+    active = peak = 0
+
+    async def task(value):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return value
+
+    async def main():
+        async with Resources(concurrency=2) as resources:
+            results = await resources.gather(task(i) for i in range(6))
+            assert await resources.to_thread(sum, results) == 15
+            return results
+
+    assert asyncio.run(main()) == list(range(6))
+    assert peak == 2
+
+
+def test_aclose():
+    async def main():
+        resources = Resources()
+        client = resources._http = Client()
+        semaphore = resources.semaphore
+        await resources.aclose()
+        assert client.closed and resources._http is None
+        # recreated on next use
+        assert resources.semaphore is not semaphore
+
+    asyncio.run(main())
+
+
+def test_http_client_is_lazy():
+    httpx = pytest.importorskip("httpx")
+
+    async def main():
+        async with Resources() as resources:
+            assert resources._http is None
+            client = resources.http
+            assert isinstance(client, httpx.AsyncClient) and resources.http is client
+        assert client.is_closed
+
+    asyncio.run(main())
+
+
+class AsyncApp(App):
+    name = "async"
+
+    async def run(self, resources=None, **kwargs):
+        return await resources.run(asyncio.sleep(0, result=resources))
+
+
+def test_apps_run_async_app():
+    apps = Apps(children=(AsyncApp(),))
+    apps.load()
+    try:
+        # run in Apps' event loop, kept between commands
+        assert apps.dispatch(argv=["async"]) is apps.resources
+        loop = apps.runner.get_loop()
+        assert apps.dispatch(argv=["async"]) is apps.resources
+        assert apps.runner.get_loop() is loop
+        # from inside a running loop
+        assert asyncio.run(apps.adispatch(argv=["async"])) is apps.resources
+    finally:
+        apps.resources._http = client = Client()
+        apps.close()
+    assert client.closed and apps.runner is None
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import pytest
+
+from media_tools.core.app import App
+from media_tools.core.apps import Apps
+from media_tools.core.script import Command, Script, ScriptApp
+
+
+def run(script, **kwargs):
+    return asyncio.run(script.run(None, **kwargs))
+
+
+def test_command_requires_something_to_run():
+    with pytest.raises(ValueError):
+        Command("a")
+
+
+def test_command_ready_check_validation():
+    with pytest.raises(ValueError):
+        Command("a", shell="true", ready={"timeout": 1})
+    with pytest.raises(ValueError):
+        Command("a", "sync --help", ready={"file": "x"})
+
+
+def test_from_file_with_options(tmp_path):
+    path = tmp_path / "script.yaml"
+    path.write_text(
+        "jobs: 4\n"
+        "limits: {slow: 1}\n"
+        "commands:\n"
+        "  - {id: a, sh: 'true', group: slow}\n"
+        "  - {id: b, sh: [echo, b], after: a, ready: {port: 8000}}\n"
+    )
+    script = Script.from_file(path)
+    assert (script.jobs, script.limits) == (4, {"slow": 1})
+    assert script.commands["a"].group == "slow"
+    assert script.commands["b"].shell == ["echo", "b"]
+    assert script.commands["b"].ready == {"port": 8000}
+
+
+def test_ready_starts_dependents_before_exit(tmp_path):
+    flag = tmp_path / "ready"
+    script = Script(
+        [
+            Command("service", shell=f"touch {flag}; sleep 0.5", ready={"file": str(flag)}),
+            Command("client", shell=f"test -e {flag}", after="service"),
+        ]
+    )
+    start = time.perf_counter()
+    commands = run(script, jobs=1)
+    assert all(command.status == Command.Status.OK for command in commands)
+    # client started once service was ready, and jobs slot was released
+    assert script.commands["client"].duration < 0.5
+    assert time.perf_counter() - start < 1
+
+
+def test_failures(tmp_path):
+    script = Script(
+        [
+            Command("fail", shell="exit 2"),
+            Command("skipped", shell="true", after="fail"),
+            Command("timeout", shell="sleep 5", ready={"file": str(tmp_path / "never"), "timeout": 0.2}),
+        ]
+    )
+    start = time.perf_counter()
+    run(script, jobs=3)
+    assert time.perf_counter() - start < 2
+    assert script.commands["fail"].status == Command.Status.FAILED
+    assert script.commands["fail"].error == "exit code 2"
+    assert script.commands["skipped"].status == Command.Status.SKIPPED
+    assert script.commands["timeout"].status == Command.Status.FAILED
+
+
+class RecordApp(App):
+    name = "record"
+
+    def __init__(self):
+        self.calls = []
+
+    def init_parser(self, parser):
+        super().init_parser(parser)
+        parser.add_argument("words", nargs="*")
+
+    def run(self, words=None, **kwargs):
+        if words == ["fail"]:
+            raise ValueError("failed")
+        self.calls.append(words)
+        return words
+
+
+@pytest.fixture
+def apps():
+    apps = Apps(children=(ScriptApp(), RecordApp()))
+    apps.name = "mt"
+    apps.load()
+    yield apps
+    apps.close()
+
+
+def test_script_app_dispatch(apps, tmp_path):
+    path = tmp_path / "script.txt"
+    path.write_text("# comment\nmt record a b\n\nrecord c\n")
+    commands = apps.dispatch(argv=["run", str(path)])
+    assert [command.result for command in commands] == [["a", "b"], ["c"]]
+    assert apps.apps["record"].calls == [["a", "b"], ["c"]]
+
+
+def test_script_app_failure(apps, tmp_path):
+    path = tmp_path / "script.yaml"
+    path.write_text("- {id: a, cmd: record fail}\n" "- {id: b, cmd: record b, after: a}\n" "- {id: c, cmd: record c}\n")
+    with pytest.raises(SystemExit):
+        apps.dispatch(argv=["run", str(path), "-j", "2"])
+    assert apps.apps["record"].calls == [["c"]]
@@ -0,0 +1,47 @@
+import os
+import stat
+
+import pytest
+
+from media_tools.core.writer import AtomicWriter
+
+
+def test_write_replaces_file(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("old")
+    os.chmod(path, 0o640)
+    with AtomicWriter() as writer:
+        writer.write(path, "new")
+        writer.write(tmp_path / "data.bin", b"\x00\x01")
+        writer.write(tmp_path / "func.txt", lambda stream: stream.write("func"))
+    assert path.read_text() == "new"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert (tmp_path / "data.bin").read_bytes() == b"\x00\x01"
+    assert (tmp_path / "func.txt").read_text() == "func"
+    assert writer.dirs == set()
+
+
+def test_error_keeps_previous_version(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("old")
+    writer = AtomicWriter(fsync=False)
+    with pytest.raises(RuntimeError):
+        with writer.open(path) as stream:
+            stream.write("partial")
+            raise RuntimeError("interrupted")
+    assert path.read_text() == "old"
+    # no temporary file left
+    assert os.listdir(tmp_path) == ["file.txt"]
+
+
+def test_write_many(tmp_path):
+    items = [(tmp_path / f"{i}.txt", str(i)) for i in range(20)]
+    with AtomicWriter(jobs=4) as writer:
+        assert writer.write_many(items) == 20
+    assert all(path.read_text() == text for path, text in items)
+
+
+def test_invalid_mode(tmp_path):
+    with pytest.raises(ValueError):
+        with AtomicWriter().open(tmp_path / "file", "a"):
+            pass
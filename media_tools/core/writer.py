@@ -0,0 +1,132 @@
+from contextlib import contextmanager
+import os
+from pathlib import Path
+import threading
+import uuid
+
+from .files import map_ordered
+
+
+__all__ = ("AtomicWriter",)
+
+
+class AtomicWriter:
+    """Write files atomically: content is written into a temporary file in
+    the target directory, then renamed over the target. An interruption
+    leaves either the previous or the new version of a file, never a
+    truncated one.
+
+    Files are fsync'ed before being renamed; directories are fsync'ed once
+    on ``commit()``, whatever the number of files written into them. Use it
+    as a context manager in order to commit on exit.
+
+    Example:
+
+    .. code-block:: python
+
+        with AtomicWriter() as writer:
+            with writer.open(path) as stream:
+                stream.write(text)
+            writer.write_many((path, text) for path, text in files.items())
+    """
+
+    fsync = True
+    """Flush files and directories to disk (durability on power loss)."""
+    jobs = 8
+    """Number of threads used by ``write_many``."""
+
+    def __init__(self, fsync=None, jobs=None):
+        if fsync is not None:
+            self.fsync = fsync
+        if jobs is not None:
+            self.jobs = jobs
+        self.dirs = set()
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+
+    @contextmanager
+    def open(self, path, mode="w", encoding=None, errors=None, newline=None):
+        """Context manager providing a stream to write file into. The file
+        is only replaced when the block exits without error.
+
+        :param Path path: target file path.
+        :param str mode: writing mode (``"w"``, ``"wt"``, ``"wb"``; ``"+"`` is ignored).
+        :param str encoding: text encoding.
+        :param str errors: text encoding errors handling.
+        :param str newline: text newline mode.
+        """
+        mode = mode.replace("+", "")
+        if not mode.startswith("w"):
+            raise ValueError(f"Unsupported writing mode: {mode}")
+
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            # keep permissions of replaced file
+            try:
+                os.fchmod(fd, os.stat(path).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+
+            with open(fd, mode, encoding=encoding, errors=errors, newline=newline) as stream:
+                yield stream
+                stream.flush()
+                if self.fsync:
+                    os.fsync(stream.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        with self.lock:
+            self.dirs.add(path.parent)
+
+    def write(self, path, data, mode=None):
+        """Write file atomically.
+
+        :param Path path: target file path.
+        :param str|bytes|callable data: content, or function called with the stream as argument.
+        :param str mode: writing mode (default: ``"wb"`` for bytes, ``"w"`` otherwise).
+        """
+        mode = mode or ("wb" if isinstance(data, (bytes, bytearray, memoryview)) else "w")
+        with self.open(path, mode) as stream:
+            if callable(data):
+                data(stream)
+            else:
+                stream.write(data)
+        return path
+
+    def write_many(self, items, mode=None, jobs=None, progress=None):
+        """Write multiple files concurrently. Return number of written files.
+
+        :param Iterable[tuple] items: ``(path, data)`` tuples (see ``write()``).
+        :param str mode: writing mode.
+        :param int jobs: number of threads (default: ``self.jobs``).
+        :param Progress progress: report written files to it.
+        """
+        items = ((path, data, mode) for path, data in items)
+        count = 0
+        for _ in map_ordered(self.write, items, jobs or self.jobs):
+            count += 1
+            progress and progress.update()
+        return count
+
+    def commit(self):
+        """Flush written files' directories to disk."""
+        with self.lock:
+            dirs, self.dirs = self.dirs, set()
+        if not self.fsync:
+            return
+        for dir in dirs:
+            fd = os.open(dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
@@ -0,0 +1,88 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+import tarfile
+import zipfile
+
+from media_tools.core import action, FilesApp, logs, Progress
+from media_tools.core.files import map_ordered
+from media_tools.core.progress import format_bytes
+from media_tools.core.writer import AtomicWriter
+from . import archives
+
+
+__all__ = ("apps", "LibraryApp")
+
+
+def extract(path, target):
+    """Extract archive, returning ``(members, bytes, error)`` so that one
+    invalid archive doesn't stop others (run in worker processes)."""
+    try:
+        return *archives.extract(path, target), None
+    except (OSError, ValueError, zipfile.BadZipFile, tarfile.TarError) as err:
+        return 0, 0, str(err)
+
+
+class LibraryApp(FilesApp):
+    name = "library"
+    label = "Library"
+    groups = ("library", "music")
+    description = "Manage media library files: extract downloaded archives, compress directories."
+
+    stream_inputs = True
+
+    def init_parser(self, parser):
+        super().init_parser(parser)
+        parser.add_argument("-o", "--output", type=Path, help="Output directory (default: next to sources).")
+        parser.add_argument("--level", type=int, default=6, help="Compression level (0-9).")
+        # all cores by default
+        parser.set_defaults(jobs=os.cpu_count() or 1)
+
+    @action("unzip", action="store_true", help="Extract archives (zip, tar, tar.gz, tar.bz2, tar.xz) concurrently.")
+    def unzip(self, files, output=None, jobs=1, **kwargs):
+        items = []
+        for path in files:
+            format, stem = archives.get_format(path)
+            if format is None:
+                logs.warn(f"{path}: unsupported archive format, skipped.", format=False)
+                continue
+            items.append((path, (output or path.parent) / stem))
+
+        done = count = total = 0
+        with Progress("unzip", total=len(items)) as progress:
+            results = map_ordered(extract, items, jobs, ProcessPoolExecutor)
+            for (path, target), (members, size, error) in zip(items, results):
+                if error:
+                    logs.warn(f"{path}: {error}", format=False)
+                else:
+                    done += 1
+                    logs.detail(f"{path}: {members} files extracted into {target}.", format=False)
+                count, total = count + members, total + size
+                progress.update(bytes=size)
+        logs.info(f"{done} archives, {count} files extracted ({format_bytes(total)}).", format=False)
+
+    @action(
+        "compress",
+        nargs="?",
+        const="zip",
+        choices=("zip", "tar.gz"),
+        help="Compress source directories into archives (default: zip), members being compressed concurrently.",
+    )
+    def compress(self, files, compress, output=None, jobs=1, level=6, **kwargs):
+        func = archives.compress_zip if compress == "zip" else archives.compress_tar
+        dirs = [path for path in files if path.is_dir()]
+        if skipped := [str(path) for path in files if path not in dirs]:
+            logs.warn(f"Not directories, skipped: {', '.join(skipped)}", format=False)
+
+        total_bytes = sum(stat.st_size for path in dirs for _, _, stat in archives.get_members(path))
+        with AtomicWriter() as writer, Progress("compress", total=len(dirs), total_bytes=total_bytes) as progress:
+            for path in dirs:
+                target = (output or path.parent) / f"{path.name}.{compress}"
+                with writer.open(target, "wb") as stream:
+                    count = func(path, stream, jobs, level, progress)
+                progress.update()
+                logs.detail(f"{target}: {count} files.", format=False)
+        logs.info(f"{len(dirs)} archives written.")
+
+
+apps = LibraryApp()
@@ -0,0 +1,341 @@
+"""Streaming archives extraction and parallel compression.
+
+Extraction copies members by blocks from archive to disk, one archive per
+worker process. Compression compresses in worker threads (zlib releases
+the GIL) and writes a standard archive sequentially:
+
+- zip: members are deflated concurrently, then written with their
+  headers in order. Incompressible members (most media files) are stored
+  and copied as is; large ones are compressed into temporary files.
+- tar.gz: the tar stream is split into blocks compressed concurrently as
+  independent gzip members, whose concatenation is a valid gzip file
+  (as done by ``pigz``).
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import gzip
+import os
+from pathlib import Path
+import shutil
+import struct
+import tarfile
+import tempfile
+import zipfile
+import zlib
+
+from media_tools.core.files import map_ordered, walk_files
+
+
+__all__ = ("FORMATS", "get_format", "extract", "compress_zip", "compress_tar", "ZipWriter", "GzipBlocksWriter")
+
+
+FORMATS = {
+    ".zip": "zip",
+    ".tar": "tar",
+    ".tar.gz": "tar",
+    ".tgz": "tar",
+    ".tar.bz2": "tar",
+    ".tbz2": "tar",
+    ".tar.xz": "tar",
+    ".txz": "tar",
+}
+"""Supported archives extensions."""
+COPY_SIZE = 1 << 20
+"""Copy buffer size."""
+DATA_FILTER = hasattr(tarfile, "data_filter")
+"""Tar extraction filters are available (Python 3.11.4+)."""
+
+
+def get_format(path):
+    """Return ``(format, stem)`` of an archive path, or ``(None, None)``
+    if it is not supported."""
+    name = Path(path).name
+    for ext, format in FORMATS.items():
+        if name.lower().endswith(ext) and len(name) > len(ext):
+            return format, name[: -len(ext)]
+    return None, None
+
+
+# ---- extraction
+def extract(path, target):
+    """Extract archive into target directory (run in worker processes).
+    Return ``(members, bytes)`` counts.
+
+    Members are written by blocks: whole files are never loaded in memory.
+    Members with absolute paths or escaping target are refused; on error,
+    a target directory created by the extraction is removed. When the
+    archive only contains a directory named as target, its content is
+    moved up into target.
+    """
+    format, _ = get_format(path)
+    target = Path(target)
+    created = not target.exists()
+    target.mkdir(parents=True, exist_ok=True)
+    try:
+        if format == "tar":
+            count = size = 0
+            # "r:*" reads concatenated gzip members (pigz, GzipBlocksWriter), unlike "r|*"
+            with tarfile.open(path, "r:*") as archive:
+                for member in archive:
+                    if DATA_FILTER:
+                        archive.extract(member, target, filter="data")
+                    else:
+                        check_tar_member(member, target)
+                        archive.extract(member, target)
+                    count += 1
+                    size += member.size
+        else:
+            count, size = extract_zip(path, target)
+    except BaseException:
+        # don't leave a partly extracted archive
+        if created:
+            shutil.rmtree(target, ignore_errors=True)
+        raise
+
+    if os.listdir(target) == [target.name] and (target / target.name).is_dir():
+        tmp = target.with_name(f".{target.name}.part")
+        os.rename(target / target.name, tmp)
+        target.rmdir()
+        os.rename(tmp, target)
+    return count, size
+
+
+def check_path(root, name):
+    """Return destination path of an archive member, raising ``ValueError``
+    if it is absolute or outside of root directory."""
+    dest = os.path.realpath(os.path.join(root, name))
+    if os.path.isabs(name) or os.path.commonpath((root, dest)) != root:
+        raise ValueError(f"unsafe member path {name}")
+    return dest
+
+
+def check_tar_member(member, target):
+    """Refuse unsafe tar members (when extraction filters are not
+    available): paths and links outside of target, devices."""
+    root = os.path.realpath(target)
+    check_path(root, member.name)
+    if member.issym():
+        check_path(root, os.path.join(os.path.dirname(member.name), member.linkname))
+    elif member.islnk():
+        check_path(root, member.linkname)
+    elif member.isdev():
+        raise ValueError(f"unsafe member {member.name}: device file")
+
+
+def extract_zip(path, target):
+    root = os.path.realpath(target)
+    count = size = 0
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if not info.flag_bits & 0x800:
+                # names without UTF-8 flag are decoded as cp437, though often UTF-8
+                try:
+                    name = name.encode("cp437").decode("utf-8")
+                except UnicodeError:
+                    pass
+            dest = check_path(root, name)
+            if info.is_dir():
+                os.makedirs(dest, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with archive.open(info) as src, open(dest, "wb") as dst:
+                shutil.copyfileobj(src, dst, COPY_SIZE)
+            mtime = datetime(*info.date_time).timestamp()
+            os.utime(dest, (mtime, mtime))
+            count += 1
+            size += info.file_size
+    return count, size
+
+
+# ---- compression
+def get_members(root):
+    """Yield ``(path, arcname, stat)`` of files under root directory,
+    sorted by path. Archive names are prefixed by root's name."""
+    root = os.path.abspath(root)
+    base = os.path.dirname(root)
+    items = sorted(os.path.join(path, name) for path, name, _ in walk_files((root,)))
+    for path in items:
+        yield path, os.path.relpath(path, base), os.stat(path)
+
+
+def is_compressible(path, sample_size=1 << 16):
+    """Return True if a sample of file's content compresses."""
+    with open(path, "rb") as stream:
+        sample = stream.read(sample_size)
+    return len(zlib.compress(sample, 1)) < len(sample) * 0.9
+
+
+def deflate_member(path, level=6, memory_size=1 << 24, tmp_dir=None):
+    """Compress a file (run in worker threads). Return ``(method, crc, size,
+    compressed_size, data)``, where data is compressed bytes, a temporary
+    file path (for compressed files larger than ``memory_size``), or None
+    for stored members (copied from source)."""
+    crc = size = 0
+    if not is_compressible(path):
+        with open(path, "rb") as stream:
+            while block := stream.read(COPY_SIZE):
+                crc = zlib.crc32(block, crc)
+                size += len(block)
+        return zipfile.ZIP_STORED, crc, size, size, None
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    large = os.stat(path).st_size > memory_size
+    out = tempfile.NamedTemporaryFile(dir=tmp_dir, prefix=".", suffix=".part", delete=False) if large else None
+    parts = []
+    try:
+        with open(path, "rb") as stream:
+            while block := stream.read(COPY_SIZE):
+                crc = zlib.crc32(block, crc)
+                size += len(block)
+                data = compressor.compress(block)
+                out.write(data) if out else parts.append(data)
+        data = compressor.flush()
+        if out:
+            out.write(data)
+            out.close()
+            return zipfile.ZIP_DEFLATED, crc, size, os.stat(out.name).st_size, Path(out.name)
+        parts.append(data)
+    except BaseException:
+        if out:
+            out.close()
+            os.unlink(out.name)
+        raise
+    data = b"".join(parts)
+    return zipfile.ZIP_DEFLATED, crc, size, len(data), data
+
+
+class ZipWriter:
+    """Write a zip file from already compressed members, with ZIP64
+    extensions when needed."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.entries = []
+        self.offset = 0
+
+    def write(self, data):
+        self.stream.write(data)
+        self.offset += len(data)
+
+    def add(self, name, stat, method, crc, size, compressed_size, data):
+        """Add a member.
+
+        :param str name: member name.
+        :param os.stat_result stat: source stat (modification time and mode).
+        :param bytes|Path data: compressed data, or file to copy it from.
+        """
+        name = name.replace(os.sep, "/").encode("utf-8", "surrogateescape")
+        dt = datetime.fromtimestamp(max(stat.st_mtime, 315532800))
+        dos_time = dt.hour << 11 | dt.minute << 5 | dt.second // 2
+        dos_date = (dt.year - 1980) << 9 | dt.month << 5 | dt.day
+        zip64 = size >= 0xFFFFFFFF or compressed_size >= 0xFFFFFFFF
+        extra = struct.pack("<HHQQ", 1, 16, size, compressed_size) if zip64 else b""
+        header_sizes = (0xFFFFFFFF, 0xFFFFFFFF) if zip64 else (compressed_size, size)
+        version = 45 if zip64 else 20
+        entry = (name, stat.st_mode, method, dos_time, dos_date, crc, size, compressed_size, self.offset, version)
+        self.entries.append(entry)
+        fields = (0x04034B50, version, 0x800, method, dos_time, dos_date, crc, *header_sizes, len(name), len(extra))
+        self.write(struct.pack("<IHHHHHIIIHH", *fields) + name + extra)
+        if isinstance(data, (bytes, bytearray)):
+            self.write(data)
+        else:
+            with open(data, "rb") as src:
+                while block := src.read(COPY_SIZE):
+                    self.write(block)
+
+    def close(self):
+        """Write central directory."""
+        start = self.offset
+        for name, mode, method, dos_time, dos_date, crc, size, csize, offset, version in self.entries:
+            values = [value for value in (size, csize, offset) if value >= 0xFFFFFFFF]
+            extra = struct.pack(f"<HH{len(values)}Q", 1, 8 * len(values), *values) if values else b""
+            sizes = [0xFFFFFFFF if value >= 0xFFFFFFFF else value for value in (csize, size, offset)]
+            header = (0x02014B50, 0x0300 | version, version, 0x800, method, dos_time, dos_date, crc, *sizes[:2])
+            fields = (*header, len(name), len(extra), 0, 0, 0, (mode & 0xFFFF) << 16, sizes[2])
+            self.write(struct.pack("<IHHHHHHIIIHHHHHII", *fields) + name + extra)
+        count, size = len(self.entries), self.offset - start
+        if count >= 0xFFFF or start >= 0xFFFFFFFF or size >= 0xFFFFFFFF:
+            end = self.offset
+            self.write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, size, start))
+            self.write(struct.pack("<IIQI", 0x07064B50, 0, end, 1))
+            count, size, start = min(count, 0xFFFF), min(size, 0xFFFFFFFF), min(start, 0xFFFFFFFF)
+        self.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, size, start, 0))
+
+
+def compress_zip(root, stream, jobs=4, level=6, progress=None):
+    """Compress directory into a zip file, members being compressed
+    concurrently. Return number of members.
+
+    :param Path root: directory to compress.
+    :param BinaryIO stream: output stream.
+    """
+    members = list(get_members(root))
+    tmp_dir = os.path.dirname(os.path.abspath(root))
+    items = ((source, level, 1 << 24, tmp_dir) for source, _, _ in members)
+    writer = ZipWriter(stream)
+    results = map_ordered(deflate_member, items, jobs, ThreadPoolExecutor)
+    for (source, name, stat), (method, crc, size, csize, data) in zip(members, results):
+        try:
+            writer.add(name, stat, method, crc, size, csize, data if data is not None else Path(source))
+        finally:
+            if isinstance(data, Path):
+                data.unlink(missing_ok=True)
+        progress and progress.update(0, size)
+    writer.close()
+    return len(members)
+
+
+class GzipBlocksWriter:
+    """File-like object compressing data by blocks of ``block_size`` bytes
+    concurrently, each one as a gzip member, written in order to the
+    output stream. At most ``2 * jobs`` blocks are kept in memory."""
+
+    block_size = 1 << 22
+
+    def __init__(self, stream, jobs=4, level=6):
+        self.stream = stream
+        self.jobs = jobs
+        self.level = level
+        self.buffer = bytearray()
+        self.pending = deque()
+        self.executor = ThreadPoolExecutor(jobs)
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self.submit(bytes(self.buffer[: self.block_size]))
+            del self.buffer[: self.block_size]
+        return len(data)
+
+    def submit(self, block):
+        self.pending.append(self.executor.submit(gzip.compress, block, self.level, mtime=0))
+        while len(self.pending) > 2 * self.jobs:
+            self.stream.write(self.pending.popleft().result())
+
+    def close(self):
+        if self.buffer or not self.pending:
+            self.submit(bytes(self.buffer))
+            self.buffer.clear()
+        while self.pending:
+            self.stream.write(self.pending.popleft().result())
+        self.executor.shutdown()
+
+
+def compress_tar(root, stream, jobs=4, level=6, progress=None):
+    """Compress directory into a tar.gz stream, compressed by blocks
+    concurrently. Return number of members."""
+    writer = GzipBlocksWriter(stream, jobs, level)
+    count = 0
+    try:
+        with tarfile.open(fileobj=writer, mode="w|", format=tarfile.PAX_FORMAT) as archive:
+            for path, name, stat in get_members(root):
+                info = archive.gettarinfo(path, name)
+                with open(path, "rb") as src:
+                    archive.addfile(info, src)
+                count += 1
+                progress and progress.update(0, stat.st_size)
+    finally:
+        writer.close()
+    return count
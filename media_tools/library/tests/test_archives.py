@@ -0,0 +1,117 @@
+import io
+import os
+from pathlib import Path
+import tarfile
+import zipfile
+
+import pytest
+
+from media_tools.library import archives
+
+
+@pytest.fixture
+def album(tmp_path):
+    root = tmp_path / "src" / "Album"
+    (root / "CD1").mkdir(parents=True)
+    (root / "CD1" / "track.flac").write_bytes(os.urandom(300_000))
+    (root / "notes.txt").write_text("\n".join(str(i) for i in range(50_000)))
+    (root / "empty").write_bytes(b"")
+    return root
+
+
+def read_tree(root):
+    return {
+        os.path.relpath(os.path.join(path, name), root): Path(path, name).read_bytes()
+        for path, _, names in os.walk(root)
+        for name in names
+    }
+
+
+def test_get_format():
+    assert archives.get_format("a/Album.tar.gz") == ("tar", "Album")
+    assert archives.get_format("Album.ZIP") == ("zip", "Album")
+    assert archives.get_format("Album.rar") == (None, None)
+
+
+@pytest.mark.parametrize("format", ["zip", "tar.gz"])
+def test_compress_extract_round_trip(album, tmp_path, monkeypatch, format):
+    # several gzip members are written for tar.gz
+    monkeypatch.setattr(archives.GzipBlocksWriter, "block_size", 1 << 16)
+    path = tmp_path / f"Album.{format}"
+    func = archives.compress_zip if format == "zip" else archives.compress_tar
+    with open(path, "wb") as stream:
+        assert func(album, stream, jobs=2) == 3
+
+    if format == "zip":
+        with zipfile.ZipFile(path) as archive:
+            assert archive.testzip() is None
+            assert sorted(archive.namelist()) == ["Album/CD1/track.flac", "Album/empty", "Album/notes.txt"]
+    else:
+        with tarfile.open(path, "r:gz") as archive:
+            assert sorted(archive.getnames()) == ["Album/CD1/track.flac", "Album/empty", "Album/notes.txt"]
+
+    target = tmp_path / "out" / "Album"
+    count, size = archives.extract(path, target)
+    assert count == 3
+    assert size == sum(len(data) for data in read_tree(album).values())
+    # single top directory named as target is moved up
+    assert read_tree(target) == read_tree(album)
+
+
+def test_extract_unsafe_zip_removes_target(tmp_path):
+    path = tmp_path / "evil.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("ok.txt", "ok")
+        archive.writestr("../evil.txt", "evil")
+    target = tmp_path / "out" / "evil"
+    with pytest.raises(ValueError):
+        archives.extract(path, target)
+    assert not target.exists()
+    assert not (tmp_path / "out" / "evil.txt").exists()
+
+
+def test_gzip_blocks_writer_is_valid_gzip(monkeypatch):
+    import gzip
+
+    monkeypatch.setattr(archives.GzipBlocksWriter, "block_size", 10)
+    stream = io.BytesIO()
+    writer = archives.GzipBlocksWriter(stream, jobs=2)
+    data = bytes(range(256)) * 3
+    writer.write(data[:100])
+    writer.write(data[100:])
+    writer.close()
+    assert gzip.decompress(stream.getvalue()) == data
+
+
+@pytest.mark.parametrize("data_filter", [True, False])
+@pytest.mark.parametrize("name,link", [("../evil.txt", None), ("/tmp/evil.txt", None), ("link", "../../evil.txt")])
+def test_extract_unsafe_tar(tmp_path, monkeypatch, data_filter, name, link):
+    monkeypatch.setattr(archives, "DATA_FILTER", data_filter and archives.DATA_FILTER)
+    path = tmp_path / "evil.tar"
+    with tarfile.open(path, "w") as archive:
+        info = tarfile.TarInfo(name)
+        if link:
+            info.type, info.linkname = tarfile.SYMTYPE, link
+            archive.addfile(info)
+        else:
+            info.size = 4
+            archive.addfile(info, io.BytesIO(b"evil"))
+    target = tmp_path / "out" / "evil"
+    if archives.DATA_FILTER and name.startswith("/"):
+        # leading slash is stripped by "data" filter
+        archives.extract(path, target)
+        assert (target / name.lstrip("/")).read_bytes() == b"evil"
+        return
+    with pytest.raises((ValueError, tarfile.TarError)):
+        archives.extract(path, target)
+    assert not target.exists()
+
+
+def test_extract_tar_without_data_filter(album, tmp_path, monkeypatch):
+    monkeypatch.setattr(archives, "DATA_FILTER", False)
+    path = tmp_path / "Album.tar.gz"
+    with open(path, "wb") as stream:
+        archives.compress_tar(album, stream)
+    target = tmp_path / "out" / "Album"
+    assert archives.extract(path, target)[0] == 3
+    assert read_tree(target) == read_tree(album)
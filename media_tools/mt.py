@@ -1,17 +1,26 @@
+import os
 from pathlib import Path
 import sys
 
 from .core.apps import search_paths, apps
+from .core.daemon import Client
 
 
 __all__ = ("main",)
 
 
 def main(filename="apps.py", paths=None, argv=None):
-    """Run function of CLI interface."""
+    """Run function of CLI interface.
+
+    When a server is running (``mt serve``), forward command to it.
+    """
     argv = argv or sys.argv
     paths = paths or search_paths
 
+    if argv[1:2] != ["serve"] and not os.environ.get("MT_NO_DAEMON"):
+        if client := Client.connect():
+            sys.exit(client.request(argv[1:]))
+
     apps.name = Path(__file__).stem
     apps.load()
     apps.dispatch(argv=argv[1:])
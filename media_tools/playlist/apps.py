@@ -1,50 +1,322 @@
+import itertools
 from pathlib import Path
+import sys
 
-from media_tools.core import action, Apps
+from media_tools.core import action, FilesApp, logs
+from media_tools.core.writer import AtomicWriter
+from . import m3u
+from .export import Exporter
+from .fix import Fixer
+from .library import Library
+from .paths import is_remote, PathIndex
+from .pipeline import Pipeline
+from .smart import SmartPlaylists
+from .tags import MetadataCache
 
 
 __all__ = ("apps", "PlaylistApp")
 
 
-class PlaylistApp(Apps):
+class PlaylistApp(FilesApp):
     name = "playlist"
     label = "Playlist"
     groups = ("library", "music")
-    description = (
-        "This tool provide utilities for M3U playlists."
-    )
+    description = "This tool provide utilities for M3U playlists."
+
+    stream_inputs = True
+    build_cache = True
+    open_kwargs = {"encoding": "utf-8", "errors": "surrogateescape", "newline": ""}
+    """Arguments used to open playlist files for writing."""
+
+    def init_parser(self, parser):
+        super().init_parser(parser)
+        parser.add_argument(
+            "--inode", action="store_true", help="Identify tracks by device and inode (hard links, symlinks)."
+        )
+        parser.add_argument("-o", "--output", type=Path, help="Pipeline output file (default: standard output).")
+        parser.add_argument(
+            "--root",
+            type=Path,
+            help="Export tracks relative to this directory (default: fix LIBRARY, or their common directory).",
+        )
+
+    def run(
+        self,
+        files,
+        merge=None,
+        unique=False,
+        fix=None,
+        export=None,
+        extinf=False,
+        smart=None,
+        pipeline=None,
+        output=None,
+        root=None,
+        inode=False,
+        jobs=1,
+        **kwargs,
+    ):
+        if smart:
+            # sources are library directories
+            return self.smart(files.keys(), smart, jobs)
 
-    def run(self, files, merge, unique=False, **kwargs):
-        originals = files.copy()
+        # shared by all playlists of the run
+        index = PathIndex(inode=inode)
+        cache = MetadataCache(jobs=max(jobs, MetadataCache.jobs)) if extinf else None
+        if fix is not None:
+            self.fix_files(files.keys(), None if fix is True else fix, index, jobs, kwargs.get("no_cache", False))
+        if pipeline:
+            return self.pipeline(files.keys(), pipeline, output, index)
         if merge:
             # when merging, only merged file is updated
-            files = {merge: self.merge(files.values())}
+            with logs.span("playlist.merge", playlists=len(files)):
+                entries = self.merge(m3u.read(file.path) for file in files.values())
+                if unique:
+                    entries = self.unique(entries, index)
+                if extinf:
+                    entries = self.extinf(entries, index, cache)
+                with AtomicWriter() as writer, writer.open(merge, **self.open_kwargs) as stream:
+                    count = m3u.write(stream, entries)
+            logs.gauge("playlist.tracks", count)
+            logs.info(f"Merged {len(files)} playlists into {merge} ({count} tracks).")
+        elif unique or extinf:
+            with AtomicWriter() as writer:
+                if unique:
+                    items = ((path, writer, index) for path in files.keys())
+                    for path, duplicates in zip(files.keys(), self.map(self.unique_file, items, jobs=jobs)):
+                        if duplicates:
+                            logs.detail(f"{path}: {duplicates} duplicates removed.")
+                if extinf:
+                    for path in files.keys():
+                        if count := self.extinf_file(path, writer, index, cache):
+                            logs.detail(f"{path}: {count} #EXTINF added.")
+        if export:
+            playlists = {path: list(m3u.read(path)) for path in files.keys()}
+            if root is None and fix not in (None, True):
+                root = fix
+            self.export(playlists, export, root, index, max(jobs, Exporter.jobs))
+        if cache:
+            logs.count("playlist.metadata.cache_hits", cache.hits)
+            logs.count("playlist.metadata.cache_misses", cache.misses)
+            cache.close()
 
-        if unique:
-            for source, playlist in files.items():
-                items = self.remove_duplicates(playlist)
-                if items != playlist:
-                    files[source] = items
+    def dispatch(self, argv=None, **kwargs):
+        if argv:
+            kwargs.update(vars(self.parser.parse_args(argv)))
+        if not kwargs.get("pipeline") or kwargs.get("output") is not None:
+            return super().dispatch(**kwargs)
 
-        self.save(files, originals)
+        # playlist is written to standard output: keep logs out of it
+        stream, logs.stream = logs.stream, sys.stderr
+        try:
+            return super().dispatch(**kwargs)
+        finally:
+            logs.stream = stream
 
-    @action("merge", "-m", type=Path,
-        help="Merge provided source into this file output.")
+    def get_build_units(self, paths, context):
+        if context.get("fix") is not None or any(context.get(key) for key in ("export", "smart", "pipeline")):
+            # library, tracks and other playlists states are not tracked by build cache
+            return []
+        if merge := context.get("merge"):
+            return [(tuple(paths), (merge,))]
+        return super().get_build_units(paths, context)
+
+    @action("merge", "-m", type=Path, help="Merge provided source into this file output.")
     def merge(self, playlists):
-        """ Return a list from contatenated playlists iterable. """
-        return list(itertools.chain(*playlists))
+        """Return an iterator of concatenated playlists entries."""
+        return m3u.merge(*playlists)
+
+    @action("unique", "-u", action="store_true", help="Remove duplicate tracks inside the playlist.")
+    def unique(self, entries, index=None):
+        """Return an iterator over entries, removing duplicate tracks (order
+        is kept).
+
+        :param Iterable[Entry] entries: playlist entries.
+        :param PathIndex index: identify tracks using this index (default: a new one).
+        """
+        stats = {}
+        yield from m3u.unique(entries, stats, (index or PathIndex()).key)
+        logs.count("playlist.duplicates", stats["duplicates"])
+
+    @action(
+        "fix",
+        nargs="?",
+        const=True,
+        type=Path,
+        metavar="LIBRARY",
+        help="Report missing tracks, and repair them by looking up into LIBRARY directory.",
+    )
+    def fix(self, entries, library=None, index=None, jobs=8):
+        """Find missing tracks in entries and repair them in place. Return
+        fixed ``(entry, old_path)`` and unmatched entries.
+
+        :param [Entry] entries: entries of one or more playlists.
+        :param Library library: library to look up missing tracks into.
+        :param PathIndex index: path normalization index.
+        :param int jobs: number of threads.
+        """
+        fixer = Fixer(library, index, jobs)
+        with logs.span("playlist.check", tracks=len(entries)):
+            missing = fixer.check(entries)
+        if missing and library is not None:
+            with logs.span("playlist.fix", missing=len(missing)):
+                return fixer.fix(missing)
+        return [], [entry for entry, _ in missing]
+
+    @action("extinf", action="store_true", help="Add missing #EXTINF (duration, title) from tracks metadata.")
+    def extinf(self, entries, index=None, cache=None, stats=None):
+        """Yield entries, adding ``#EXTINF`` directive to tracks without
+        duration. Metadata are read from files' headers (see ``tags``).
+
+        :param Iterable[Entry] entries: playlist entries.
+        :param PathIndex index: path normalization index.
+        :param MetadataCache cache: metadata cache.
+        :param dict stats: if provided, set ``"added"`` count into it.
+        """
+        index = index or PathIndex()
+        cache = cache or MetadataCache()
+        entries, lookups = itertools.tee(entries)
+        paths = (
+            index.normalize(e.path, e.base) if e.path is not None and not is_remote(e.path) and not e.info[0] else None
+            for e in lookups
+        )
+        added = 0
+        # metadata first: cache is committed once exhausted
+        for (_, meta), entry in zip(cache.get_many(paths), entries):
+            if meta:
+                entry.set_info(meta.duration, entry.title or meta.get_label())
+                added += 1
+            yield entry
+        logs.count("playlist.extinf", added)
+        if stats is not None:
+            stats["added"] = added
+
+    def extinf_file(self, path, writer, index=None, cache=None):
+        """Add missing ``#EXTINF`` to playlist file, rewriting it only if
+        changed. Return number of updated entries."""
+        stats = {}
+        with logs.span("playlist.extinf", path=str(path)):
+            entries = list(self.extinf(m3u.read(path), index, cache, stats))
+            if stats["added"]:
+                with writer.open(path, **self.open_kwargs) as stream:
+                    m3u.write(stream, entries)
+        return stats["added"]
+
+    @action(
+        "smart", type=Path, metavar="RULES", help="Generate playlists from RULES file; sources are library directories."
+    )
+    def smart(self, roots, rules, jobs=8):
+        """Generate smart playlists from rules file, evaluating all rules in
+        a single walk of library directories. Unchanged playlists are not
+        rewritten.
+
+        :param [Path] roots: library directories.
+        :param Path rules: rules file (see ``SmartPlaylists``).
+        :param int jobs: number of threads used to list directories.
+        """
+        smart = SmartPlaylists.from_file(rules)
+        cache = MetadataCache(jobs=max(jobs, MetadataCache.jobs))
+        with logs.span("playlist.smart", rules=len(smart.rules)):
+            try:
+                results = smart.evaluate(roots, max(jobs, 8), cache)
+            finally:
+                cache.close()
+            with AtomicWriter() as writer:
+                written = smart.save(results, writer)
+        logs.count("playlist.smart.written", written)
+        logs.info(f"Smart playlists: {written} updated, {len(smart.rules) - written} unchanged.")
+
+    @action("pipeline", "-p", metavar="EXPR", help="Process playlists through a pipeline (see `Pipeline`).")
+    def pipeline(self, paths, expr, output=None, index=None):
+        """Run pipeline expression over merged playlists, writing result to
+        output.
+
+        :param [Path] paths: input playlists.
+        :param str expr: pipeline expression (see ``Pipeline``).
+        :param Path output: output file (default: standard output).
+        :param PathIndex index: path normalization index.
+        """
+        try:
+            pipeline = Pipeline.parse(expr, (index or PathIndex()).key)
+        except ValueError as err:
+            self.parser.error(str(err))
+
+        with logs.span("playlist.pipeline", stages=len(pipeline.stages)):
+            entries = pipeline(m3u.merge(*(m3u.read(path) for path in paths)))
+            if output is None:
+                count = m3u.write(sys.stdout, entries)
+            else:
+                with AtomicWriter() as writer, writer.open(output, **self.open_kwargs) as stream:
+                    count = m3u.write(stream, entries)
+                logs.info(f"Wrote {output} ({count} tracks).")
+        logs.gauge("playlist.tracks", count)
+
+    @action("export", type=Path, metavar="DIR", help="Copy playlists and their tracks into DIR (skip unchanged files).")
+    def export(self, playlists, target, root=None, index=None, jobs=4):
+        """Export playlists and their tracks into target directory.
+
+        :param {Path: [Entry]} playlists: playlists' entries.
+        :param Path target: target directory.
+        :param Path root: tracks are copied relative to this directory (default: their common directory).
+        :param PathIndex index: path normalization index.
+        :param int jobs: number of concurrent copies.
+        """
+        exporter = Exporter(target, root, index, jobs)
+        with logs.span("playlist.export", target=str(target)), AtomicWriter() as writer:
+            copied, skipped, missing = exporter.export(playlists, writer)
+        logs.info(f"Exported {len(playlists)} playlists to {target}: {copied} copied, {skipped} unchanged.")
+        if missing:
+            logs.warn(f"{missing} tracks are missing.")
+
+    def get_library(self, root, jobs=1, full=False):
+        """Return up to date library index for the provided directory.
+
+        :param Path root: library directory.
+        :param int jobs: number of threads used to scan directories.
+        :param bool full: rescan all directories.
+        """
+        library = Library(root, jobs=max(jobs, Library.jobs))
+        listed = library.update(full=full)
+        logs.detail(f"Library {library.root}: {len(library)} files ({listed} directories scanned).")
+        return library
+
+    def fix_files(self, paths, library, index, jobs=1, full=False):
+        """Fix playlist files, rewriting those with repaired tracks."""
+        playlists = {path: list(m3u.read(path)) for path in paths}
+        library = library and self.get_library(library, jobs, full)
+
+        tracks = [entry for entries in playlists.values() for entry in entries if entry.is_track]
+        fixed, unmatched = self.fix(tracks, library, index, max(jobs, 8))
+        fixed = {id(entry): old_path for entry, old_path in fixed}
+        unmatched = {id(entry) for entry in unmatched}
 
-    @action("unique", "-u", action="store_true",
-        help="Remove duplicate tracks inside the playlist.")
-    def unique(self, playlist):
-        """ Remove duplicate tracks from the provided list """
-        return list(set(playlist))
+        with AtomicWriter() as writer:
+            for path, entries in playlists.items():
+                changed = False
+                for entry in entries:
+                    if id(entry) in fixed:
+                        logs.info(f"{path}: fixed {fixed[id(entry)]} -> {entry.path}", format=False)
+                        changed = True
+                    elif id(entry) in unmatched:
+                        logs.warn(f"{path}: not found {entry.path}", format=False)
+                if changed:
+                    with writer.open(path, **self.open_kwargs) as stream:
+                        m3u.write(stream, entries)
 
-    def read_file(self, file):
-        return file.read().split("\n")
+        logs.count("playlist.fixed", len(fixed))
+        logs.count("playlist.unmatched", len(unmatched))
+        logs.info(f"Checked {len(tracks)} tracks: {len(fixed)} fixed, {len(unmatched)} not found.")
 
-    def write_file(self, file, value):
-        file.write("\n".join(l for l in value))
+    def unique_file(self, path, writer, index=None):
+        """Remove duplicate tracks from file. The file is only rewritten when
+        there are duplicates. Return number of removed duplicates."""
+        with logs.span("playlist.unique", path=str(path)):
+            index = index or PathIndex()
+            duplicates = m3u.count_duplicates(path, index.key)
+            if duplicates:
+                with writer.open(path, **self.open_kwargs) as stream:
+                    m3u.write(stream, self.unique(m3u.read(path), index))
+        return duplicates
 
 
 apps = PlaylistApp()
@@ -0,0 +1,121 @@
+import os
+from pathlib import Path
+
+from media_tools.core.files import copy_file, is_same_file, map_ordered
+from media_tools.core.logs import logs
+from media_tools.core.progress import Progress
+from . import m3u
+from .paths import is_remote, PathIndex
+
+
+__all__ = ("Exporter",)
+
+
+class Exporter:
+    """Export playlists and their tracks into a target directory (such as
+    a music player or a SD card).
+
+    Tracks are copied under the target directory, keeping their paths
+    relative to a root directory: the library one if provided, otherwise
+    the tracks' common directory. Playlists are written at the target's
+    root, with relative paths.
+
+    Files already present with the same size and modification time are
+    skipped; interrupted copies are resumed (see ``copy_file``).
+    """
+
+    jobs = 4
+    """Number of files copied concurrently."""
+    open_kwargs = {"encoding": "utf-8", "errors": "surrogateescape", "newline": ""}
+    """Arguments used to open playlist files for writing."""
+
+    def __init__(self, target, root=None, index=None, jobs=None):
+        """
+        :param Path target: target directory.
+        :param Path root: tracks' root directory (such as library's one).
+        :param PathIndex index: path normalization index.
+        :param int jobs: number of threads.
+        """
+        self.target = Path(target)
+        self.index = index or PathIndex()
+        self.root = root and self.index.realdir(os.path.abspath(root))
+        if jobs:
+            self.jobs = jobs
+
+    def get_tracks(self, playlists):
+        """Return ``{source: relative target path}`` of playlists' tracks.
+
+        :param {Path: [Entry]} playlists: playlists entries.
+        """
+        sources = {
+            self.index.normalize(entry.path, entry.base)
+            for entries in playlists.values()
+            for entry in entries
+            if entry.path is not None and not is_remote(entry.path)
+        }
+        if not sources:
+            return {}
+        root = self.root or os.path.commonpath([os.path.dirname(path) for path in sources])
+        tracks = {}
+        for path in sorted(sources):
+            rel = os.path.relpath(path, root)
+            if rel.startswith(os.pardir + os.sep):
+                # outside of root: keep absolute path's hierarchy
+                rel = os.path.relpath(path, os.sep)
+            tracks[path] = rel
+        return tracks
+
+    def export(self, playlists, writer):
+        """Copy tracks and write playlists. Return ``(copied, skipped,
+        missing)`` files counts.
+
+        :param {Path: [Entry]} playlists: playlists entries.
+        :param AtomicWriter writer: writer used to save playlists.
+        """
+        tracks = self.get_tracks(playlists)
+        items, skipped, missing = [], 0, set()
+        for source, rel in tracks.items():
+            try:
+                stat = os.stat(source)
+            except OSError:
+                missing.add(source)
+                continue
+            target = self.target / rel
+            try:
+                if is_same_file(stat, os.stat(target)):
+                    skipped += 1
+                    continue
+            except FileNotFoundError:
+                pass
+            items.append((source, target, stat.st_size))
+
+        with Progress("export", total=len(items), total_bytes=sum(size for *_, size in items)) as progress:
+            for size in map_ordered(self.copy, ((s, t, progress) for s, t, _ in items), self.jobs):
+                logs.count("playlist.export.bytes", size)
+        logs.count("playlist.export.copied", len(items))
+        logs.count("playlist.export.skipped", skipped)
+
+        for path, entries in playlists.items():
+            with writer.open(self.target / Path(path).name, **self.open_kwargs) as stream:
+                m3u.write(stream, self.get_entries(entries, tracks, missing))
+        return len(items), skipped, len(missing)
+
+    def copy(self, source, target, progress=None):
+        """Copy a track. Return copied bytes."""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        size = copy_file(source, target)
+        progress and progress.update(bytes=size)
+        return size
+
+    def get_entries(self, entries, tracks, missing):
+        """Yield entries with paths relative to the target directory,
+        dropping missing tracks."""
+        for entry in entries:
+            if entry.path is None or is_remote(entry.path):
+                yield entry
+                continue
+            source = self.index.normalize(entry.path, entry.base)
+            if source in missing:
+                logs.warn(f"Missing track: {entry.path}", format=False)
+                continue
+            yield m3u.Entry(Path(tracks[source]).as_posix(), entry.prefix, entry.eol)
@@ -0,0 +1,78 @@
+import os
+from pathlib import Path
+
+from media_tools.core.files import list_dir, map_ordered
+from .paths import is_remote, is_url, PathIndex
+
+
+__all__ = ("Fixer",)
+
+
+class Fixer:
+    """Detect playlists' missing tracks and repair them using a library.
+
+    Instead of one ``stat`` per track, each directory referenced by the
+    playlists is listed once (concurrently).
+    """
+
+    jobs = 8
+    """Number of threads used to list directories."""
+
+    def __init__(self, library=None, index=None, jobs=None):
+        """
+        :param Library library: library used to find missing tracks.
+        :param PathIndex index: path normalization index.
+        :param int jobs: number of threads.
+        """
+        self.library = library
+        self.index = index or PathIndex()
+        if jobs:
+            self.jobs = jobs
+        self.listings = {}
+
+    def check(self, entries):
+        """Return missing tracks of entries, as a list of ``(entry,
+        path)`` where path is the normalized track path.
+
+        :param Iterable[Entry] entries: entries of one or more playlists.
+        """
+        tracks = [
+            (entry, self.index.normalize(entry.path, entry.base))
+            for entry in entries
+            if entry.path is not None and not is_remote(entry.path)
+        ]
+        dirs = {os.path.dirname(path) for _, path in tracks} - self.listings.keys()
+        dirs = list(dirs)
+        for path, names in zip(dirs, map_ordered(list_dir, ((d,) for d in dirs), self.jobs)):
+            self.listings[path] = names and frozenset(name for name, _, _ in names)
+        return [(entry, path) for entry, path in tracks if not self.exists(path)]
+
+    def exists(self, path):
+        """Return True if the file is in its directory listing."""
+        head, tail = os.path.split(path)
+        return tail in (self.listings.get(head) or ())
+
+    def fix(self, missing):
+        """Repair missing tracks, updating entries in place. Return fixed
+        ``(entry, old_path)`` and unmatched entries.
+
+        :param [(Entry, str)] missing: missing tracks, as returned by ``check()``.
+        """
+        fixed, unmatched = [], []
+        for entry, path in missing:
+            found = self.library and self.library.find(os.path.basename(path), entry.title)
+            if found:
+                fixed.append((entry, entry.path))
+                entry.path = self.get_entry_path(entry, found)
+            else:
+                unmatched.append(entry)
+        return fixed, unmatched
+
+    def get_entry_path(self, entry, path):
+        """Return path to write in playlist for a found track, keeping the
+        form of the original one (URI, absolute or relative)."""
+        if is_url(entry.path):
+            return Path(path).as_uri()
+        if os.path.isabs(entry.path) or not entry.base:
+            return path
+        return os.path.relpath(path, entry.base)
@@ -0,0 +1,254 @@
+import hashlib
+import os
+from pathlib import Path
+import sqlite3
+
+from media_tools.core.dirs import get_cache_dir
+from media_tools.core.files import list_dir, map_ordered
+from media_tools.core.logs import logs
+from .paths import normalize_title
+
+
+__all__ = ("guess_tags", "Library")
+
+
+def guess_tags(name, dirs=tuple()):
+    """Return normalized ``(artist, title)`` guessed from a track's file
+    name (without extension) and its parent directories (nearest last).
+
+    Names such as ``Artist - Title`` or ``01 - Artist - Title`` are split,
+    otherwise artist is guessed from an ``Artist/Album/Track`` layout.
+    """
+    parts = [part.strip() for part in name.split(" - ")]
+    if len(parts) > 1 and parts[0].isdigit():
+        parts = parts[1:]
+    if len(parts) > 1:
+        artist, title = parts[-2], parts[-1]
+    else:
+        artist, title = (dirs[-2] if len(dirs) > 1 else None), parts[0]
+    return (artist and normalize_title(artist)) or None, normalize_title(title) or None
+
+
+class Library:
+    """Persistent index of a music library's files, stored in a SQLite
+    database under the user cache directory.
+
+    The index records files' path, size, modification time, inode and
+    normalized artist and title guessed from their path (see
+    ``guess_tags``). On ``update()``, only directories whose modification
+    time changed are listed again (concurrently): other ones are taken
+    from the index. Files modified in place (same name) are not detected
+    until their directory changes, or on a full update.
+
+    Queries (``find``, ``search``, ``get``, ``__iter__``) don't touch the
+    filesystem.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS dirs (
+            path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY, dir TEXT NOT NULL, name TEXT NOT NULL,
+            size INTEGER, mtime_ns INTEGER, inode INTEGER,
+            artist TEXT, title TEXT, name_key TEXT, stem_key TEXT
+        );
+        CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+        CREATE INDEX IF NOT EXISTS files_name_key ON files (name_key);
+        CREATE INDEX IF NOT EXISTS files_stem_key ON files (stem_key);
+        CREATE INDEX IF NOT EXISTS files_title ON files (title, artist);
+    """
+    """Database schema."""
+    jobs = 8
+    """Number of threads used to list directories."""
+
+    def __init__(self, root, path=None, jobs=None):
+        """
+        :param Path root: library root directory.
+        :param Path path: database path (default: in user cache directory).
+        :param int jobs: number of threads.
+        """
+        self.root = Path(root).absolute()
+        if path is None:
+            key = hashlib.blake2b(str(self.root).encode("utf-8", "surrogateescape"), digest_size=8).hexdigest()
+            path = get_cache_dir("library") / f"{self.root.name or 'root'}-{key}.sqlite3"
+        self.path = Path(path)
+        if jobs:
+            self.jobs = jobs
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            self._db.row_factory = sqlite3.Row
+            self._db.executescript(self.schema)
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def __iter__(self):
+        """Iterate over all files' rows, by path."""
+        return iter(self.db.execute("SELECT * FROM files ORDER BY path"))
+
+    # ---- update
+    def update(self, full=False):
+        """Update index from filesystem. Return number of listed
+        directories.
+
+        :param bool full: list all directories, even unchanged ones.
+        """
+        db = self.db
+        known = dict(db.execute("SELECT path, mtime_ns FROM dirs"))
+        listed = 0
+        dirs = [str(self.root)]
+        with logs.span("library.update", root=str(self.root)), db:
+            while dirs:
+                subdirs = []
+                results = map_ordered(self.scan_dir, ((d, known, full) for d in dirs), self.jobs)
+                for path, result in zip(dirs, results):
+                    if result is None:
+                        self.remove_dir(path)
+                    elif result is True:
+                        rows = db.execute("SELECT path FROM dirs WHERE parent = ?", (path,))
+                        subdirs.extend(row[0] for row in rows)
+                    else:
+                        subdirs.extend(self.update_dir(path, *result))
+                        listed += 1
+                dirs = subdirs
+        logs.count("library.listed_dirs", listed)
+        return listed
+
+    def scan_dir(self, path, known, full=False):
+        """Return True if directory is unchanged, None if it doesn't exist,
+        otherwise its ``(mtime_ns, entries)``. Run in worker threads."""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if not full and known.get(path) == mtime_ns:
+            return True
+        entries = list_dir(path, stats=True)
+        return None if entries is None else (mtime_ns, entries)
+
+    def update_dir(self, path, mtime_ns, entries):
+        """Replace directory's files and subdirectories. Return
+        subdirectories paths."""
+        db = self.db
+        rel_dirs = Path(path).relative_to(self.root).parts
+        files, subdirs = [], []
+        for name, is_dir, stat in entries:
+            if not is_encodable(name):
+                continue
+            if is_dir:
+                subdirs.append(os.path.join(path, name))
+                continue
+            artist, title = guess_tags(os.path.splitext(name)[0], rel_dirs)
+            files.append(
+                (
+                    os.path.join(path, name),
+                    path,
+                    name,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    stat.st_ino,
+                    artist,
+                    title,
+                    name.casefold(),
+                    normalize_title(os.path.splitext(name)[0]),
+                )
+            )
+
+        # removed subdirectories
+        names = set(subdirs)
+        for (subdir,) in db.execute("SELECT path FROM dirs WHERE parent = ?", (path,)).fetchall():
+            if subdir not in names:
+                self.remove_dir(subdir)
+
+        db.execute("DELETE FROM files WHERE dir = ?", (path,))
+        db.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", files)
+        parent = None if path == str(self.root) else os.path.dirname(path)
+        db.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)", (path, parent, mtime_ns))
+        return subdirs
+
+    def remove_dir(self, path):
+        """Remove directory and its content from index."""
+        # paths under ``path/`` sort between ``path/`` and ``path0``
+        start, end = path + os.sep, path + chr(ord(os.sep) + 1)
+        self.db.execute("DELETE FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)", (path, start, end))
+        self.db.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, start, end))
+
+    # ---- queries
+    def get(self, path):
+        """Return file's row, or None."""
+        return self.db.execute("SELECT * FROM files WHERE path = ?", (str(path),)).fetchone()
+
+    def search(self, artist=None, title=None, name=None):
+        """Return rows of files matching provided values (compared
+        normalized).
+
+        :param str artist: artist name.
+        :param str title: track title.
+        :param str name: file name (case insensitive).
+        """
+        where, args = [], []
+        for column, value in (("artist", artist), ("title", title)):
+            if value:
+                where.append(f"{column} = ?")
+                args.append(normalize_title(value))
+        if name:
+            where.append("name_key = ?")
+            args.append(name.casefold())
+        query = "SELECT * FROM files" + (f" WHERE {' AND '.join(where)}" if where else "")
+        return self.db.execute(query, args).fetchall()
+
+    def find(self, name, title=None):
+        """Return path of the file matching a track, or None if there is no
+        match or it is ambiguous.
+
+        Candidates are looked up by file name, then by normalized title (from
+        file name, then from provided title). They are accepted when they
+        all are the same file (same size): copies of a track.
+
+        :param str name: file name.
+        :param str title: track title (such as ``#EXTINF`` one).
+        """
+        stem = os.path.splitext(name)[0]
+        lookups = [("name_key = ?", (name.casefold(),)), ("stem_key = ?", (normalize_title(stem),))]
+        if title:
+            lookups.append(("stem_key = ?", (normalize_title(title),)))
+            artist, title = guess_tags(title)
+            if artist and title:
+                lookups.append(("artist = ? AND title = ?", (artist, title)))
+
+        for where, args in lookups:
+            if not all(args):
+                continue
+            candidates = self.db.execute(f"SELECT path, size FROM files WHERE {where}", args).fetchall()
+            if candidates:
+                if len({size for _, size in candidates}) == 1:
+                    return candidates[0][0]
+                return None
+        return None
+
+
+def is_encodable(name):
+    """Return True if name can be stored as UTF-8 text."""
+    try:
+        name.encode()
+        return True
+    except UnicodeEncodeError:
+        return False
@@ -0,0 +1,224 @@
+import itertools
+import os
+from pathlib import Path
+
+
+__all__ = ("HEADER", "EXTINF", "Entry", "parse", "read", "merge", "unique", "write", "count_duplicates")
+
+
+HEADER = "#EXTM3U"
+"""Extended M3U header line."""
+EXTINF = "#EXTINF:"
+"""Extended M3U track information directive."""
+
+
+class Entry:
+    """A playlist entry: a track path with its preceding directives and
+    comments (``prefix``).
+
+    Entries without path hold lines that are not related to a track: the
+    ``#EXTM3U`` header or trailing comments.
+
+    Raw text is kept, so that ``str(entry)`` returns the exact input text.
+    ``#EXTINF`` duration and title are parsed on first access.
+    """
+
+    __slots__ = ("path", "prefix", "eol", "base", "_info")
+
+    path: str | None
+    """Track path or URL, as written in playlist."""
+    prefix: str
+    """Raw lines preceding the path (directives, comments, blank lines)."""
+    eol: str
+    """Path's line ending."""
+    base: str | None
+    """Directory relative paths are resolved against (playlist's one)."""
+
+    def __init__(self, path=None, prefix="", eol="\n", base=None):
+        self.path = path
+        self.prefix = prefix
+        self.eol = eol
+        self.base = base
+        self._info = None
+
+    @classmethod
+    def track(cls, path, duration=None, title=None, extra=tuple()):
+        """Create a track entry, generating ``#EXTINF`` directive when
+        duration or title is provided.
+
+        :param str path: track path.
+        :param int|float duration: duration in seconds.
+        :param str title: track title.
+        :param Iterable[str] extra: other directive lines.
+        """
+        entry = cls(str(path), "".join(f"{line}\n" for line in extra))
+        if duration is not None or title is not None:
+            entry.set_info(duration, title)
+        return entry
+
+    def set_info(self, duration=None, title=None):
+        """Set ``#EXTINF`` directive, replacing existing one.
+
+        :param int|float duration: duration in seconds.
+        :param str title: track title.
+        """
+        lines = [line for line in self.prefix.splitlines(keepends=True) if not line.startswith(EXTINF)]
+        duration_ = -1 if duration is None else round(duration)
+        lines.append(f"{EXTINF}{duration_},{title or ''}{self.eol or chr(10)}")
+        self.prefix = "".join(lines)
+        self._info = (duration, title)
+
+    @property
+    def info(self):
+        """Return ``(duration, title)`` from ``#EXTINF`` directive."""
+        if self._info is None:
+            index = self.prefix.rfind(EXTINF)
+            if index == -1:
+                self._info = (None, None)
+            else:
+                end = self.prefix.find("\n", index)
+                self._info = parse_extinf(self.prefix[index : end if end != -1 else None].rstrip("\r"))
+        return self._info
+
+    @property
+    def duration(self) -> int | float | None:
+        """Duration in seconds (from ``#EXTINF``)."""
+        return self.info[0]
+
+    @property
+    def title(self) -> str | None:
+        """Title (from ``#EXTINF``)."""
+        return self.info[1]
+
+    @property
+    def is_track(self):
+        return self.path is not None
+
+    @property
+    def is_header(self):
+        return self.path is None and self.prefix.lstrip("\ufeff").startswith(HEADER)
+
+    @property
+    def extra(self):
+        """Directives other than ``#EXTINF``, as a tuple of lines."""
+        return tuple(
+            line
+            for line in self.prefix.splitlines()
+            if line.startswith("#") and not line.startswith(EXTINF) and not line.lstrip("\ufeff").startswith(HEADER)
+        )
+
+    def __str__(self):
+        return f"{self.prefix}{self.path}{self.eol}" if self.path is not None else self.prefix
+
+    def __repr__(self):
+        return f"<Entry {self.path!r}>"
+
+
+def parse_extinf(line):
+    """Return ``(duration, title)`` from ``#EXTINF`` line (without line
+    ending)."""
+    info, _, title = line[len(EXTINF) :].partition(",")
+    # duration can be followed by attributes (`-1 tvg-id="..."`)
+    duration = info.split(" ", 1)[0]
+    try:
+        duration = float(duration)
+        if duration.is_integer():
+            duration = int(duration)
+    except ValueError:
+        duration = None
+    return (None if duration is None or duration < 0 else duration), title.strip() or None
+
+
+def parse(lines, base=None):
+    """Yield entries from an iterable of raw lines (with line endings).
+
+    :param Iterable[str] lines: lines.
+    :param str base: playlist directory, set as entries' ``base``.
+    """
+    lines = iter(lines)
+    prefix = []
+    for line in lines:
+        # header is only expected on first line
+        if line.lstrip("\ufeff").startswith(HEADER):
+            yield Entry(prefix=line)
+        else:
+            lines = itertools.chain((line,), lines)
+        break
+
+    for line in lines:
+        if line[0] == "#" or line.isspace():
+            prefix.append(line)
+            continue
+        path = line.rstrip("\r\n")
+        if prefix:
+            yield Entry(path, "".join(prefix), line[len(path) :], base)
+            prefix.clear()
+        else:
+            yield Entry(path, "", line[len(path) :], base)
+    if prefix:
+        yield Entry(prefix="".join(prefix), base=base)
+
+
+def read(path):
+    """Yield entries of playlist file lazily."""
+    with open(path, encoding="utf-8", errors="surrogateescape", newline="") as stream:
+        yield from parse(stream, os.path.dirname(os.path.abspath(path)))
+
+
+def merge(*playlists):
+    """Chain playlists' entries, keeping only a leading ``#EXTM3U``
+    header."""
+    first = True
+    for entry in itertools.chain.from_iterable(playlists):
+        if entry.is_header and not first:
+            continue
+        first = False
+        yield entry
+
+
+def unique(entries, stats=None, key=None):
+    """Yield entries removing duplicate tracks, keeping first seen ones
+    (order is preserved). Seen tracks are stored as their 64 bits hash.
+
+    :param Iterable[Entry] entries: playlist entries.
+    :param dict stats: if provided, set ``"duplicates"`` count into it.
+    :param callable key: return entry's identity (default: its path).
+    """
+    seen = set()
+    duplicates = 0
+    for entry in entries:
+        if entry.path is not None:
+            value = hash(key(entry) if key else entry.path)
+            if value in seen:
+                duplicates += 1
+                continue
+            seen.add(value)
+        yield entry
+    if stats is not None:
+        stats["duplicates"] = duplicates
+
+
+def write(stream, entries):
+    """Write entries into stream incrementally (opened with ``newline=""``
+    for exact output). Return number of written tracks."""
+    count = 0
+    eol = True
+    for entry in entries:
+        text = str(entry)
+        if not text:
+            continue
+        if not eol:
+            # previous entry was the last line of a file without ending newline
+            stream.write("\n")
+        stream.write(text)
+        eol = text[-1] == "\n"
+        count += entry.path is not None
+    return count
+
+
+def count_duplicates(path, key=None):
+    """Return number of duplicate tracks in playlist file."""
+    stats = {}
+    for _ in unique(read(Path(path)), stats, key):
+        pass
+    return stats["duplicates"]
@@ -0,0 +1,120 @@
+import os
+import re
+import threading
+import unicodedata
+from urllib.parse import unquote, urlsplit
+
+
+__all__ = ("is_url", "is_remote", "normalize_title", "PathIndex")
+
+
+def is_url(path):
+    """Return True if path is an URL (with a scheme)."""
+    scheme, sep, _ = path.partition("://")
+    return bool(sep) and scheme.isalnum()
+
+
+def is_remote(path):
+    """Return True if path is an URL to a remote resource (any scheme but
+    ``file://``)."""
+    return is_url(path) and path[:7].lower() != "file://"
+
+
+_title_re = re.compile(r"[\W_]+")
+
+
+def normalize_title(value):
+    """Return a normalized title used to compare tracks names: lower case,
+    without accents, punctuation or leading track number.
+
+    >>> normalize_title("01 - Beyoncé_Halo")
+    'beyonce halo'
+    """
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    words = _title_re.sub(" ", value.casefold()).split()
+    if len(words) > 1 and words[0].isdigit():
+        words = words[1:]
+    return " ".join(words)
+
+
+class PathIndex:
+    """Normalize tracks paths, in order to identify the same file referenced
+    in different ways: relative or absolute paths, ``./`` and ``..``
+    segments, URL-encoded ``file://`` URIs and symlinked directories.
+
+    Directories' real paths and files' stats are memoized: an index shared
+    by all playlists of a run does one syscall per distinct directory (and
+    per distinct file when ``inode`` is set).
+
+    Remote URLs (other than ``file://``) are kept as is.
+    """
+
+    inode = False
+    """Identify files by ``(st_dev, st_ino)`` when they exist (same file
+    through hard links or symlinks)."""
+
+    def __init__(self, inode=None):
+        if inode is not None:
+            self.inode = inode
+        self.dirs = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def normalize(self, path, base=None):
+        """Return absolute, normalized path of a track.
+
+        :param str path: path or URL as written in playlist.
+        :param str base: directory relative paths are resolved against (default: current directory).
+        """
+        if is_url(path):
+            url = urlsplit(path)
+            if url.scheme.lower() != "file":
+                return path
+            path = unquote(url.path, errors="surrogateescape")
+        if not os.path.isabs(path):
+            path = os.path.join(base or os.getcwd(), path)
+        head, tail = os.path.split(os.path.normpath(path))
+        return os.path.join(self.realdir(head), tail)
+
+    def realdir(self, path):
+        """Return real path of a normalized absolute directory path,
+        resolving symlinks (memoized)."""
+        if (real := self.dirs.get(path)) is None:
+            parent, name = os.path.split(path)
+            if not name:
+                real = path
+            else:
+                real = os.path.join(self.realdir(parent), name)
+                if os.path.islink(real):
+                    real = os.path.realpath(real)
+            with self.lock:
+                self.dirs[path] = real
+        return real
+
+    def stat(self, path):
+        """Return ``(st_dev, st_ino)`` of a file (memoized), or None if it
+        does not exist."""
+        try:
+            return self.stats[path]
+        except KeyError:
+            pass
+        try:
+            stat = os.stat(path)
+            value = (stat.st_dev, stat.st_ino)
+        except OSError:
+            value = None
+        with self.lock:
+            self.stats[path] = value
+        return value
+
+    def key(self, entry):
+        """Return identity of an entry's track: its normalized path, or
+        ``(st_dev, st_ino)`` when ``inode`` is set and the file exists.
+
+        :param Entry entry: playlist entry.
+        """
+        path = self.normalize(entry.path, entry.base)
+        if self.inode and not is_url(path):
+            return self.stat(path) or path
+        return path
@@ -0,0 +1,149 @@
+import itertools
+import random
+import shlex
+
+from . import m3u
+
+
+__all__ = ("Pipeline",)
+
+
+class Pipeline:
+    """Playlist pipeline: stages separated by ``|``, each one operating
+    lazily on the entries stream of the previous one (the first stage
+    receives the merged input playlists).
+
+    Stages:
+
+    - ``union PLAYLIST...``: append playlists' tracks not already present;
+    - ``intersect PLAYLIST...``: keep tracks present in all playlists;
+    - ``minus PLAYLIST...``: drop tracks present in any of the playlists;
+    - ``unique``: remove duplicate tracks;
+    - ``shuffle [SEED]``: shuffle tracks (reproducible when seeded);
+    - ``head N``: keep first N tracks.
+
+    Set operations use indexes of tracks' hashed identity: other playlists
+    are read once, the stream is never stored. Only ``shuffle`` needs all
+    tracks, unless followed by ``head``: a sample is then kept instead.
+
+    Example: ``union b.m3u | minus played.m3u | shuffle 42 | head 50``.
+    """
+
+    stages = {
+        "union": (1, None),
+        "intersect": (1, None),
+        "minus": (1, None),
+        "unique": (0, 0),
+        "shuffle": (0, 1),
+        "head": (1, 1),
+    }
+    """Stages' ``(min, max)`` number of arguments (None: no maximum)."""
+
+    def __init__(self, stages, key=None):
+        """
+        :param [(str, [str])] stages: list of ``(name, args)``.
+        :param callable key: return entry's identity (default: its path).
+        """
+        self.stages = list(stages)
+        self.key = key or (lambda entry: entry.path)
+
+    @classmethod
+    def parse(cls, expr, key=None):
+        """Parse pipeline expression. Raise ValueError on invalid one."""
+        stages = []
+        for part in expr.split("|"):
+            name, *args = shlex.split(part) or [""]
+            if name not in cls.stages:
+                raise ValueError(f"Invalid pipeline stage '{name}', must be one of: {', '.join(cls.stages)}")
+            min_args, max_args = cls.stages[name]
+            if len(args) < min_args or max_args is not None and len(args) > max_args:
+                raise ValueError(f"Invalid number of arguments for pipeline stage '{name}': {len(args)}")
+            if name in ("head", "shuffle") and args and not args[0].lstrip("-").isdigit():
+                raise ValueError(f"Pipeline stage '{name}' expects an integer, got '{args[0]}'")
+            stages.append((name, args))
+        return cls(stages, key)
+
+    def __call__(self, entries):
+        """Return iterator over the pipeline's output entries."""
+        stages = self.stages
+        for index, (name, args) in enumerate(stages):
+            if name == "shuffle" and index + 1 < len(stages) and stages[index + 1][0] == "head":
+                entries = self.sample(entries, int(stages[index + 1][1][0]), *args)
+            elif index and name == "head" and stages[index - 1][0] == "shuffle":
+                continue
+            else:
+                entries = getattr(self, name)(entries, *args)
+        return entries
+
+    def hash(self, entry):
+        return hash(self.key(entry))
+
+    def get_index(self, path):
+        """Return set of tracks' hashes of a playlist."""
+        return {self.hash(entry) for entry in m3u.read(path) if entry.path is not None}
+
+    # ---- stages
+    def union(self, entries, *playlists):
+        seen = set()
+        for entry in itertools.chain(entries, *(m3u.read(path) for path in playlists)):
+            if entry.path is None:
+                # keep leading header only
+                if not seen and entry.is_header:
+                    yield entry
+                continue
+            value = self.hash(entry)
+            if value not in seen:
+                seen.add(value)
+                yield entry
+
+    def intersect(self, entries, *playlists):
+        index = self.get_index(playlists[0])
+        for path in playlists[1:]:
+            index &= self.get_index(path)
+        return (entry for entry in entries if entry.path is None or self.hash(entry) in index)
+
+    def minus(self, entries, *playlists):
+        index = set().union(*(self.get_index(path) for path in playlists))
+        return (entry for entry in entries if entry.path is None or self.hash(entry) not in index)
+
+    def unique(self, entries):
+        return m3u.unique(entries, key=self.key)
+
+    def shuffle(self, entries, seed=None):
+        rand = random.Random(seed and int(seed))
+        tracks = []
+        for entry in entries:
+            if entry.path is None:
+                if entry.is_header:
+                    yield entry
+                continue
+            tracks.append(entry)
+        rand.shuffle(tracks)
+        yield from tracks
+
+    def head(self, entries, count):
+        count = int(count)
+        for entry in entries:
+            if entry.path is not None:
+                if count <= 0:
+                    return
+                count -= 1
+            yield entry
+
+    def sample(self, entries, count, seed=None):
+        """Shuffle followed by head: keep a random sample of ``count``
+        tracks (reservoir sampling), then shuffle it."""
+        rand = random.Random(seed and int(seed))
+        tracks, seen = [], 0
+        for entry in entries:
+            if entry.path is None:
+                if entry.is_header:
+                    yield entry
+                continue
+            seen += 1
+            if len(tracks) < count:
+                tracks.append(entry)
+            elif (pos := rand.randrange(seen)) < count:
+                tracks[pos] = entry
+        rand.shuffle(tracks)
+        yield from tracks
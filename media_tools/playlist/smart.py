@@ -0,0 +1,249 @@
+from datetime import date, datetime
+from fnmatch import fnmatchcase
+import os
+from pathlib import Path
+import time
+
+import yaml
+
+from media_tools.core.files import walk_files
+from media_tools.core.logs import logs
+from .library import guess_tags
+from .paths import normalize_title
+from .tags import MetadataCache
+
+
+__all__ = ("parse_time", "Rule", "SmartPlaylists")
+
+
+DURATIONS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "y": 365 * 86400}
+
+
+def parse_time(value, now=None):
+    """Return timestamp from a date, a datetime, an ISO string, or an age
+    relative to now (such as ``30d``; units: m, h, d, w, y)."""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day).timestamp()
+    value = str(value).strip()
+    if value[:-1].isdigit() and value[-1] in DURATIONS:
+        return (now or time.time()) - int(value[:-1]) * DURATIONS[value[-1]]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def as_tuple(value):
+    if value is None:
+        return tuple()
+    return tuple(value) if isinstance(value, (list, tuple)) else (value,)
+
+
+class Rule:
+    """A smart playlist: tracks are included when they match all its
+    conditions.
+
+    Conditions are evaluated on paths relative to the library root, and
+    files' stat; tag fields (``artist``, ``title``) are read from files'
+    metadata (see ``tags``), guessed from paths when missing, and compared
+    normalized, as substrings.
+
+    Only audio files are included, unless ``ext`` is provided (``"*"``
+    for any file).
+    """
+
+    keys = ("dirs", "glob", "ext", "newer", "older", "artist", "title", "sort")
+    """Available rule fields."""
+    audio_ext = (".aac", ".aiff", ".ape", ".flac", ".m4a", ".mp3", ".oga", ".ogg", ".opus", ".wav", ".wma", ".wv")
+    """Default extensions."""
+    sorts = ("path", "mtime", "-mtime")
+    """Available sort orders."""
+
+    def __init__(
+        self, path, dirs=None, glob=None, ext=None, newer=None, older=None, artist=None, title=None, sort=None
+    ):
+        """
+        :param Path path: output playlist.
+        :param str|[str] dirs: tracks are in one of those directories.
+        :param str|[str] glob: tracks match one of those patterns.
+        :param str|[str] ext: tracks have one of those extensions (default: ``audio_ext``).
+        :param newer: tracks are modified after this date (see ``parse_time``).
+        :param older: tracks are modified before this date.
+        :param str artist: artist contains this value.
+        :param str title: title contains this value.
+        :param str sort: tracks order (see ``sorts``).
+        """
+        self.path = Path(path)
+        self.dirs = tuple(os.path.normpath(d).rstrip(os.sep) + os.sep for d in as_tuple(dirs))
+        self.glob = as_tuple(glob)
+        if ext is None:
+            self.ext = self.audio_ext
+        else:
+            self.ext = tuple(f".{e.lstrip('.').lower()}" for e in as_tuple(ext) if e != "*")
+        self.newer = newer and parse_time(newer)
+        self.older = older and parse_time(older)
+        self.artist = artist and normalize_title(artist)
+        self.title = title and normalize_title(title)
+        self.sort = sort or "path"
+        if self.sort not in self.sorts:
+            raise ValueError(f"{path}: invalid sort {sort}, must be one of: {', '.join(self.sorts)}")
+
+    @classmethod
+    def from_dict(cls, path, data):
+        if unknown := set(data or {}) - set(cls.keys):
+            raise ValueError(f"{path}: unknown rule fields {', '.join(sorted(unknown))}")
+        return cls(path, **(data or {}))
+
+    @property
+    def needs_tags(self):
+        """True if rule has conditions on tags."""
+        return bool(self.artist or self.title)
+
+    def match(self, rel, stat):
+        """Return True if the track matches the rule's path and stat
+        conditions (tags ones are checked by ``match_tags``).
+
+        :param str rel: path relative to library root.
+        :param os.stat_result stat: file stat.
+        """
+        if self.ext and not rel.lower().endswith(self.ext):
+            return False
+        if self.dirs and not rel.startswith(self.dirs):
+            return False
+        if self.glob and not any(fnmatchcase(rel, pattern) for pattern in self.glob):
+            return False
+        if self.newer and stat.st_mtime < self.newer:
+            return False
+        if self.older and stat.st_mtime >= self.older:
+            return False
+        return True
+
+    def match_tags(self, artist, title):
+        """Return True if normalized tags match the rule."""
+        if self.artist and self.artist not in (artist or ""):
+            return False
+        if self.title and self.title not in (title or ""):
+            return False
+        return True
+
+    def get_key(self):
+        """Return sort key function for ``(path, stat)`` items."""
+        if self.sort == "path":
+            return lambda item: item[0]
+        return lambda item: item[1].st_mtime_ns
+
+    def render(self, items):
+        """Return playlist text for matching ``(path, stat)`` items."""
+        items = sorted(items, key=self.get_key(), reverse=self.sort.startswith("-"))
+        base = os.path.abspath(self.path.parent)
+        lines = ["#EXTM3U\n"] + [os.path.relpath(path, base) + "\n" for path, _ in items]
+        return "".join(lines)
+
+
+class SmartPlaylists:
+    """Generate playlists from rules, evaluated all together in a single
+    walk of the library.
+
+    Rules file is a YAML mapping of playlists' paths (relative to the file)
+    to their rules:
+
+    .. code-block:: yaml
+
+        recent.m3u:
+          newer: 30d
+          ext: [mp3, flac]
+          sort: -mtime
+        beatles-live.m3u:
+          dirs: Rock
+          glob: "*/Live*/*"
+          artist: beatles
+    """
+
+    open_kwargs = {"encoding": "utf-8", "errors": "surrogateescape", "newline": ""}
+    """Arguments used to open playlist files."""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+
+    @classmethod
+    def from_file(cls, path):
+        """Read rules from YAML file."""
+        path = Path(path)
+        with path.open() as stream:
+            data = yaml.load(stream, Loader=yaml.SafeLoader) or {}
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}: rules must be a mapping of playlist paths to rules")
+        return cls(Rule.from_dict(path.parent / name, rules) for name, rules in data.items())
+
+    def evaluate(self, roots, jobs=8, cache=None):
+        """Walk library directories once, and return ``{rule: [(path,
+        stat)]}`` matching items.
+
+        Metadata are only read for files matching other conditions of rules
+        with tags conditions, concurrently.
+
+        :param [Path] roots: library directories.
+        :param int jobs: number of threads.
+        :param MetadataCache cache: metadata cache (default: user's one).
+        """
+        results = {rule: [] for rule in self.rules}
+        pending = []
+        for root in roots:
+            root = os.path.join(os.path.abspath(root), "")
+            for path, name, stat in walk_files((root,), jobs):
+                path = os.path.join(path, name)
+                rel = path[len(root) :]
+                rules = []
+                for rule in self.rules:
+                    if not rule.match(rel, stat):
+                        continue
+                    if rule.needs_tags:
+                        rules.append(rule)
+                    else:
+                        results[rule].append((path, stat))
+                if rules:
+                    pending.append((path, rel, stat, rules))
+
+        if pending:
+            own_cache = cache is None
+            cache = cache or MetadataCache(jobs=jobs)
+            try:
+                # metadata first: cache is committed once exhausted
+                for (_, meta), (path, rel, stat, rules) in zip(cache.get_many(p for p, *_ in pending), pending):
+                    artist, title = self.get_tags(rel, meta)
+                    for rule in rules:
+                        if rule.match_tags(artist, title):
+                            results[rule].append((path, stat))
+            finally:
+                own_cache and cache.close()
+        return results
+
+    @staticmethod
+    def get_tags(rel, meta):
+        """Return normalized ``(artist, title)`` of a track from its
+        metadata, guessed from its path when missing."""
+        artist, title = (meta.artist, meta.title) if meta else (None, None)
+        artist, title = artist and normalize_title(artist), title and normalize_title(title)
+        if not (artist and title):
+            *dirs, name = Path(rel).parts
+            guessed = guess_tags(os.path.splitext(name)[0], dirs)
+            artist, title = artist or guessed[0], title or guessed[1]
+        return artist, title
+
+    def save(self, results, writer):
+        """Write playlists whose content changed. Return number of written
+        playlists."""
+        written = 0
+        for rule, items in results.items():
+            text = rule.render(items)
+            try:
+                with rule.path.open(**self.open_kwargs) as stream:
+                    if stream.read() == text:
+                        logs.detail(f"{rule.path}: unchanged ({len(items)} tracks).")
+                        continue
+            except FileNotFoundError:
+                pass
+            with writer.open(rule.path, **self.open_kwargs) as stream:
+                stream.write(text)
+            logs.detail(f"{rule.path}: {len(items)} tracks.")
+            written += 1
+        return written
@@ -0,0 +1,337 @@
+"""Read audio files metadata (duration, artist, title) from their headers
+only, without reading the whole file.
+
+Supported formats: MP3 (ID3v2, ID3v1, MPEG frame and Xing/Info headers),
+FLAC (STREAMINFO and Vorbis comments), Ogg Vorbis and Opus.
+"""
+import os
+from pathlib import Path
+import sqlite3
+import struct
+
+from media_tools.core.dirs import get_cache_dir
+from media_tools.core.files import map_ordered
+
+
+__all__ = ("Metadata", "read_metadata", "MetadataCache")
+
+
+class Metadata:
+    """Track metadata."""
+
+    __slots__ = ("duration", "artist", "title")
+
+    duration: float | None
+    """Duration in seconds."""
+    artist: str | None
+    title: str | None
+
+    def __init__(self, duration=None, artist=None, title=None):
+        self.duration = duration
+        self.artist = artist
+        self.title = title
+
+    def get_label(self):
+        """Return ``Artist - Title`` label, or None."""
+        if self.artist and self.title:
+            return f"{self.artist} - {self.title}"
+        return self.title
+
+    def __bool__(self):
+        return self.duration is not None or bool(self.title)
+
+    def __repr__(self):
+        return f"<Metadata {self.duration} {self.artist!r} {self.title!r}>"
+
+
+def read_metadata(path):
+    """Return metadata of an audio file, or None if format is not
+    supported or file can't be read."""
+    try:
+        with open(path, "rb") as stream:
+            head = stream.read(10)
+            if head.startswith(b"fLaC"):
+                return read_flac(stream)
+            if head.startswith(b"OggS"):
+                return read_ogg(stream)
+            if head.startswith(b"ID3") or head[:2] and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+                return read_mp3(stream, head)
+    except (OSError, ValueError, struct.error):
+        pass
+    return None
+
+
+# ---- Vorbis comments
+def parse_vorbis_comments(data, meta):
+    """Fill metadata from Vorbis comments block."""
+    vendor_size = int.from_bytes(data[:4], "little")
+    offset = 4 + vendor_size
+    count = int.from_bytes(data[offset : offset + 4], "little")
+    offset += 4
+    for _ in range(count):
+        size = int.from_bytes(data[offset : offset + 4], "little")
+        comment = data[offset + 4 : offset + 4 + size].decode("utf-8", "replace")
+        offset += 4 + size
+        key, _, value = comment.partition("=")
+        key = key.upper()
+        if key == "TITLE" and not meta.title:
+            meta.title = value.strip()
+        elif key == "ARTIST" and not meta.artist:
+            meta.artist = value.strip()
+
+
+# ---- FLAC
+def read_flac(stream):
+    """Read FLAC metadata blocks (stream is positioned after ``fLaC``
+    marker)."""
+    meta = Metadata()
+    stream.seek(4)
+    last = False
+    while not last:
+        header = stream.read(4)
+        if len(header) < 4:
+            break
+        last, kind, size = header[0] & 0x80, header[0] & 0x7F, int.from_bytes(header[1:], "big")
+        if kind == 0:
+            info = stream.read(size)
+            rate = int.from_bytes(info[10:13], "big") >> 4
+            samples = int.from_bytes(info[13:18], "big") & 0xFFFFFFFFF
+            if rate and samples:
+                meta.duration = samples / rate
+        elif kind == 4:
+            parse_vorbis_comments(stream.read(size), meta)
+        else:
+            # skip pictures, seek tables, padding, etc.
+            stream.seek(size, os.SEEK_CUR)
+    return meta
+
+
+# ---- Ogg
+def iter_ogg_packets(stream, max_size=1 << 20):
+    """Yield Ogg packets from start of stream (up to ``max_size`` bytes)."""
+    stream.seek(0)
+    packet = b""
+    read = 0
+    while read < max_size:
+        header = stream.read(27)
+        if len(header) < 27 or not header.startswith(b"OggS"):
+            return
+        segments = stream.read(header[26])
+        data = stream.read(sum(segments))
+        read += 27 + len(segments) + len(data)
+        offset = 0
+        for size in segments:
+            packet += data[offset : offset + size]
+            offset += size
+            if size < 255:
+                yield packet
+                packet = b""
+
+
+def read_ogg(stream):
+    """Read Ogg Vorbis or Opus headers; duration is computed from last
+    page's granule position."""
+    meta = Metadata()
+    packets = iter_ogg_packets(stream)
+    ident = next(packets, b"")
+    if ident.startswith(b"\x01vorbis"):
+        rate, pre_skip, comments = int.from_bytes(ident[12:16], "little"), 0, b"\x03vorbis"
+    elif ident.startswith(b"OpusHead"):
+        rate, pre_skip, comments = 48000, int.from_bytes(ident[10:12], "little"), b"OpusTags"
+    else:
+        return None
+
+    packet = next(packets, b"")
+    if packet.startswith(comments):
+        parse_vorbis_comments(packet[len(comments) :], meta)
+
+    # last page granule position
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(max(size - 65536, 0))
+    tail = stream.read()
+    index = tail.rfind(b"OggS")
+    if index != -1 and rate:
+        granule = int.from_bytes(tail[index + 6 : index + 14], "little", signed=True)
+        if granule > 0:
+            meta.duration = (granule - pre_skip) / rate
+    return meta
+
+
+# ---- MP3
+ID3_FRAMES = {
+    b"TIT2": "title",
+    b"TPE1": "artist",
+    b"TLEN": "length",
+    # ID3v2.2
+    b"TT2": "title",
+    b"TP1": "artist",
+    b"TLE": "length",
+}
+ID3_ENCODINGS = ("latin-1", "utf-16", "utf-16-be", "utf-8")
+
+MPEG_BITRATES = {
+    # (version is MPEG1, layer): kbps by index
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MPEG_BITRATES[(False, 3)] = MPEG_BITRATES[(False, 2)]
+MPEG_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def syncsafe(data):
+    return data[0] << 21 | data[1] << 14 | data[2] << 7 | data[3]
+
+
+def decode_id3_text(data):
+    encoding = ID3_ENCODINGS[data[0]] if data and data[0] < 4 else "latin-1"
+    text = data[1:].decode(encoding, "replace")
+    return text.split("\x00", 1)[0].strip()
+
+
+def read_id3v2(stream, head, meta):
+    """Read ID3v2 tag frames; other frames (such as pictures) are skipped
+    without being read. Return tag size (audio start offset)."""
+    version, flags, size = head[3], head[5], syncsafe(head[6:10])
+    end = 10 + size
+    if flags & 0x40 and version > 2:
+        # extended header
+        ext = stream.read(4)
+        stream.seek(syncsafe(ext) - 4 if version == 4 else int.from_bytes(ext, "big"), os.SEEK_CUR)
+    id_size, header_size = (3, 6) if version == 2 else (4, 10)
+    length = None
+    while stream.tell() + header_size <= end:
+        header = stream.read(header_size)
+        frame_id = header[:id_size]
+        if not frame_id.strip(b"\x00"):
+            break
+        raw_size = header[id_size : id_size + (3 if version == 2 else 4)]
+        frame_size = syncsafe(raw_size) if version == 4 else int.from_bytes(raw_size, "big")
+        if (attr := ID3_FRAMES.get(frame_id)) is None:
+            stream.seek(frame_size, os.SEEK_CUR)
+            continue
+        value = decode_id3_text(stream.read(frame_size))
+        if attr == "length":
+            length = value
+        elif value:
+            setattr(meta, attr, value)
+    if length and length.isdigit() and int(length):
+        meta.duration = int(length) / 1000
+    return end + (10 if flags & 0x10 else 0)
+
+
+def read_mp3(stream, head):
+    """Read ID3 tags and duration from first MPEG frame (Xing/Info/VBRI
+    header, otherwise estimated from bitrate)."""
+    meta = Metadata()
+    start = read_id3v2(stream, head, meta) if head.startswith(b"ID3") else 0
+
+    if meta.duration is None:
+        stream.seek(start)
+        data = stream.read(4096)
+        # skip padding to first frame sync
+        index = data.find(b"\xff")
+        while index != -1 and index < len(data) - 4 and data[index + 1] & 0xE0 != 0xE0:
+            index = data.find(b"\xff", index + 1)
+        if index == -1:
+            index = len(data)
+        header = int.from_bytes(data[index : index + 4], "big")
+        version, layer = header >> 19 & 3, 4 - (header >> 17 & 3)
+        bitrate_index, rate_index = header >> 12 & 0xF, header >> 10 & 3
+        if version != 1 and layer != 4 and rate_index != 3 and 0 < bitrate_index < 15:
+            mpeg1 = version == 3
+            rate = MPEG_RATES[version][rate_index]
+            samples = 384 if layer == 1 else (1152 if layer == 2 or mpeg1 else 576)
+            frames = None
+            for tag in (b"Xing", b"Info"):
+                if (xing := data.find(tag, index, index + 64)) != -1 and data[xing + 7] & 1:
+                    frames = int.from_bytes(data[xing + 8 : xing + 12], "big")
+            if (vbri := data.find(b"VBRI", index, index + 64)) != -1:
+                frames = int.from_bytes(data[vbri + 14 : vbri + 18], "big")
+            if frames:
+                meta.duration = frames * samples / rate
+            else:
+                size = stream.seek(0, os.SEEK_END) - start - index
+                meta.duration = size * 8 / (MPEG_BITRATES[(mpeg1, layer)][bitrate_index] * 1000)
+
+    if not meta.title and stream.seek(0, os.SEEK_END) >= 128:
+        # ID3v1
+        stream.seek(-128, os.SEEK_END)
+        if (tag := stream.read(128)).startswith(b"TAG"):
+            meta.title = tag[3:33].split(b"\x00", 1)[0].decode("latin-1").strip() or None
+            meta.artist = meta.artist or tag[33:63].split(b"\x00", 1)[0].decode("latin-1").strip() or None
+    return meta
+
+
+class MetadataCache:
+    """Persistent metadata cache, keyed by file path, size and modification
+    time. Stored as SQLite database under user cache directory.
+
+    Metadata of files missing from the cache are read concurrently.
+    """
+
+    jobs = 8
+    """Number of threads reading files."""
+
+    def __init__(self, path=None, jobs=None):
+        self.path = Path(path) if path else get_cache_dir() / "metadata.sqlite3"
+        if jobs:
+            self.jobs = jobs
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+                " duration REAL, artist TEXT, title TEXT)"
+            )
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get_many(self, paths):
+        """Yield ``(path, metadata)`` in order for provided paths. Metadata
+        is None when file is missing or unsupported, or path is None.
+
+        :param Iterable[str] paths: files paths.
+        """
+        db = self.db
+        select = "SELECT size, mtime_ns, duration, artist, title FROM metadata WHERE path = ?"
+        # items are generated from the calling thread: database is only used from there
+        items = ((path, path and db.execute(select, (path,)).fetchone()) for path in paths)
+        with db:
+            for path, stat, meta, cached in map_ordered(self.read, items, self.jobs):
+                if cached:
+                    self.hits += 1
+                elif stat is not None:
+                    self.misses += 1
+                    values = (meta.duration, meta.artist, meta.title) if meta else (None, None, None)
+                    db.execute(
+                        "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?)",
+                        (path, stat.st_size, stat.st_mtime_ns, *values),
+                    )
+                yield path, meta
+
+    def read(self, path, row=None):
+        """Return ``(path, stat, metadata, cached)`` for a file, reading it
+        unless cached ``row`` matches its size and modification time."""
+        if path is None:
+            return path, None, None, False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return path, None, None, False
+        if row and tuple(row[:2]) == (stat.st_size, stat.st_mtime_ns):
+            meta = Metadata(*row[2:])
+            return path, stat, meta or None, True
+        return path, stat, read_metadata(path), False
@@ -0,0 +1,65 @@
+import pytest
+
+from media_tools.playlist import m3u
+from media_tools.playlist.apps import PlaylistApp
+from media_tools.playlist.fix import Fixer
+from media_tools.playlist.library import Library
+
+
+@pytest.fixture
+def music(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    root = tmp_path / "music"
+    for rel in ("Rock/Help.mp3", "Jazz/So What.flac", "Here/present.mp3"):
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_bytes(rel.encode())
+    playlist = tmp_path / "list.m3u"
+    playlist.write_text(
+        "#EXTM3U\n"
+        "music/Here/present.mp3\n"
+        "music/Old/Help.mp3\n"
+        f"file://{root}/Old/So%20What.flac\n"
+        "#EXTINF:10,Unknown\n"
+        "/nowhere/missing.mp3\n"
+        "http://radio/stream\n"
+    )
+    return root, playlist
+
+
+def test_check_and_fix(music, tmp_path):
+    root, playlist = music
+    entries = list(m3u.read(playlist))
+    fixer = Fixer(Library(root, tmp_path / "library.sqlite3"), jobs=2)
+    fixer.library.update()
+    missing = fixer.check(entries)
+    assert [entry.path for entry, _ in missing] == [
+        "music/Old/Help.mp3",
+        f"file://{root}/Old/So%20What.flac",
+        "/nowhere/missing.mp3",
+    ]
+    fixed, unmatched = fixer.fix(missing)
+    assert [old for _, old in fixed] == ["music/Old/Help.mp3", f"file://{root}/Old/So%20What.flac"]
+    # path form is kept
+    assert [entry.path for entry, _ in fixed] == ["music/Rock/Help.mp3", f"file://{root}/Jazz/So%20What.flac"]
+    assert [entry.path for entry in unmatched] == ["/nowhere/missing.mp3"]
+
+
+def test_fix_app(music):
+    root, playlist = music
+    app = PlaylistApp()
+    app.load()
+    app.dispatch(argv=[str(playlist), "--fix", str(root)])
+    assert playlist.read_text() == (
+        "#EXTM3U\n"
+        "music/Here/present.mp3\n"
+        "music/Rock/Help.mp3\n"
+        f"file://{root}/Jazz/So%20What.flac\n"
+        "#EXTINF:10,Unknown\n"
+        "/nowhere/missing.mp3\n"
+        "http://radio/stream\n"
+    )
+
+    # library rescan after a move
+    (root / "Rock" / "Help.mp3").rename(root / "Jazz" / "Help.mp3")
+    app.dispatch(argv=[str(playlist), "--fix", str(root)])
+    assert "music/Jazz/Help.mp3\n" in playlist.read_text()
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from media_tools.playlist.library import guess_tags, Library
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "music"
+    for rel, size in {
+        "Beatles/Help/01 - Help!.mp3": 10,
+        "Beatles/Help/02 - Yesterday.mp3": 20,
+        "Various/Queen - Bohemian Rhapsody.flac": 30,
+        "Copies/Yesterday.mp3": 20,
+    }.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_bytes(b"x" * size)
+    return root
+
+
+@pytest.fixture
+def library(root, tmp_path):
+    with Library(root, tmp_path / "library.sqlite3", jobs=2) as library:
+        yield library
+
+
+def test_guess_tags():
+    assert guess_tags("01 - Queen - Bohemian Rhapsody") == ("queen", "bohemian rhapsody")
+    assert guess_tags("02 - Yesterday", ("Beatles", "Help")) == ("beatles", "yesterday")
+    assert guess_tags("Yesterday") == (None, "yesterday")
+
+
+def test_update_is_incremental(root, library):
+    assert library.update() == 5
+    assert len(library) == 4
+    assert library.update() == 0
+
+    (root / "Beatles" / "Help" / "03 - Ticket.mp3").write_bytes(b"")
+    assert library.update() == 1
+    assert library.get(root / "Beatles" / "Help" / "03 - Ticket.mp3")["title"] == "ticket"
+
+    # removed directory and its files
+    os.rename(root / "Various", root.parent / "Various")
+    assert library.update() == 1
+    assert len(library) == 4
+    assert library.update(full=True) == 4
+
+
+def test_find(root, library):
+    library.update()
+    assert library.find("02 - Yesterday.mp3") == str(root / "Beatles/Help/02 - Yesterday.mp3")
+    # copies of the same track (same size) are not ambiguous
+    assert library.find("yesterday.MP3") == str(root / "Copies/Yesterday.mp3")
+    assert library.find("unknown.mp3", "Queen - Bohemian Rhapsody") == str(
+        root / "Various/Queen - Bohemian Rhapsody.flac"
+    )
+    assert library.find("unknown.mp3") is None
+    assert sorted(row["name"] for row in library.search(artist="BEATLES")) == ["01 - Help!.mp3", "02 - Yesterday.mp3"]
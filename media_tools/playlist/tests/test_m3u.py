@@ -0,0 +1,84 @@
+import io
+
+from media_tools.playlist import m3u
+
+
+def entries(text):
+    return list(m3u.parse(io.StringIO(text, newline="")))
+
+
+def render(entries):
+    stream = io.StringIO(newline="")
+    m3u.write(stream, entries)
+    return stream.getvalue()
+
+
+def test_unique_keeps_first_tracks_in_order():
+    stats = {}
+    items = entries("#EXTM3U\n#EXTINF:1,B\nb.mp3\na.mp3\nb.mp3\nc.mp3\na.mp3\n# end\n")
+    result = list(m3u.unique(items, stats))
+    assert [entry.path for entry in result] == [None, "b.mp3", "a.mp3", "c.mp3", None]
+    assert result[1].title == "B"
+    assert stats["duplicates"] == 2
+
+
+def test_unique_key():
+    items = entries("A.mp3\na.mp3\n")
+    assert len(list(m3u.unique(items, key=lambda entry: entry.path.lower()))) == 1
+
+
+def test_merge_keeps_leading_header():
+    merged = m3u.merge(entries("#EXTM3U\na.mp3\n"), entries("#EXTM3U\nb.mp3"), entries("c.mp3\n"))
+    assert render(merged) == "#EXTM3U\na.mp3\nb.mp3\nc.mp3\n"
+
+
+def test_count_duplicates(tmp_path):
+    path = tmp_path / "list.m3u"
+    path.write_text("a.mp3\nb.mp3\na.mp3\n")
+    assert m3u.count_duplicates(path) == 1
+
+
+def test_round_trip_is_byte_exact(tmp_path):
+    data = (
+        b"\xef\xbb\xbf#EXTM3U\r\n"
+        b'#EXTINF:123 tvg-id="x",Artist - Title\r\n'
+        b"#EXTGRP:Rock\r\n"
+        b"Music/01 - Caf\xc3\xa9.mp3\r\n"
+        b"\r\n"
+        b"# comment\n"
+        b"latin1-\xe9t\xe9.mp3\n"
+        b"http://radio.example/stream\n"
+        b"# trailing comment"
+    )
+    path = tmp_path / "list.m3u"
+    path.write_bytes(data)
+    output = tmp_path / "out.m3u"
+    with open(output, "w", encoding="utf-8", errors="surrogateescape", newline="") as stream:
+        assert m3u.write(stream, m3u.read(path)) == 3
+    assert output.read_bytes() == data
+
+
+def test_parse_entries():
+    header, track, other, trailing = entries("#EXTM3U\n#EXTINF:-1,Radio\n#EXTGRP:A\nhttp://a\nb.mp3\n# end\n")
+    assert header.is_header and not header.is_track
+    assert (track.path, track.duration, track.title, track.extra) == ("http://a", None, "Radio", ("#EXTGRP:A",))
+    assert (other.path, other.info) == ("b.mp3", (None, None))
+    assert (trailing.path, str(trailing)) == (None, "# end\n")
+
+
+def test_parse_extinf():
+    assert m3u.parse_extinf("#EXTINF:12.5,Title") == (12.5, "Title")
+    assert m3u.parse_extinf("#EXTINF:200,") == (200, None)
+    assert m3u.parse_extinf("#EXTINF:abc,T") == (None, "T")
+
+
+def test_track_and_set_info():
+    entry = m3u.Entry.track("a.mp3", 61.6, "A - B", extra=("#EXTGRP:X",))
+    assert str(entry) == "#EXTGRP:X\n#EXTINF:62,A - B\na.mp3\n"
+    entry.set_info(10, None)
+    assert str(entry) == "#EXTGRP:X\n#EXTINF:10,\na.mp3\n"
+    assert entry.info == (10, None)
+
+
+def test_write_adds_missing_newline():
+    assert render(entries("a.mp3") + entries("b.mp3\n")) == "a.mp3\nb.mp3\n"
@@ -0,0 +1,40 @@
+import os
+
+from media_tools.playlist.m3u import Entry
+from media_tools.playlist.paths import is_remote, is_url, normalize_title, PathIndex
+
+
+def test_urls():
+    assert is_url("http://a/b.mp3") and is_remote("http://a/b.mp3")
+    assert is_url("FILE:///a.mp3") is True and not is_remote("FILE:///a.mp3")
+    assert not is_url("/music/a: b.mp3")
+
+
+def test_normalize_title():
+    assert normalize_title("01 - Beyoncé_Halo") == "beyonce halo"
+    assert normalize_title("1999") == "1999"
+
+
+def test_normalize_paths(tmp_path):
+    music = tmp_path / "music"
+    (music / "Album").mkdir(parents=True)
+    (tmp_path / "link").symlink_to(music)
+    index = PathIndex()
+    expected = str(music / "Album" / "a b.mp3")
+    base = str(tmp_path / "lists")
+    assert index.normalize("../music/Album/./a b.mp3", base) == expected
+    assert index.normalize(f"file://{tmp_path}/link/Album/a%20b.mp3") == expected
+    assert index.normalize(str(tmp_path / "link" / "Album" / ".." / "Album" / "a b.mp3")) == expected
+    assert index.normalize("http://host/a%20b.mp3") == "http://host/a%20b.mp3"
+
+
+def test_key_by_inode(tmp_path):
+    track = tmp_path / "a.mp3"
+    track.write_bytes(b"")
+    os.link(track, tmp_path / "hard.mp3")
+    entries = [Entry("a.mp3", base=str(tmp_path)), Entry("hard.mp3", base=str(tmp_path))]
+    assert len({PathIndex().key(entry) for entry in entries}) == 2
+    index = PathIndex(inode=True)
+    assert len({index.key(entry) for entry in entries}) == 1
+    # missing files fall back to their path
+    assert index.key(Entry("missing.mp3", base=str(tmp_path))) == str(tmp_path / "missing.mp3")
@@ -0,0 +1,71 @@
+import io
+
+import pytest
+
+from media_tools.playlist import m3u
+from media_tools.playlist.pipeline import Pipeline
+
+
+@pytest.fixture
+def lists(tmp_path):
+    for name, tracks in {"b.m3u": "c d e", "played.m3u": "a e", "other.m3u": "a d"}.items():
+        (tmp_path / name).write_text("#EXTM3U\n" + "".join(f"{t}.mp3\n" for t in tracks.split()))
+    return tmp_path
+
+
+def run(expr, text="#EXTM3U\na.mp3\nb.mp3\nc.mp3\nd.mp3\n"):
+    entries = m3u.parse(io.StringIO(text, newline=""))
+    return [entry.path for entry in Pipeline.parse(expr)(entries)]
+
+
+def test_set_operations(lists, monkeypatch):
+    monkeypatch.chdir(lists)
+    assert run("union b.m3u") == [None, "a.mp3", "b.mp3", "c.mp3", "d.mp3", "e.mp3"]
+    assert run("intersect b.m3u other.m3u") == [None, "d.mp3"]
+    assert run("minus played.m3u b.m3u") == [None, "b.mp3"]
+    assert run("union b.m3u | minus played.m3u | head 2") == [None, "b.mp3", "c.mp3"]
+    assert run("unique", "a.mp3\nb.mp3\na.mp3\n") == ["a.mp3", "b.mp3"]
+
+
+def test_shuffle_is_reproducible():
+    tracks = "".join(f"{i}.mp3\n" for i in range(50))
+    shuffled = run("shuffle 42", tracks)
+    assert shuffled == run("shuffle 42", tracks)
+    assert sorted(shuffled) == sorted(run("unique", tracks)) and shuffled != run("unique", tracks)
+
+    # shuffle | head keeps a sample
+    sample = run("shuffle 42 | head 5", tracks)
+    assert len(sample) == 5 and len(set(sample)) == 5
+    assert sample == run("shuffle 42 | head 5", tracks)
+
+
+@pytest.mark.parametrize("expr", ["", "sort", "head", "head x", "union", "unique a.m3u", "shuffle 1 2"])
+def test_invalid_expressions(expr):
+    with pytest.raises(ValueError):
+        Pipeline.parse(expr)
+
+
+def test_pipeline_app(lists, monkeypatch, capsys):
+    from media_tools.playlist.apps import PlaylistApp
+
+    monkeypatch.chdir(lists)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(lists / "cache"))
+    app = PlaylistApp()
+    app.load()
+    app.dispatch(argv=[str(lists / "b.m3u"), "-p", "minus played.m3u", "-o", str(lists / "out.m3u")])
+    assert (lists / "out.m3u").read_text() == "#EXTM3U\nc.mp3\nd.mp3\n"
+
+
+def test_pipeline_app_stdout_is_playlist_only(lists, monkeypatch, capsys):
+    from media_tools.core import logs
+    from media_tools.playlist.apps import PlaylistApp
+
+    monkeypatch.chdir(lists)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(lists / "cache"))
+    app = PlaylistApp()
+    app.load()
+    app.dispatch(argv=["b.m3u", "missing.m3u", "-p", "minus played.m3u"])
+    out, err = capsys.readouterr()
+    assert out == "#EXTM3U\nc.mp3\nd.mp3\n"
+    assert "missing.m3u" in err
+    assert logs.stream is None
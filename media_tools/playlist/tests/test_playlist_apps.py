@@ -0,0 +1,34 @@
+import pytest
+
+from media_tools.playlist.apps import PlaylistApp
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    app = PlaylistApp()
+    app.load()
+    return app
+
+
+@pytest.fixture
+def music(tmp_path):
+    root = tmp_path / "music"
+    for path in ("Artist/Album/01.mp3", "Artist/Album/02.mp3"):
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_bytes(path.encode())
+    playlist = tmp_path / "list.m3u"
+    playlist.write_text(f"{root}/Artist/Album/01.mp3\n{root}/Artist/Album/02.mp3\n")
+    return root, playlist
+
+
+@pytest.mark.parametrize("root", [False, True])
+def test_export(app, music, tmp_path, root):
+    library, playlist = music
+    target = tmp_path / "player"
+    argv = [str(playlist), "--export", str(target)] + (["--root", str(library)] if root else [])
+    app.dispatch(argv=argv)
+
+    prefix = "Artist/Album/" if root else ""
+    assert (target / f"{prefix}01.mp3").read_bytes() == b"Artist/Album/01.mp3"
+    assert (target / "list.m3u").read_text() == f"{prefix}01.mp3\n{prefix}02.mp3\n"
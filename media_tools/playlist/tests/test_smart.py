@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from media_tools.core.writer import AtomicWriter
+from media_tools.playlist.smart import Rule, SmartPlaylists, parse_time
+from media_tools.playlist.tags import MetadataCache
+
+
+def id3v1(artist, title):
+    tag = b"TAG" + title.encode().ljust(30, b"\0") + artist.encode().ljust(30, b"\0")
+    return b"\xff\xfb\x90\x00" + b"\0" * 413 + tag.ljust(128, b"\0")
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "music"
+    files = {
+        "Rock/Beatles/Help/01.mp3": id3v1("The Beatles", "Help!"),
+        "Rock/Unknown/track.mp3": id3v1("The Beatles", "Yesterday"),
+        "Rock/Stones/Live/Stones - Angie.flac": b"fLaC",
+        "Rock/Beatles/Help/cover.jpg": b"jpg",
+        "Jazz/Davis - So What.mp3": b"mp3",
+    }
+    for rel, data in files.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_bytes(data)
+    os.utime(root / "Jazz/Davis - So What.mp3", (0, 0))
+    return root
+
+
+def evaluate(tmp_path, library, **rules):
+    smart = SmartPlaylists(Rule(tmp_path / name, **rule) for name, rule in rules.items())
+    cache = MetadataCache(tmp_path / "metadata.sqlite3")
+    results = smart.evaluate([library], cache=cache)
+    cache.close()
+    return {
+        rule.path.name: sorted(os.path.relpath(path, library) for path, _ in items) for rule, items in results.items()
+    }
+
+
+def test_rules(tmp_path, library):
+    results = evaluate(
+        tmp_path,
+        library,
+        all={},
+        any={"ext": "*", "dirs": "Rock/Beatles"},
+        old={"older": "1d"},
+        live={"glob": "*/Live/*", "ext": ["flac"]},
+    )
+    assert results["all"] == [
+        "Jazz/Davis - So What.mp3",
+        "Rock/Beatles/Help/01.mp3",
+        "Rock/Stones/Live/Stones - Angie.flac",
+        "Rock/Unknown/track.mp3",
+    ]
+    assert results["any"] == ["Rock/Beatles/Help/01.mp3", "Rock/Beatles/Help/cover.jpg"]
+    assert results["old"] == ["Jazz/Davis - So What.mp3"]
+    assert results["live"] == ["Rock/Stones/Live/Stones - Angie.flac"]
+
+
+def test_tags_rules(tmp_path, library):
+    results = evaluate(tmp_path, library, beatles={"artist": "beatles"}, angie={"title": "ANGIE"})
+    # read from metadata, else guessed from path
+    assert results["beatles"] == ["Rock/Beatles/Help/01.mp3", "Rock/Unknown/track.mp3"]
+    assert results["angie"] == ["Rock/Stones/Live/Stones - Angie.flac"]
+
+
+def test_save(tmp_path, library):
+    rules = tmp_path / "rules.yaml"
+    rules.write_text("jazz.m3u: {dirs: Jazz}\nrecent.m3u: {newer: 1d, sort: -mtime}\n")
+    smart = SmartPlaylists.from_file(rules)
+    for expected in (2, 0):
+        with AtomicWriter() as writer:
+            assert (
+                smart.save(smart.evaluate([library], cache=MetadataCache(tmp_path / "m.sqlite3")), writer) == expected
+            )
+    assert (tmp_path / "jazz.m3u").read_text() == "#EXTM3U\nmusic/Jazz/Davis - So What.mp3\n"
+
+
+def test_invalid_rules(tmp_path):
+    with pytest.raises(ValueError):
+        Rule.from_dict(tmp_path / "a.m3u", {"year": 2000})
+    with pytest.raises(ValueError):
+        Rule(tmp_path / "a.m3u", sort="size")
+
+
+def test_parse_time():
+    assert parse_time("2d", now=1_000_000) == 1_000_000 - 2 * 86400
+    assert parse_time("1970-01-02T00:00:00+00:00") == 86400
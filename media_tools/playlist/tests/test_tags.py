@@ -0,0 +1,113 @@
+import struct
+
+import pytest
+
+from media_tools.playlist.tags import MetadataCache, read_metadata
+
+
+def vorbis_comments(**tags):
+    comments = [f"{key}={value}".encode() for key, value in tags.items()]
+    data = struct.pack("<I", 6) + b"vendor" + struct.pack("<I", len(comments))
+    return data + b"".join(struct.pack("<I", len(c)) + c for c in comments)
+
+
+def flac(samples, rate, **tags):
+    info = bytearray(34)
+    info[10:18] = (rate << 44 | 1 << 41 | 15 << 36 | samples).to_bytes(8, "big")
+    comments = vorbis_comments(**tags)
+    return (
+        b"fLaC"
+        + bytes((0,))
+        + len(info).to_bytes(3, "big")
+        + info
+        # skipped padding block
+        + bytes((1,))
+        + (100).to_bytes(3, "big")
+        + bytes(100)
+        + bytes((0x84,))
+        + len(comments).to_bytes(3, "big")
+        + comments
+    )
+
+
+def id3_frame(id, text):
+    data = b"\x03" + text.encode()
+    return id + len(data).to_bytes(4, "big") + b"\x00\x00" + data
+
+
+def syncsafe(value):
+    return bytes((value >> 21 & 0x7F, value >> 14 & 0x7F, value >> 7 & 0x7F, value & 0x7F))
+
+
+def mp3(frames=None, **frames_data):
+    tag = b"".join(id3_frame(id.encode(), text) for id, text in frames_data.items()) + bytes(20)
+    # MPEG1 layer III, 128 kbps, 44.1 kHz
+    frame = bytearray(b"\xff\xfb\x90\x00" + bytes(413))
+    if frames:
+        frame[36:48] = b"Xing" + struct.pack(">II", 1, frames)
+    return b"ID3\x03\x00\x00" + syncsafe(len(tag)) + tag + bytes(frame) * 10
+
+
+def ogg_page(packets, granule=0):
+    segments, data = [], b""
+    for packet in packets:
+        size = len(packet)
+        segments += [255] * (size // 255) + [size % 255]
+        data += packet
+    return b"OggS\x00\x00" + struct.pack("<q", granule) + bytes(12) + bytes((len(segments),) + tuple(segments)) + data
+
+
+def opus(duration, pre_skip=312, **tags):
+    head = b"OpusHead\x01\x02" + struct.pack("<H", pre_skip) + bytes(7)
+    return (
+        ogg_page([head])
+        + ogg_page([b"OpusTags" + vorbis_comments(**tags)])
+        + ogg_page([bytes(300)], granule=int(duration * 48000) + pre_skip)
+    )
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (flac(44100 * 3, 44100, ARTIST="Miles Davis", title="So What"), (3, "Miles Davis", "So What")),
+        (mp3(100, TIT2="Help!", TPE1="The Beatles"), (100 * 1152 / 44100, "The Beatles", "Help!")),
+        (mp3(TIT2="Help!", TLEN="2500"), (2.5, None, "Help!")),
+        (opus(3.5, TITLE="Angie"), (3.5, None, "Angie")),
+    ],
+)
+def test_read_metadata(tmp_path, data, expected):
+    path = tmp_path / "track"
+    path.write_bytes(data)
+    meta = read_metadata(path)
+    assert (round(meta.duration, 3), meta.artist, meta.title) == (round(expected[0], 3), *expected[1:])
+
+
+def test_read_metadata_cbr_estimate(tmp_path):
+    path = tmp_path / "track.mp3"
+    path.write_bytes(mp3(TIT2="Help!"))
+    # 10 frames of 417 bytes at 128 kbps
+    assert read_metadata(path).duration == pytest.approx(417 * 10 * 8 / 128000)
+
+
+def test_read_metadata_unsupported(tmp_path):
+    path = tmp_path / "cover.jpg"
+    path.write_bytes(b"\xff\xd8\xff\xe0")
+    assert read_metadata(path) is None
+    assert read_metadata(tmp_path / "missing") is None
+
+
+def test_metadata_cache(tmp_path):
+    path = tmp_path / "a.flac"
+    path.write_bytes(flac(44100, 44100, TITLE="A"))
+    paths = [str(path), None, str(tmp_path / "missing")]
+    cache = MetadataCache(tmp_path / "metadata.sqlite3")
+    results = list(cache.get_many(paths))
+    assert [p for p, _ in results] == paths
+    assert results[0][1].title == "A" and results[1][1] is None and results[2][1] is None
+    assert (cache.hits, cache.misses) == (0, 1)
+    cache.close()
+
+    cache = MetadataCache(tmp_path / "metadata.sqlite3")
+    assert next(cache.get_many([str(path)]))[1].get_label() == "A"
+    assert (cache.hits, cache.misses) == (1, 0)
+    cache.close()
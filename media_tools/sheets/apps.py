@@ -1,11 +1,13 @@
+from contextlib import nullcontext
 from datetime import datetime
 import inspect
 from functools import cached_property
 from pathlib import Path
 from subprocess import Popen, PIPE
+import traceback
 from urllib.parse import urlparse
 
-from media_tools.core import App, logs
+from media_tools.core import App, logs, Progress, Resources
 
 
 __all__ = ("SheetsApp", "apps")
@@ -60,7 +62,7 @@ class SheetsApp(App):
         group.add_argument("--overwrite", action="store_true", help="Overwrite existing output file.")
         group.add_argument("--merge", action="store_true", help="Merge new values with existing ones of output.")
 
-    def run(
+    async def run(
         self,
         storages,
         list_storages=False,
@@ -76,6 +78,7 @@ class SheetsApp(App):
         tag=None,
         before=None,
         after=None,
+        resources=None,
         **kwargs,
     ):
         if list_storages:
@@ -87,16 +90,32 @@ class SheetsApp(App):
             self.list_metadata(output)
             return
 
+        from .journal import Journal
+
+        # sheets downloaded by an interrupted run
+        journal = Journal.for_storage(output)
+        if recovered := journal.read():
+            output.update(recovered)
+            logs.info(f"{len(recovered)} sheets recovered from journal {journal.path}.")
+
         urls = self.get_urls(download, download_list, not force_download and output)
+        if recovered:
+            urls -= {sheet.url for sheet in recovered}
         if urls:
-            sheets = self.download(urls)
+            # resources created here are closed once downloads are done
+            try:
+                async with nullcontext(resources) if resources else Resources() as resources:
+                    sheets = await self.download(urls, resources, journal)
+            finally:
+                journal.close()
             if sheets:
                 output.update(sheets)
 
         if clean_up:
             self.clean_up(output)
 
-        self.save(output, overwrite, artists=artist, tags=tag, before=before, after=after)
+        if self.save(output, overwrite, artists=artist, tags=tag, before=before, after=after):
+            journal.remove()
 
     def list_storages(self):
         """List available storage types (print to stdou)"""
@@ -133,9 +152,12 @@ class SheetsApp(App):
         if merge:
             logs.info(f"Output loaded with {len(output)} sheets.")
 
-        for path in inputs:
-            logs.info(f"Load storage {path}")
-            output.load(path)
+        sizes = [path.stat().st_size if path.exists() else 0 for path in inputs]
+        with Progress("load", total=len(inputs), total_bytes=sum(sizes)) as progress:
+            for path, size in zip(inputs, sizes):
+                logs.detail(f"Load storage {path}")
+                output.load(path)
+                progress.update(bytes=size)
 
         logs.info(f"{len(output)} sheets have been loaded.")
         return output
@@ -150,36 +172,55 @@ class SheetsApp(App):
                 urls = urls | {line.strip() for line in lines if line}
 
         if storage:
+            count = len(urls)
             urls = {url for url in urls if url not in storage}
+            logs.count("sheets.cache_hits", count - len(urls))
         return urls
 
-    def download(self, urls):
+    async def download(self, urls, resources, journal=None):
+        """Download sheets concurrently, using shared HTTP client.
+
+        :param Journal journal: record downloaded sheets into it.
+        """
         if not urls:
             logs.info("Nothing to download")
             return
 
         logs.info(f"Downloading {len(urls)} sheets...")
-        sheets = []
-        for url in urls:
-            logs.info(f"- fetch: {url}")
-            host = urlparse(url).hostname
-            if source := self.sources.get(host):
-                try:
-                    sheet = source.from_http(url)
-                    sheets.append(sheet)
-                    logs.success("  done!")
-                except Exception as e:
-                    import traceback
-
-                    traceback.print_exc()
-                    logs.err(f"  error: {e}")
-            else:
-                print(f"No source for host {host} ({url}): skip.")
-
-        return sheets
+        with logs.span("sheets.download", urls=len(urls)), Progress("download", total=len(urls)) as progress:
+            sheets = await resources.gather(self.download_one(url, resources, progress, journal) for url in urls)
+        return [sheet for sheet in sheets if sheet]
+
+    async def download_one(self, url, resources, progress=None, journal=None):
+        """Download a single sheet, returning it or None on error."""
+        host = urlparse(url).hostname
+        if not (source := self.sources.get(host)):
+            logs.count("sheets.download_skipped")
+            logs.warn(f"No source for host {host} ({url}): skip.")
+            progress and progress.update()
+            return None
+
+        logs.detail(f"- fetch: {url}")
+        try:
+            with logs.span("sheets.download.url", url=url):
+                sheet = await source.afrom_http(resources.http, url, progress)
+            logs.count("sheets.downloaded")
+            logs.detail(f"  done: {url}")
+            journal and journal.append(sheet)
+            return sheet
+        except Exception as e:
+            logs.count("sheets.download_errors")
+            # traceback goes through logs, so that it keeps in order with other lines
+            msg = f"  error ({url}): {e}"
+            if not logs.quiet:
+                msg += "\n" + traceback.format_exc().rstrip()
+            logs.err(msg, format=False)
+        finally:
+            progress and progress.update()
 
     def save(self, storage, overwrite=False, **filters):
         if not overwrite and storage.path.exists():
+            logs.flush()
             confirm = input(f"Overwrite file ({storage.path}) [N/y]? ")
             if not confirm or confirm not in "Yy":
                 logs.warn("Don't write over existing file: exit.")
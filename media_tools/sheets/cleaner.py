@@ -44,10 +44,11 @@ class Cleaner:
 
     def _print_lines(self, sheet, n=16, pad="  "):
         for line in islice(sheet.lines, 0, n):
-            print(line.to_string().replace("\n", ""))
+            logs.out(line.to_string().replace("\n", ""), format=False)
 
     def select_action(self, sheet_1, sheet_2):
         logs.warn("Select an action:\n" "- keep sheet 1: 1\n" "- keep sheet 2: 2\n" "- keep both: 3\n")
+        logs.flush()
         action = input("default=3:")
         keep, drop = None, None
         match action:
@@ -64,8 +65,9 @@ class Cleaner:
     def run_drop(self, drop_list):
         logs.warn(f"There are {len(drop_list)} sheets to drop")
         for sheet in drop_list:
-            print(f" - {sheet.artist}: {sheet.title} ({sheet.url})")
+            logs.out(f" - {sheet.artist}: {sheet.title} ({sheet.url})", format=False)
         logs.warn("Are you sure to drop all those items?")
+        logs.flush()
         if input("Please type YES if you're sure") == "YES":
             for sheet in drop_list:
                 k = self.storage.get_key(sheet)
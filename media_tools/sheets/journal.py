@@ -0,0 +1,74 @@
+from datetime import date
+import json
+import os
+from pathlib import Path
+
+from media_tools.core import logs
+from .sheet import Sheet
+
+
+__all__ = ("Journal",)
+
+
+class Journal:
+    """Append-only journal of downloaded sheets, as JSON lines next to the
+    output storage file.
+
+    Sheets are appended as soon as they are downloaded, so that they are
+    not lost if the process is interrupted before the storage is saved.
+    They are replayed on the next run (their URLs are not downloaded
+    again), and the journal is removed once the storage is saved.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.stream = None
+
+    @classmethod
+    def for_storage(cls, storage):
+        """Return journal of the provided storage."""
+        return cls(storage.path.with_name(f".{storage.path.name}.journal.jsonl"))
+
+    def read(self):
+        """Return sheets recorded in the journal. An incomplete last line
+        (interrupted write) is ignored."""
+        sheets = []
+        try:
+            with self.path.open(encoding="utf-8", errors="replace") as stream:
+                for line in stream:
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        continue
+                    if data.get("version"):
+                        data["version"] = date.fromisoformat(data["version"])
+                    sheets.append(Sheet(**data))
+        except FileNotFoundError:
+            pass
+        return sheets
+
+    def append(self, sheet):
+        """Record a sheet, flushed to the file right away."""
+        if self.stream is None:
+            self.stream = self.path.open("a", encoding="utf-8")
+            if self.stream.tell():
+                # terminate an incomplete last line
+                with self.path.open("rb") as stream:
+                    stream.seek(-1, os.SEEK_END)
+                    if stream.read(1) != b"\n":
+                        self.stream.write("\n")
+        self.stream.write(json.dumps(sheet.serialize(), default=str) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not None:
+            os.fsync(self.stream.fileno())
+            self.stream.close()
+            self.stream = None
+
+    def remove(self):
+        """Remove journal (its sheets are saved into storage)."""
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
+            logs.count("sheets.journal_compacted")
@@ -1,5 +1,6 @@
 from odfdo import Element, Document, Header, Paragraph, PageBreak, Section, Style
 
+from media_tools.core import logs, Progress
 from .sheet import Line
 
 __all__ = ("OdfRenderer",)
@@ -149,10 +150,14 @@ class OdfRenderer:
         for style, auto in self.get_styles():
             document.insert_style(style, automatic=auto)
 
-        for sheet in sheets:
-            self.render_sheet(sheet, body)
+        with logs.span("sheets.render"), Progress("render", total=len(sheets)) as progress:
+            for sheet in sheets:
+                with logs.span("sheets.render.sheet"):
+                    self.render_sheet(sheet, body)
+                progress.update()
 
-        document.save(target)
+            with logs.span("sheets.render.save"):
+                document.save(target)
 
     def render_sheet(self, sheet, body):
         elements = [
@@ -141,7 +141,11 @@ class Sheet:
         if not force and path.exists():
             return
         with open(path, "w") as stream:
-            stream.write("\n".join(line.to_string() for line in self.lines))
+            stream.write(self.to_text())
+
+    def to_text(self):
+        """Return lines as text, as saved into sheet file."""
+        return "\n".join(line.to_string() for line in self.lines)
 
     def get_filename(self):
         if self.artist:
@@ -4,9 +4,8 @@ import re
 
 import requests
 
+from media_tools.core import logs
 from .xml import XMLParser
-
-
 from .sheet import Line, Sheet
 
 
@@ -19,14 +18,30 @@ class Source:
     url: str = ""
     """Source URL."""
 
+    headers = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"}
+    """HTTP request headers."""
+
     def from_http(self, url):
-        resp = requests.get(
-            url, headers={"User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"}
-        )
+        resp = requests.get(url, headers=self.headers)
+        return self.from_response(url, resp)
+
+    async def afrom_http(self, client, url, progress=None):
+        """Asynchronously fetch and read url using provided
+        ``httpx.AsyncClient``.
+
+        :param Progress progress: if provided, report downloaded bytes.
+        """
+        resp = await client.get(url, headers=self.headers)
+        progress and progress.update(0, len(resp.content))
+        return self.from_response(url, resp)
+
+    def from_response(self, url, resp):
+        """Read sheet from HTTP response."""
         if resp.status_code != 200:
-            breakpoint()
             raise RuntimeError(f"Error loading {url}: response status: " f"{resp.status_code}.")
-        return self.read(url, resp.text)
+        logs.count("http.bytes", len(resp.content))
+        with logs.span("sheets.parse", url=url):
+            return self.read(url, resp.text)
 
     def read(self, url, text, **kwargs):
         data = self.parse(text, **kwargs)
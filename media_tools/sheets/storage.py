@@ -1,11 +1,14 @@
 from __future__ import annotations
+import copy
 from pathlib import Path
 import inspect
 from typing import Any, Iterable
 
 import yaml
 
-from media_tools.core import logs
+from media_tools.core import logs, Progress
+from media_tools.core.cache import FileCache
+from media_tools.core.writer import AtomicWriter
 from . import odf
 from .sheet import Line, Sheet
 from .xml import XMLParser
@@ -14,6 +17,10 @@ from .xml import XMLParser
 __all__ = ("Storage", "ISheetStorage", "YamlStorage", "OdfStorage", "LibreOfficeHTMLStorage")
 
 
+cache = FileCache()
+"""Loaded storages' sheets (used by long-lived processes)."""
+
+
 class SheetCollection:
     items: dict[Any, Sheet] = None
 
@@ -88,23 +95,37 @@ class Storage(SheetCollection):
         """
         source = get_storage(path) if path else self
         if source.path and source.path.exists():
-            with open(source.path, f"r+{self.file_mode}") as stream:
-                it = source.deserialize(source.path, stream)
-                it and self.update(it)
+            with logs.span("sheets.load", path=str(source.path)):
+                count = len(self)
+                items = cache.get(source.path, source.read)
+                if cache.enabled:
+                    # cached sheets are kept unchanged for later loads
+                    items = copy.deepcopy(items)
+                self.update(items)
+                logs.count("sheets.parsed", len(self) - count)
+
+    def read(self):
+        """Read and return list of sheets from storage's file."""
+        with open(self.path, f"r+{self.file_mode}") as stream:
+            return list(self.deserialize(self.path, stream) or [])
 
     def save(self, filter=None, sort=SheetCollection.sort_key):
         """Save storage to file."""
         if self.path:
-            with open(self.path, f"w+{self.file_mode}") as stream:
-                items = self.get_items(filter, sort)
-                self.prepare_items(items)
-                logs.info(f"Save {len(items)} to {self.path}.")
-                self.serialize(self.path, stream, items)
+            with logs.span("sheets.save", path=str(self.path)), AtomicWriter() as writer:
+                with writer.open(self.path, f"w{self.file_mode}") as stream:
+                    items = self.get_items(filter, sort)
+                    self.prepare_items(items)
+                    logs.info(f"Save {len(items)} to {self.path}.")
+                    self.serialize(self.path, stream, items)
+                    logs.gauge("sheets.saved", len(items))
 
     def prepare_items(self, items):
-        for item in items:
-            if not item.chords:
-                item.done()
+        with Progress("prepare", total=len(items)) as progress:
+            for item in items:
+                if not item.chords:
+                    item.done()
+                progress.update()
 
     def deserialize(self, path, stream) -> Iterable[Sheet] | None:
         """Read sheets from provided stream returning an iterable of Sheets."""
@@ -135,13 +156,17 @@ class ISheetStorage(Storage):
         return self.sheet_class(**sheet)
 
     def serialize(self, path, stream, items):
-        data = []
+        data, files = [], []
         dir = path.parent
         for item in items:
-            item.serialize()
             item.path = item.path or (dir / item.get_filename())
-            item.save_to_file(item.path)
+            if not item.path.exists():
+                files.append((item.path, item.to_text()))
             data.append(item.serialize(lines=False, path=str(item.path.relative_to(dir))))
+
+        # sheets files are written before the index
+        with AtomicWriter() as writer, Progress("write sheets", total=len(files)) as progress:
+            writer.write_many(files, progress=progress)
         yaml.dump(data, stream)
 
 
@@ -197,7 +222,7 @@ class LibreOfficeHTMLStorage(Storage):
     def deserialize_sheet(self, heading):
         heading_text = "".join(heading.itertext()).strip()
         artist, title = "", ""
-        print(">>", heading_text)
+        logs.detail(f">> {heading_text}", format=False)
         if "\n" in heading_text:
             breakpoint()
         for sep in self._h_split:
@@ -0,0 +1,56 @@
+from datetime import date
+from types import SimpleNamespace
+
+from media_tools.sheets.journal import Journal
+from media_tools.sheets.sheet import Sheet
+
+
+def make_sheet(title, url):
+    lines = ["c > Am C", "l > some lyrics"]
+    return Sheet(lines, artist="Artist", title=title, url=url, version=date(2024, 5, 1), tags="a, b")
+
+
+def test_for_storage(tmp_path):
+    storage = SimpleNamespace(path=tmp_path / "sheets.ods")
+    assert Journal.for_storage(storage).path == tmp_path / ".sheets.ods.journal.jsonl"
+
+
+def test_append_read(tmp_path):
+    journal = Journal(tmp_path / "journal.jsonl")
+    assert journal.read() == []
+    journal.append(make_sheet("One", "https://a/1"))
+    journal.append(make_sheet("Two", "https://a/2"))
+    # flushed before close
+    sheets = Journal(journal.path).read()
+    journal.close()
+
+    assert [(sheet.title, sheet.url) for sheet in sheets] == [("One", "https://a/1"), ("Two", "https://a/2")]
+    sheet = sheets[0]
+    assert (sheet.artist, sheet.version, sheet.tags) == ("Artist", date(2024, 5, 1), {"a", "b"})
+    assert sheet.to_text() == "c > Am C\nl > some lyrics"
+
+
+def test_truncated_line(tmp_path):
+    journal = Journal(tmp_path / "journal.jsonl")
+    journal.append(make_sheet("One", "https://a/1"))
+    journal.close()
+    # interrupted write
+    with journal.path.open("a") as stream:
+        stream.write('{"artist": "Artist", "title": "Tw')
+    assert [sheet.title for sheet in journal.read()] == ["One"]
+
+    # next run terminates the incomplete line before appending
+    journal = Journal(journal.path)
+    journal.append(make_sheet("Three", "https://a/3"))
+    journal.close()
+    assert [sheet.title for sheet in journal.read()] == ["One", "Three"]
+
+
+def test_remove(tmp_path):
+    journal = Journal(tmp_path / "journal.jsonl")
+    journal.append(make_sheet("One", "https://a/1"))
+    journal.remove()
+    assert not journal.path.exists()
+    assert journal.stream is None
+    # nothing to remove
+    journal.remove()
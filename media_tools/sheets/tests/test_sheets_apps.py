@@ -0,0 +1,36 @@
+import asyncio
+import io
+
+import pytest
+
+from media_tools.core import logs, Resources
+from media_tools.sheets.apps import SheetsApp
+
+
+class FailingSource:
+    async def afrom_http(self, client, url, progress=None):
+        raise RuntimeError("parse failed")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    app = SheetsApp()
+    app.sources = {"example.com": FailingSource()}
+    monkeypatch.setattr(logs, "stream", io.StringIO())
+    return app
+
+
+def download(app, url):
+    resources = Resources()
+    resources._http = object()
+    return asyncio.run(app.download_one(url, resources))
+
+
+@pytest.mark.parametrize("quiet", [0, 1])
+def test_download_error_is_logged(app, monkeypatch, capsys, quiet):
+    monkeypatch.setattr(logs, "quiet", quiet)
+    assert download(app, "https://example.com/sheet") is None
+    output = logs.stream.getvalue()
+    assert "[E]   error (https://example.com/sheet): parse failed\n" in output
+    assert ("Traceback (most recent call last)" in output) is not quiet
+    assert capsys.readouterr() == ("", "")
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from media_tools.core import App, logs
+from media_tools.core.progress import format_bytes
+from .delta import BLOCK_SIZE
+from .sync import Sync
+
+
+__all__ = ("apps", "SyncApp")
+
+
+class SyncApp(App):
+    name = "sync"
+    label = "Sync"
+    groups = ("files",)
+    description = (
+        "Synchronise a target directory (such as a mounted device) with a source one. Only changed "
+        "files are transferred, and only changed blocks of large files."
+    )
+
+    def init_parser(self, parser):
+        super().init_parser(parser)
+        parser.add_argument("source", type=Path, metavar="SOURCE", help="Source directory.")
+        parser.add_argument("target", type=Path, metavar="TARGET", help="Target directory.")
+        parser.add_argument("-j", "--jobs", type=int, default=Sync.jobs, help="Number of concurrent transfers.")
+        parser.add_argument("--delete", action="store_true", help="Delete target files missing from source.")
+        parser.add_argument("-n", "--dry-run", action="store_true", help="Only print what would be done.")
+        parser.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="Delta transfer block size, in bytes.")
+
+    def run(self, source, target, delete=False, dry_run=False, jobs=None, block_size=BLOCK_SIZE, **kwargs):
+        if not source.is_dir():
+            self.parser.error(f"Source directory {source} does not exist.")
+        sync = Sync(source, target, delete=delete, dry_run=dry_run, jobs=jobs, block_size=block_size)
+        stats = sync.run()
+        logs.info(
+            f"{'[dry run] ' if dry_run else ''}{stats['copied']} copied, {stats['updated']} updated, "
+            f"{stats['touched']} touched, {stats['deleted']} deleted, {stats['unchanged']} unchanged; "
+            f"{format_bytes(stats['bytes'])} written.",
+            format=False,
+        )
+
+
+apps = SyncApp()
@@ -0,0 +1,211 @@
+"""Rsync-like delta transfer between two local files.
+
+The target file is split into blocks, indexed by a weak rolling checksum
+(Adler-32) and a strong digest. The source is then scanned for those
+blocks: matching ones are reused from the target, other data is written
+as literals. When all reused blocks stay at the same offset (in place
+edits, such as tags rewrite), only changed ranges are written into the
+target; otherwise a new file is built, reused blocks being copied by the
+kernel.
+
+Searching shifted blocks runs byte per byte: after a number of failed
+searches in a row, only aligned blocks are looked up until one matches
+again. When few blocks match, the file is copied as a whole instead.
+"""
+from hashlib import blake2b
+import mmap
+import os
+import zlib
+
+from media_tools.core.files import copy_file
+
+
+__all__ = ("BLOCK_SIZE", "MAX_MISSES", "MIN_MATCH_RATIO", "signature", "delta", "apply_delta", "sync_file")
+
+
+BLOCK_SIZE = 1 << 17
+"""Default block size."""
+SEARCH_SIZE = 1 << 20
+"""Number of bytes scanned byte per byte after a block mismatch, looking
+for a shifted block, before data is considered as literal."""
+MAX_MISSES = 8
+"""Number of failed searches in a row after which only aligned blocks are
+looked up, until one matches."""
+MIN_MATCH_RATIO = 0.25
+"""Minimum ratio of reused data for a delta transfer, below which the file
+is copied instead."""
+WRITE_SIZE = 1 << 20
+"""Maximum size of a single write."""
+MOD = 65521
+"""Adler-32 modulus."""
+
+
+def strong_digest(data):
+    return blake2b(data, digest_size=16).digest()
+
+
+def signature(path, block_size=BLOCK_SIZE):
+    """Return target file's blocks signature, as ``{weak: {strong:
+    offset}}``."""
+    blocks = {}
+    with open(path, "rb") as stream:
+        offset = 0
+        while block := stream.read(block_size):
+            if len(block) == block_size:
+                blocks.setdefault(zlib.adler32(block), {}).setdefault(strong_digest(block), offset)
+            offset += len(block)
+    return blocks
+
+
+def delta(data, blocks, block_size=BLOCK_SIZE, search_size=SEARCH_SIZE, max_misses=MAX_MISSES):
+    """Yield delta operations to rebuild source data from target blocks:
+    ``(offset, target_offset, size)`` for reused blocks, ``(offset, None,
+    size)`` for literal data, where offset is the source offset.
+
+    :param bytes|mmap data: source content.
+    :param dict blocks: target signature.
+    :param int max_misses: only look up aligned blocks after this number
+        of failed searches in a row.
+    """
+    size = len(data)
+    pos = literal = misses = 0
+    while pos + block_size <= size:
+        block = data[pos : pos + block_size]
+        weak = zlib.adler32(block)
+        if (found := blocks.get(weak)) and (target := found.get(strong_digest(block))) is not None:
+            if literal < pos:
+                yield literal, None, pos - literal
+            yield pos, target, block_size
+            pos = literal = pos + block_size
+            misses = 0
+            continue
+        if misses >= max_misses:
+            pos += block_size
+            continue
+
+        # rolling search for a shifted block
+        a, b = weak & 0xFFFF, weak >> 16
+        end = min(pos + search_size, size - block_size)
+        start = pos
+        while pos < end:
+            out, inp = data[pos], data[pos + block_size]
+            a = (a - out + inp) % MOD
+            b = (b - block_size * out + a - 1) % MOD
+            pos += 1
+            if (found := blocks.get(b << 16 | a)) and (
+                target := found.get(strong_digest(data[pos : pos + block_size]))
+            ) is not None:
+                break
+        else:
+            # not found: next aligned block
+            pos = start + block_size
+            misses += 1
+            continue
+
+        if literal < pos:
+            yield literal, None, pos - literal
+        yield pos, target, block_size
+        pos = literal = pos + block_size
+        misses = 0
+
+    if literal < size:
+        yield literal, None, size - literal
+
+
+def apply_delta(src, dst, ops, data):
+    """Update destination file from delta operations. Return number of
+    written bytes.
+
+    :param Path src: source file (only used for its size).
+    :param Path dst: destination (target) file.
+    :param list ops: delta operations.
+    :param bytes|mmap data: source content.
+    """
+    size = len(data)
+    written = 0
+    if all(target is None or target == offset for offset, target, _ in ops):
+        # in place: write literals only
+        fd = os.open(dst, os.O_WRONLY)
+        try:
+            for offset, target, length in ops:
+                if target is None:
+                    written += write_range(fd, data, offset, length)
+            os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+        return written
+
+    tmp = dst.with_name(f".{dst.name}.delta")
+    fd_in = os.open(dst, os.O_RDONLY)
+    try:
+        fd_out = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            for offset, target, length in ops:
+                if target is None:
+                    written += write_range(fd_out, data, offset, length)
+                else:
+                    copy_range(fd_in, fd_out, target, offset, length)
+        finally:
+            os.close(fd_out)
+    finally:
+        os.close(fd_in)
+    os.replace(tmp, dst)
+    return written
+
+
+def write_range(fd, data, offset, length, position=None):
+    """Write ``data[offset:offset + length]`` into file at ``position``
+    (default: same offset), by chunks of at most ``WRITE_SIZE`` bytes
+    until all is written. Return ``length``."""
+    position = offset if position is None else position
+    end = offset + length
+    with memoryview(data) as view:
+        while offset < end:
+            with view[offset : min(offset + WRITE_SIZE, end)] as chunk:
+                if not (count := os.pwrite(fd, chunk, position)):
+                    raise OSError(f"no data written at offset {position}")
+            offset, position = offset + count, position + count
+    return length
+
+
+def copy_range(fd_in, fd_out, src_offset, dst_offset, length):
+    """Copy bytes range between files, in kernel when possible."""
+    try:
+        while length:
+            count = os.copy_file_range(fd_in, fd_out, length, src_offset, dst_offset)
+            if not count:
+                break
+            src_offset, dst_offset, length = src_offset + count, dst_offset + count, length - count
+        return
+    except (AttributeError, OSError):
+        pass
+    while length and (block := os.pread(fd_in, min(length, WRITE_SIZE), src_offset)):
+        write_range(fd_out, block, 0, len(block), dst_offset)
+        src_offset, dst_offset, length = src_offset + len(block), dst_offset + len(block), length - len(block)
+
+
+def sync_file(src, dst, block_size=BLOCK_SIZE, blocks=None, digest=None):
+    """Update ``dst`` content to ``src`` one, transferring only changed
+    blocks, or copying it when less than ``MIN_MATCH_RATIO`` of it can be
+    reused. Return number of written bytes.
+
+    :param Path src: source file.
+    :param Path dst: existing destination file.
+    :param int block_size: block size.
+    :param dict blocks: destination's signature, if known.
+    :param digest: hash object (``hashlib``) updated with source content.
+    """
+    if blocks is None:
+        blocks = signature(dst, block_size)
+    with open(src, "rb") as stream:
+        size = os.fstat(stream.fileno()).st_size
+        if not size:
+            os.truncate(dst, 0)
+            return 0
+        with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            ops = list(delta(data, blocks, block_size))
+            if sum(length for _, target, length in ops if target is not None) >= size * MIN_MATCH_RATIO:
+                if digest is not None:
+                    digest.update(data)
+                return apply_delta(src, dst, ops, data)
+    return copy_file(src, dst, resume=False, digest=digest)
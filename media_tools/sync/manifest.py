@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+from media_tools.core.logs import logs
+
+
+__all__ = ("Manifest",)
+
+
+class Manifest:
+    """State of synchronised files, recorded into target directory: for
+    each file, its size, modification time and content digest as of the
+    last synchronisation.
+
+    It is used to detect files whose modification time changed but not
+    their content, without reading the target.
+    """
+
+    filename = ".mt-sync.json"
+    """Manifest file name, in target directory."""
+    version = 1
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.path = self.root / self.filename
+        self.files = {}
+
+    def load(self):
+        try:
+            with self.path.open() as stream:
+                data = json.load(stream)
+        except FileNotFoundError:
+            return self
+        except (OSError, ValueError) as err:
+            logs.warn(f"Can't read sync manifest {self.path}: {err}")
+            return self
+        if data.get("version") == self.version:
+            self.files = data.get("files", {})
+        return self
+
+    def get(self, rel):
+        """Return ``[size, mtime_ns, digest]`` of a file, or None."""
+        return self.files.get(rel)
+
+    def set(self, rel, stat, digest):
+        self.files[rel] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    def remove(self, rel):
+        self.files.pop(rel, None)
+
+    def save(self, writer):
+        """Save manifest using provided ``AtomicWriter``."""
+        data = {"version": self.version, "files": self.files}
+        writer.write(self.path, lambda stream: json.dump(data, stream, separators=(",", ":")))
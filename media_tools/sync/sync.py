@@ -0,0 +1,164 @@
+import hashlib
+import os
+from pathlib import Path
+import threading
+
+from media_tools.core.files import copy_file, is_same_file, map_ordered, walk_files
+from media_tools.core.hashing import HashCache
+from media_tools.core.logs import logs
+from media_tools.core.progress import Progress
+from media_tools.core.writer import AtomicWriter
+from .delta import BLOCK_SIZE, sync_file
+from .manifest import Manifest
+
+
+__all__ = ("Sync",)
+
+
+class Sync:
+    """Synchronise a target directory tree with a source one.
+
+    Files are compared by size and modification time. When they differ
+    but the target did not change since last synchronisation (see
+    ``Manifest``) and has the same size, the source is hashed: if content
+    is the same, only the target's modification time is updated.
+
+    Changed files are updated with delta transfer when large enough (see
+    ``delta``), copied otherwise. Hashing and transfers run in thread
+    pools; source digests are cached across runs (see ``HashCache``).
+    """
+
+    jobs = 4
+    """Number of concurrent transfers."""
+    hash_jobs = 4
+    """Number of files hashed concurrently."""
+    delta_min_size = 1 << 22
+    """Files smaller than this are copied instead of delta transferred."""
+    ignore = (Manifest.filename,)
+    """Ignored files names."""
+
+    def __init__(self, source, target, delete=False, dry_run=False, jobs=None, block_size=BLOCK_SIZE, hashes=None):
+        """
+        :param Path source: source directory.
+        :param Path target: target directory.
+        :param bool delete: delete target files that are not in source.
+        :param bool dry_run: only report what would be done.
+        :param int jobs: number of concurrent transfers.
+        :param int block_size: delta transfer block size.
+        :param HashCache hashes: digests cache (default: user's one).
+        """
+        self.source = Path(source)
+        self.target = Path(target)
+        self.delete = delete
+        self.dry_run = dry_run
+        if jobs:
+            self.jobs = jobs
+        self.block_size = block_size
+        self.hashes = hashes or HashCache(jobs=self.hash_jobs)
+        self.manifest = Manifest(self.target).load()
+        self.stats = dict.fromkeys(("unchanged", "copied", "updated", "touched", "deleted", "bytes"), 0)
+        self.lock = threading.Lock()
+
+    def scan(self, root):
+        """Return ``{relative path: stat}`` of files under root."""
+        root = os.path.join(os.path.abspath(root), "")
+        return {
+            os.path.join(path, name)[len(root) :]: stat
+            for path, name, stat in walk_files((root,))
+            if name not in self.ignore and not (name.startswith(".") and name.endswith((".part", ".delta")))
+        }
+
+    def plan(self, sources, targets):
+        """Return ``(transfers, checks, deletes)`` relative paths lists:
+        files to transfer, files to hash and compare, files to delete."""
+        transfers, checks = [], []
+        for rel, stat in sources.items():
+            if (target := targets.get(rel)) is None:
+                transfers.append(rel)
+            elif is_same_file(stat, target):
+                self.stats["unchanged"] += 1
+            elif (
+                stat.st_size == target.st_size
+                and (entry := self.manifest.get(rel))
+                and entry[:2] == [target.st_size, target.st_mtime_ns]
+                and entry[2]
+            ):
+                checks.append(rel)
+            else:
+                transfers.append(rel)
+        deletes = [rel for rel in targets if rel not in sources] if self.delete else []
+        return transfers, checks, deletes
+
+    def run(self):
+        """Run synchronisation. Return stats."""
+        self.target.mkdir(parents=True, exist_ok=True)
+        with logs.span("sync.scan"):
+            sources, targets = self.scan(self.source), self.scan(self.target)
+        transfers, checks, deletes = self.plan(sources, targets)
+
+        with logs.span("sync.hash"):
+            digests = self.hashes.get_many((self.source / rel for rel in checks), (sources[rel] for rel in checks))
+        digests = {rel: digests[self.source / rel] for rel in checks}
+
+        # same content, different modification time
+        for rel in checks:
+            if digests[rel] == self.manifest.get(rel)[2]:
+                self.touch(rel, sources[rel], digests[rel])
+            else:
+                transfers.append(rel)
+
+        total_bytes = sum(sources[rel].st_size for rel in transfers)
+        with Progress("sync", total=len(transfers), total_bytes=total_bytes) as progress:
+            items = ((rel, rel in targets, progress) for rel in transfers)
+            for _ in map_ordered(self.transfer, items, self.jobs):
+                pass
+
+        for rel in deletes:
+            logs.detail(f"delete {rel}", format=False)
+            if not self.dry_run:
+                (self.target / rel).unlink(missing_ok=True)
+                self.manifest.remove(rel)
+            self.stats["deleted"] += 1
+
+        if not self.dry_run:
+            with AtomicWriter() as writer:
+                self.manifest.save(writer)
+        self.hashes.close()
+        for key, value in self.stats.items():
+            logs.count(f"sync.{key}", value)
+        return self.stats
+
+    def touch(self, rel, stat, digest):
+        """Update target's modification time only."""
+        logs.detail(f"touch {rel}", format=False)
+        self.stats["touched"] += 1
+        if not self.dry_run:
+            target = self.target / rel
+            os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.manifest.set(rel, os.stat(target), digest)
+
+    def transfer(self, rel, exists, progress=None):
+        """Copy or update a file (run in worker threads). Content digest
+        recorded into manifest is computed while it is read."""
+        source, target = self.source / rel, self.target / rel
+        size = os.stat(source).st_size
+        delta = exists and size >= self.delta_min_size
+        logs.detail(f"{'update' if exists else 'copy'} {rel}{' (delta)' if delta else ''}", format=False)
+        if self.dry_run:
+            with self.lock:
+                self.stats["updated" if exists else "copied"] += 1
+            return
+
+        digest = hashlib.blake2b()
+        if delta:
+            written = sync_file(source, target, self.block_size, digest=digest)
+            stat = os.stat(source)
+            os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            written = copy_file(source, target, resume=not exists, digest=digest)
+        with self.lock:
+            self.manifest.set(rel, os.stat(target), digest.hexdigest())
+            self.stats["updated" if exists else "copied"] += 1
+            self.stats["bytes"] += written
+        progress and progress.update(bytes=size)
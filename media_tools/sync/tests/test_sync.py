@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import random
+
+import pytest
+
+from media_tools.core.hashing import HashCache, hash_file
+from media_tools.sync import delta as delta_module
+from media_tools.sync.delta import apply_delta, delta, signature, sync_file
+from media_tools.sync.manifest import Manifest
+from media_tools.sync.sync import Sync
+
+
+BLOCK = 1 << 10
+
+
+def random_bytes(size, seed=0):
+    return random.Random(seed).randbytes(size)
+
+
+def signature_of(data, tmp_path):
+    path = tmp_path / "signed"
+    path.write_bytes(data)
+    return signature(path, BLOCK)
+
+
+def rebuild(data, target, ops):
+    return b"".join(data[o : o + n] if t is None else target[t : t + n] for o, t, n in ops)
+
+
+def test_delta_reuses_shifted_blocks(tmp_path):
+    target = random_bytes(20 * BLOCK)
+    data = target[:5000] + b"inserted" + target[5000:]
+    ops = list(delta(data, signature_of(target, tmp_path), BLOCK))
+    assert rebuild(data, target, ops) == data
+    literal = sum(n for _, t, n in ops if t is None)
+    assert literal < 2 * BLOCK
+
+
+def test_delta_keeps_matching_aligned_blocks_after_misses(tmp_path):
+    target = random_bytes(30 * BLOCK)
+    # changed region larger than max_misses blocks, followed by unchanged data
+    data = random_bytes(10 * BLOCK, seed=1) + target[10 * BLOCK :]
+    ops = list(delta(data, signature_of(target, tmp_path), BLOCK, search_size=BLOCK, max_misses=3))
+    assert rebuild(data, target, ops) == data
+    assert ops[0] == (0, None, 10 * BLOCK)
+    assert all(t == o for o, t, _ in ops[1:])
+    assert sum(n for _, t, n in ops[1:]) == 20 * BLOCK
+
+
+@pytest.mark.parametrize("in_place", [True, False])
+def test_apply_delta_short_writes(tmp_path, monkeypatch, in_place):
+    dst = tmp_path / "dst"
+    target = random_bytes(8 * BLOCK)
+    dst.write_bytes(target)
+    data = random_bytes(5 * BLOCK, seed=1) + target[5 * BLOCK :]
+    if not in_place:
+        data = b"shift" + data
+    ops = list(delta(data, signature(dst, BLOCK), BLOCK))
+
+    pwrite = os.pwrite
+    monkeypatch.setattr(delta_module, "WRITE_SIZE", 3000)
+    monkeypatch.setattr(os, "pwrite", lambda fd, data, offset: pwrite(fd, data[:1000], offset))
+    assert apply_delta(None, dst, ops, data) == sum(n for _, t, n in ops if t is None)
+    assert dst.read_bytes() == data
+
+
+def test_apply_delta_in_place(tmp_path):
+    dst = tmp_path / "dst"
+    target = random_bytes(8 * BLOCK)
+    dst.write_bytes(target)
+    data = bytearray(target)
+    data[3 * BLOCK : 3 * BLOCK + 4] = b"TAGS"
+    ops = list(delta(bytes(data), signature(dst, BLOCK), BLOCK))
+    ino = os.stat(dst).st_ino
+    assert apply_delta(None, dst, ops, bytes(data)) == BLOCK
+    assert dst.read_bytes() == data
+    assert os.stat(dst).st_ino == ino
+
+
+@pytest.mark.parametrize("change", ["insert", "truncate", "unrelated", "empty"])
+def test_sync_file(tmp_path, change):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    target = random_bytes(40 * BLOCK)
+    dst.write_bytes(target)
+    data = {
+        "insert": target[:7000] + b"x" * 100 + target[7000:],
+        "truncate": target[: 30 * BLOCK + 10],
+        "unrelated": random_bytes(40 * BLOCK, seed=2),
+        "empty": b"",
+    }[change]
+    src.write_bytes(data)
+    digest = hashlib.blake2b()
+    written = sync_file(src, dst, BLOCK, digest=digest)
+    assert dst.read_bytes() == data
+    if data:
+        assert digest.hexdigest() == hash_file(src)
+    if change == "unrelated":
+        assert written == len(data)
+    elif change == "insert":
+        assert written < 3 * BLOCK
+    assert not list(tmp_path.glob(".*"))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    source, target = tmp_path / "source", tmp_path / "target"
+    (source / "a").mkdir(parents=True)
+    (source / "a" / "one.flac").write_bytes(random_bytes(50_000))
+    (source / "two.mp3").write_bytes(random_bytes(5_000, seed=1))
+    return source, target
+
+
+def run_sync(source, target, tmp_path, **kwargs):
+    with HashCache(tmp_path / "hashes.sqlite3") as hashes:
+        return Sync(source, target, hashes=hashes, **kwargs).run()
+
+
+def test_sync_copy_update_delete(tree, tmp_path):
+    source, target = tree
+    stats = run_sync(source, target, tmp_path)
+    assert (stats["copied"], stats["bytes"]) == (2, 55_000)
+    assert (target / "a" / "one.flac").read_bytes() == (source / "a" / "one.flac").read_bytes()
+
+    manifest = json.loads((target / Manifest.filename).read_text())["files"]
+    assert manifest["two.mp3"][2] == hash_file(source / "two.mp3")
+
+    assert run_sync(source, target, tmp_path)["unchanged"] == 2
+
+    (source / "two.mp3").write_bytes(b"new")
+    os.utime(source / "two.mp3", (1, 2_000_000_000))
+    (target / "extra").write_text("x")
+    stats = run_sync(source, target, tmp_path, delete=True)
+    assert (stats["updated"], stats["deleted"]) == (1, 1)
+    assert (target / "two.mp3").read_bytes() == b"new"
+    assert not (target / "extra").exists()
+
+
+def test_sync_touches_same_content(tree, tmp_path):
+    source, target = tree
+    run_sync(source, target, tmp_path)
+    os.utime(source / "two.mp3", (1, 2_000_000_000))
+    stats = run_sync(source, target, tmp_path)
+    assert (stats["touched"], stats["bytes"]) == (1, 0)
+    assert os.stat(target / "two.mp3").st_mtime == 2_000_000_000
+
+
+def test_sync_dry_run(tree, tmp_path):
+    source, target = tree
+    stats = run_sync(source, target, tmp_path, dry_run=True)
+    assert stats["copied"] == 2
+    assert not list(target.iterdir())